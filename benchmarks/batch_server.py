@@ -0,0 +1,181 @@
+"""Local stand-in for the Anthropic and OpenAI batch APIs, answering with fake content.
+
+Usage:
+    python benchmarks/batch_server.py [--port 8765] [--delay 5]
+
+Point the batch clients to it with `ANTHROPIC_BASE_URL=http://127.0.0.1:8765` and
+`OPENAI_BASE_URL=http://127.0.0.1:8765/v1`, e.g. to run `open-deep-research-batch --llm-batch`
+without provider accounts. Batches end `--delay` seconds after they are submitted. Responses are
+those of FakeChatModel: structured output calls get a deterministic instance of the schema named
+by their tool, other calls get a fixed section of text.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List
+
+from aiohttp import web
+from langchain_core.messages import HumanMessage
+
+from fakes import FakeChatModel
+from open_deep_research.state import Feedback, PlanReview, Queries, ReportQueries, Sections
+
+# Structured output schemas of the graph, by the tool name they are called with
+SCHEMAS = {schema.__name__: schema for schema in (Sections, Queries, ReportQueries, Feedback, PlanReview)}
+
+def content_text(content: Any) -> str:
+    """Get the text of message content, given as a string or as content blocks."""
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content or [] if isinstance(block, dict))
+
+class StandInBatchServer:
+    """Serves the batch endpoints of both providers, and counts the batches it received."""
+
+    def __init__(self, delay: float = 5.0, chat_model: FakeChatModel = None) -> None:
+        self.delay = delay
+        self.chat_model = chat_model or FakeChatModel()
+        self.batches: Dict[str, Dict[str, Any]] = {} # Submitted batches by ID
+        self.files: Dict[str, str] = {} # Uploaded and output files of the OpenAI API by ID
+        self._ids = itertools.count(1)
+
+    def answer(self, prompt: str, tool_name: str = None) -> Dict[str, Any]:
+        """Answer a prompt with text, or with the arguments of a tool call."""
+        messages = [HumanMessage(content=prompt)]
+        if tool_name:
+            return {"tool": tool_name, "input": self.chat_model.structured_response(SCHEMAS[tool_name], messages).model_dump()}
+        message = self.chat_model.response(messages).generations[0].message
+        return {"text": message.content, "usage": message.usage_metadata}
+
+    def anthropic_message(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Build an Anthropic message answering the parameters of a request."""
+        prompt = content_text(params.get("system")) + "".join(content_text(m["content"]) for m in params["messages"])
+        tool_choice = params.get("tool_choice") or {}
+        tools = params.get("tools") or []
+        tool_name = tool_choice.get("name") or (tools[0]["name"] if tools else None)
+        answer = self.answer(prompt, tool_name)
+        if tool_name:
+            content = [{"type": "tool_use", "id": f"toolu_{next(self._ids)}", "name": tool_name, "input": answer["input"]}]
+        else:
+            content = [{"type": "text", "text": answer["text"]}]
+        return {"id": f"msg_{next(self._ids)}", "type": "message", "role": "assistant", "model": params["model"],
+                "content": content, "stop_reason": "tool_use" if tool_name else "end_turn", "stop_sequence": None,
+                "usage": {"input_tokens": len(prompt) // 4, "output_tokens": len(json.dumps(content)) // 4}}
+
+    def openai_completion(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Build an OpenAI chat completion answering a request body."""
+        prompt = "".join(content_text(m.get("content")) for m in body["messages"])
+        tool_choice = body.get("tool_choice")
+        tools = body.get("tools") or []
+        tool_name = tool_choice["function"]["name"] if isinstance(tool_choice, dict) else (tools[0]["function"]["name"] if tools else None)
+        answer = self.answer(prompt, tool_name)
+        if tool_name:
+            message = {"role": "assistant", "content": None,
+                       "tool_calls": [{"id": f"call_{next(self._ids)}", "type": "function",
+                                       "function": {"name": tool_name, "arguments": json.dumps(answer["input"])}}]}
+        else:
+            message = {"role": "assistant", "content": answer["text"]}
+        return {"id": f"chatcmpl-{next(self._ids)}", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+                "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_name else "stop"}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 100, "total_tokens": len(prompt) // 4 + 100}}
+
+    def ended(self, batch: Dict[str, Any]) -> bool:
+        return time.time() >= batch["created"] + self.delay
+
+    async def create_anthropic_batch(self, request: web.Request) -> web.Response:
+        requests = (await request.json())["requests"]
+        batch_id = f"msgbatch_{next(self._ids)}"
+        self.batches[batch_id] = {"provider": "anthropic", "created": time.time(), "requests": requests}
+        return web.json_response({"id": batch_id, "type": "message_batch", "processing_status": "in_progress"})
+
+    async def get_anthropic_batch(self, request: web.Request) -> web.Response:
+        batch_id = request.match_info["batch_id"]
+        ended = self.ended(self.batches[batch_id])
+        return web.json_response({"id": batch_id, "type": "message_batch",
+                                  "processing_status": "ended" if ended else "in_progress",
+                                  "results_url": str(request.url.with_path(f"/v1/messages/batches/{batch_id}/results")) if ended else None})
+
+    async def get_anthropic_results(self, request: web.Request) -> web.Response:
+        batch = self.batches[request.match_info["batch_id"]]
+        lines = [json.dumps({"custom_id": item["custom_id"],
+                             "result": {"type": "succeeded", "message": self.anthropic_message(item["params"])}})
+                 for item in batch["requests"]]
+        return web.Response(text="\n".join(lines) + "\n", content_type="application/jsonl")
+
+    async def upload_openai_file(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        file_id = f"file-{next(self._ids)}"
+        self.files[file_id] = form["file"].file.read().decode("utf-8")
+        return web.json_response({"id": file_id, "object": "file", "purpose": form["purpose"]})
+
+    async def create_openai_batch(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        requests = [json.loads(line) for line in self.files[body["input_file_id"]].splitlines() if line.strip()]
+        batch_id = f"batch_{next(self._ids)}"
+        self.batches[batch_id] = {"provider": "openai", "created": time.time(), "requests": requests}
+        return web.json_response({"id": batch_id, "object": "batch", "status": "validating"})
+
+    async def get_openai_batch(self, request: web.Request) -> web.Response:
+        batch_id = request.match_info["batch_id"]
+        batch = self.batches[batch_id]
+        if not self.ended(batch):
+            return web.json_response({"id": batch_id, "object": "batch", "status": "in_progress"})
+        if "output_file_id" not in batch:
+            batch["output_file_id"] = f"file-{next(self._ids)}"
+            self.files[batch["output_file_id"]] = "".join(
+                json.dumps({"custom_id": item["custom_id"], "error": None,
+                            "response": {"status_code": 200, "body": self.openai_completion(item["body"])}}) + "\n"
+                for item in batch["requests"]
+            )
+        return web.json_response({"id": batch_id, "object": "batch", "status": "completed",
+                                  "output_file_id": batch["output_file_id"], "error_file_id": None})
+
+    async def get_openai_file(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.files[request.match_info["file_id"]], content_type="application/jsonl")
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=1024 ** 3)
+        app.add_routes([
+            web.post("/v1/messages/batches", self.create_anthropic_batch),
+            web.get("/v1/messages/batches/{batch_id}", self.get_anthropic_batch),
+            web.get("/v1/messages/batches/{batch_id}/results", self.get_anthropic_results),
+            web.post("/v1/files", self.upload_openai_file),
+            web.get("/v1/files/{file_id}/content", self.get_openai_file),
+            web.post("/v1/batches", self.create_openai_batch),
+            web.get("/v1/batches/{batch_id}", self.get_openai_batch),
+        ])
+        return app
+
+    def request_counts(self) -> List[int]:
+        """Get the number of requests in each batch received, in submission order."""
+        return [len(batch["requests"]) for batch in self.batches.values()]
+
+@asynccontextmanager
+async def serve_batches(port: int = 8765, delay: float = 5.0) -> AsyncIterator[StandInBatchServer]:
+    """Run the stand-in server on localhost for the duration of the block."""
+    server = StandInBatchServer(delay)
+    runner = web.AppRunner(server.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    try:
+        yield server
+    finally:
+        await runner.cleanup()
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=5.0, help="Seconds until a submitted batch ends")
+    args = parser.parse_args()
+
+    async with serve_batches(args.port, args.delay):
+        print(f"Serving batch APIs on http://127.0.0.1:{args.port}")
+        await asyncio.Event().wait()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""Measure the checkpoint bytes written for one report, with and without blob handles in the state.
+
+Usage:
+    python benchmarks/checkpoint_size.py [--sections 6] [--max-search-depth 2] [--search-api exa]
+
+A report is run twice against fake models and search. With inline state, every
+large string is stored in the checkpoints (blob_min_size set above any string size).
+With blob handles, strings of at least 1024 characters go to the blob store.
+"""
+
+import argparse
+import asyncio
+import uuid
+
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.types import Command
+
+from fakes import FakeChatModel, fake_backends
+from open_deep_research.graph import builder
+
+class CountingSaver(MemorySaver):
+    """In-memory checkpointer that counts the bytes a whole-checkpoint saver (e.g. SQLite) would write."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.checkpoint_bytes = 0
+        self.write_bytes = 0
+        self.checkpoints = 0
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        self.checkpoint_bytes += len(self.serde.dumps_typed(checkpoint)[1])
+        self.checkpoints += 1
+        return super().put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        self.write_bytes += sum(len(self.serde.dumps_typed(value)[1]) for _, value in writes)
+        return super().put_writes(config, writes, task_id, task_path)
+
+async def run_report(blob_min_size: int, sections: int, max_search_depth: int, search_api: str) -> CountingSaver:
+    """Run one report to completion and return the checkpointer that recorded it."""
+    saver = CountingSaver()
+    graph = builder.compile(checkpointer=saver)
+    thread = {"configurable": {"thread_id": str(uuid.uuid4()),
+                               "search_api": search_api,
+                               "max_search_depth": max_search_depth,
+                               "blob_min_size": blob_min_size}}
+    with fake_backends(FakeChatModel(num_sections=sections)):
+        await graph.ainvoke({"topic": "Benchmark topic"}, thread)
+        await graph.ainvoke(Command(resume=True), thread)
+    return saver
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=6)
+    parser.add_argument("--max-search-depth", type=int, default=2)
+    parser.add_argument("--search-api", default="exa", help="Search API whose formatting to use, all are faked")
+    args = parser.parse_args()
+
+    runs = {
+        "inline state": await run_report(10**12, args.sections, args.max_search_depth, args.search_api),
+        "blob handles": await run_report(1024, args.sections, args.max_search_depth, args.search_api),
+    }
+
+    print(f"{'state':<14} {'checkpoints':>11} {'checkpoint bytes':>17} {'write bytes':>12} {'total bytes':>12}")
+    for name, saver in runs.items():
+        total = saver.checkpoint_bytes + saver.write_bytes
+        print(f"{name:<14} {saver.checkpoints:>11} {saver.checkpoint_bytes:>17,} {saver.write_bytes:>12,} {total:>12,}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,169 @@
+"""Deterministic stand-ins for chat models and search APIs, to run the report graph offline."""
+
+import asyncio
+import hashlib
+import importlib
+import re
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+import open_deep_research.graph as graph_module
+from open_deep_research.search_backends import SEARCH_BACKENDS
+from open_deep_research.search_results import SearchResponse, SearchResult
+from open_deep_research.state import (Feedback, PlanReview, Queries, ReportQueries, SearchQuery, Section, SectionQueries, 
+                                      Sections)
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that answers every prompt with fixed, deterministic content."""
+
+    num_sections: int = 4 # Number of sections in generated plans, two of them without research
+    num_queries: int = 2 # Number of queries in generated query lists
+    section_words: int = 250 # Length of written sections
+    grade: str = "fail" # Grade given to every section, "fail" runs until max_search_depth
+    approve_plan: bool = True # Review given to every plan, False regenerates it until max_plan_revisions
+    latency: float = 0.0 # Seconds each call takes, spent sleeping like a call waiting on a provider
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, 
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return self.response(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, 
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self.response(messages)
+
+    def response(self, messages: List[BaseMessage]) -> ChatResult:
+        """Build a deterministic section for a prompt, with token usage estimated from its length."""
+        prompt = "".join(str(m.content) for m in messages)
+        seed = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+        content = f"## Section {seed}\n\n" + " ".join(["word"] * self.section_words)
+        message = AIMessage(content=content, 
+                            usage_metadata={"input_tokens": len(prompt) // 4, 
+                                            "output_tokens": self.section_words, 
+                                            "total_tokens": len(prompt) // 4 + self.section_words})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> RunnableLambda:
+        def invoke(messages: Any) -> Any:
+            time.sleep(self.latency)
+            return self.structured_response(schema, messages)
+
+        async def ainvoke(messages: Any) -> Any:
+            await asyncio.sleep(self.latency)
+            return self.structured_response(schema, messages)
+
+        return RunnableLambda(invoke, afunc=ainvoke)
+
+    def structured_response(self, schema: Any, messages: Any) -> Any:
+        """Build a deterministic instance of a structured output schema."""
+        if schema is Sections:
+            return Sections(sections=[Section(name=f"Section {i}", 
+                                              description=f"Description of section {i}", 
+                                              research=0 < i < self.num_sections - 1, 
+                                              content="") 
+                                      for i in range(self.num_sections)])
+        if schema is Queries:
+            prompt = "".join(str(m.content) for m in messages)
+            seed = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+            return Queries(queries=[SearchQuery(search_query=f"query {seed} {i}") for i in range(self.num_queries)])
+        if schema is ReportQueries:
+            prompt = "".join(str(m.content) for m in messages)
+            seed = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+            return ReportQueries(sections=[
+                SectionQueries(section_name=name, 
+                               queries=[SearchQuery(search_query=f"query {seed} {name} {i}") for i in range(self.num_queries)])
+                for name in re.findall(r"^Section: (.+)$", prompt, re.MULTILINE)
+            ])
+        if schema is Feedback:
+            return Feedback(grade=self.grade, follow_up_queries=[SearchQuery(search_query="follow-up query")])
+        if schema is PlanReview:
+            return PlanReview(approved=self.approve_plan, feedback="" if self.approve_plan else "Merge overlapping sections.")
+        raise ValueError(f"Unsupported schema: {schema}")
+
+def fake_search_response(query: str, num_results: int = 5, raw_content_chars: int = 16_000) -> SearchResponse:
+    """Build the search response of a query."""
+    digest = hashlib.sha256(query.encode("utf-8")).hexdigest()
+    return SearchResponse(
+        query=query,
+        results=[
+            SearchResult(
+                title=f"Result {i} for {query}",
+                url=f"https://example.com/{digest[:12]}/{i}",
+                content=f"Snippet {i} about {query}",
+                score=1.0 - i * 0.1,
+                raw_content=(digest * (raw_content_chars // len(digest) + 1))[:raw_content_chars],
+            )
+            for i in range(num_results)
+        ],
+    )
+
+# Search functions of search_backends, with the search API each serves and whether the real backend
+# runs its queries one after another (to respect rate limits) rather than all at once
+SEARCH_FUNCTIONS: Dict[str, Tuple[str, bool]] = {
+    backend.function: (backend.name, not backend.concurrent) for backend in SEARCH_BACKENDS.values()
+}
+
+def stand_in_search(function_name: str, latency: float = 0.0, raw_content_chars: int = 16_000) -> Callable:
+    """Build a local stand-in for a search function of search_backends.
+
+    The stand-in returns fake results shaped like the real backend's, and takes as long as the
+    real backend would with the given per-query latency: queries of sequential backends add up,
+    queries of concurrent backends overlap.
+
+    Args:
+        function_name: Search function of search_backends to stand in for
+        latency: Seconds each query takes
+        raw_content_chars: Length of the raw content of every search result
+
+    Returns:
+        A function with the same calling convention as the real one
+    """
+    _, sequential = SEARCH_FUNCTIONS[function_name]
+
+    def delay(search_queries: List[str]) -> float:
+        return latency * len(search_queries) if sequential else latency if search_queries else 0.0
+
+    async def search_async(search_queries, **kwargs):
+        await asyncio.sleep(delay(search_queries))
+        return [fake_search_response(query, raw_content_chars=raw_content_chars) for query in search_queries]
+
+    return search_async
+
+@contextmanager
+def fake_backends(chat_model: Optional[FakeChatModel] = None, raw_content_chars: int = 16_000, 
+                  search_latency: float = 0.0) -> Iterator[FakeChatModel]:
+    """Route every chat model and search API of the graph to the fakes.
+
+    Args:
+        chat_model: Fake chat model to use for every model of the graph
+        raw_content_chars: Length of the raw content of every search result
+        search_latency: Seconds each search query takes
+
+    Yields:
+        The fake chat model
+    """
+    chat_model = chat_model or FakeChatModel()
+
+    modules = {name: importlib.import_module(SEARCH_BACKENDS[search_api].module) for name, (search_api, _) in SEARCH_FUNCTIONS.items()}
+    originals = {name: getattr(modules[name], name) for name in SEARCH_FUNCTIONS}
+    original_get_chat_model = graph_module.get_chat_model
+    graph_module.get_chat_model = lambda *args, **kwargs: chat_model
+    for name in SEARCH_FUNCTIONS:
+        setattr(modules[name], name, stand_in_search(name, search_latency, raw_content_chars))
+    try:
+        yield chat_model
+    finally:
+        graph_module.get_chat_model = original_get_chat_model
+        for name, function in originals.items():
+            setattr(modules[name], name, function)
@@ -0,0 +1,150 @@
+"""Run the Google scraper against saved result pages served by a local stand-in server.
+
+Usage:
+    python benchmarks/google_scrape.py [--port 8766] [--queries 3] [--max-results 20] [--include-raw-content]
+
+The server answers `/search` with the fixture of the requested `start` in fixtures/google/ (an
+empty result page past the last one), and the result links with short article pages, so the
+scraper runs end to end without touching Google. The fixtures are reduced copies of the result
+pages Google serves to text browsers: ten results per page, a sponsored block the parser skips,
+and a result repeated across pages 0 and 1. Their links point to https://example.org, which the
+server rewrites to itself.
+
+The server sets a cookie on its first response and checks it comes back with the later
+requests, as Google's cookies would on the shared session. It also records the most pages
+requested at once, which must stay within the scraping politeness budget.
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, List
+
+from aiohttp import web
+
+from open_deep_research.search_backends.googlesearch import (
+    CONSENT_COOKIES,
+    RESULTS_PER_PAGE,
+    SCRAPE_MAX_CONCURRENCY,
+    google_search_async,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures" / "google"
+
+# Host of the fixtures' result links, rewritten to the stand-in server
+FIXTURE_HOST = "https://example.org"
+
+class StandInGoogle:
+    """Serves the saved result pages and their articles, and records how they were requested."""
+
+    def __init__(self, base_url: str, delay: float = 0.2) -> None:
+        self.base_url = base_url
+        self.delay = delay # Seconds taken to answer each result page
+        self.pages = sorted(FIXTURES.glob("page*.html"), key=lambda path: int(re.sub(r"\D", "", path.stem)))
+        self.requests: List[Dict[str, str]] = [] # Parameters and cookies of each result page request
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def search(self, request: web.Request) -> web.Response:
+        self.requests.append({**request.query, **{f"cookie:{name}": value for name, value in request.cookies.items()}})
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        page = int(request.query.get("start", 0)) // RESULTS_PER_PAGE
+        path = self.pages[page] if page < len(self.pages) else self.pages[-1]
+        response = web.Response(text=path.read_text().replace(FIXTURE_HOST, self.base_url), content_type="text/html")
+        response.set_cookie("NID", "stand-in")
+        return response
+
+    async def article(self, request: web.Request) -> web.Response:
+        slug = request.match_info["slug"]
+        return web.Response(text=f"<html><body><h1>{slug}</h1><p>Full text of the {slug} article.</p></body></html>",
+                            content_type="text/html")
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([
+            web.get("/search", self.search),
+            web.get("/{slug}", self.article),
+        ])
+        return app
+
+@asynccontextmanager
+async def serve_google(port: int = 8766, delay: float = 0.2) -> AsyncIterator[StandInGoogle]:
+    """Run the stand-in server on localhost for the duration of the block.
+
+    Served on "localhost" rather than 127.0.0.1, since cookie jars refuse cookies from IP addresses.
+    """
+    server = StandInGoogle(f"http://localhost:{port}", delay)
+    runner = web.AppRunner(server.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "localhost", port)
+    await site.start()
+    try:
+        yield server
+    finally:
+        await runner.cleanup()
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--queries", type=int, default=3)
+    parser.add_argument("--max-results", type=int, default=20)
+    parser.add_argument("--include-raw-content", action="store_true", help="Also fetch the pages of the results")
+    parser.add_argument("--delay", type=float, default=0.2, help="Seconds the server takes per result page")
+    args = parser.parse_args()
+
+    # Scrape the stand-in server, without the credentials that would switch to the Custom Search API
+    for name in ("GOOGLE_API_KEY", "GOOGLE_CX"):
+        os.environ.pop(name, None)
+
+    async with serve_google(args.port, args.delay) as server:
+        os.environ["GOOGLE_SCRAPE_URL"] = f"{server.base_url}/search"
+        queries = [f"statin therapy {i}" for i in range(args.queries)]
+        start = time.perf_counter()
+        responses = await google_search_async(queries, max_results=args.max_results,
+                                              include_raw_content=args.include_raw_content)
+        elapsed = time.perf_counter() - start
+
+    failures = []
+    for response in responses:
+        urls = [result.url for result in response.results]
+        print(f"{response.query!r}: {len(urls)} results" + (f", error: {response.error}" if response.error else ""))
+        if response.error:
+            failures.append(f"{response.query!r} failed")
+        if len(urls) != len(set(urls)):
+            failures.append(f"{response.query!r} has duplicate URLs")
+        if any(result.title.startswith("Sponsored") for result in response.results):
+            failures.append(f"{response.query!r} kept a sponsored block")
+        if args.include_raw_content and not all("Full text" in (result.raw_content or "") for result in response.results):
+            failures.append(f"{response.query!r} is missing page contents")
+
+    consent = all(all(request.get(f"cookie:{name}") == value for name, value in CONSENT_COOKIES.items())
+                  for request in server.requests)
+    reused = sum("cookie:NID" in request for request in server.requests)
+    print(f"\n{'result page requests':<36} {len(server.requests):>8}")
+    print(f"{'most requested at once':<36} {server.max_in_flight:>8} (budget {SCRAPE_MAX_CONCURRENCY})")
+    print(f"{'requests sending the consent cookies':<36} {len(server.requests) if consent else 0:>8}")
+    print(f"{'requests sending back the cookie':<36} {reused:>8}")
+    print(f"{'seconds':<36} {elapsed:>8.2f}")
+
+    if server.max_in_flight > SCRAPE_MAX_CONCURRENCY:
+        failures.append("result pages were requested beyond the politeness budget")
+    if not consent:
+        failures.append("a result page request lacked the consent cookies")
+    if reused == 0 and len(server.requests) > SCRAPE_MAX_CONCURRENCY:
+        failures.append("the cookie set by the server was never sent back")
+    if failures:
+        print("\n" + "\n".join(f"FAILED: {failure}" for failure in failures))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+"""Measure the cold start of `open_deep_research.graph` with `python -X importtime`.
+
+Usage:
+    python benchmarks/import_time.py [--runs 5] [--top 10]
+
+Each run imports the graph in a fresh interpreter, so nothing is cached in memory. The graph
+alone loads no search SDK; the second row also imports every module of search_backends, as
+utils.py did at load time before search backends were imported on first use.
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+from open_deep_research.search_backends import SEARCH_BACKENDS
+
+# Lines of -X importtime: "import time: self [us] | cumulative | imported package"
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+def import_times(statement: str) -> Tuple[int, Dict[str, int]]:
+    """Run a statement in a fresh interpreter and get its total import time and the cumulative time of each top-level import, in microseconds."""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            capture_output=True, text=True, check=True).stderr
+    top_level = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and not match.group(3):
+            top_level[match.group(4)] = int(match.group(2))
+    return sum(top_level.values()), top_level
+
+def measure(statement: str, runs: int) -> Tuple[float, Dict[str, int]]:
+    """Get the median total import time of a statement in milliseconds, and the times of its slowest run."""
+    results = sorted((import_times(statement) for _ in range(runs)), key=lambda result: result[0])
+    return statistics.median(total for total, _ in results) / 1000, results[-1][1]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest search backend imports to list")
+    args = parser.parse_args()
+
+    backend_modules: List[str] = [backend.module for backend in SEARCH_BACKENDS.values()]
+    graph_ms, _ = measure("import open_deep_research.graph", args.runs)
+    eager_ms, eager_times = measure("import open_deep_research.graph; " + "; ".join(f"import {m}" for m in backend_modules), args.runs)
+
+    print(f"{'cold start':<32} {'median ms':>10}")
+    print(f"{'graph':<32} {graph_ms:>10.0f}")
+    print(f"{'graph + every search backend':<32} {eager_ms:>10.0f}")
+    print("\nSlowest search backend imports (ms, slowest run, after the graph):")
+    backend_times = sorted(((eager_times.get(m, 0), m) for m in backend_modules), reverse=True)[:args.top]
+    for micros, module_name in backend_times:
+        print(f"{module_name:<50} {micros / 1000:>8.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Measure the memory taken by search results, as Tavily-shaped dicts and as slotted SearchResults.
+
+Usage:
+    python benchmarks/result_memory.py [--results 10000] [--results-per-response 5]
+
+The strings of the results (titles, URLs, snippets and raw content) are built first and shared
+by both representations, so only the containers holding them are measured: the response and
+result dicts with their keys, or the SearchResponse and SearchResult objects.
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Any, Callable, List, Tuple
+
+from open_deep_research.search_results import SearchResponse, SearchResult
+
+def make_strings(num_results: int) -> List[Tuple[str, str, str, str]]:
+    """Build the title, URL, snippet and raw content of each result."""
+    return [(f"Result {i}", f"https://example.com/{i}", f"Snippet {i}", f"Raw content {i} " * 8)
+            for i in range(num_results)]
+
+def build_dicts(strings: List[Tuple[str, str, str, str]], per_response: int) -> List[dict]:
+    """Build responses the way the search backends did before SearchResponse, with Tavily's unused fields."""
+    return [{
+        "query": f"Query {start}",
+        "follow_up_questions": None,
+        "answer": None,
+        "images": [],
+        "results": [{"title": title, "url": url, "content": content, "score": 0.5, "raw_content": raw_content}
+                    for title, url, content, raw_content in strings[start:start + per_response]],
+    } for start in range(0, len(strings), per_response)]
+
+def build_objects(strings: List[Tuple[str, str, str, str]], per_response: int) -> List[SearchResponse]:
+    """Build the same responses as SearchResponse and SearchResult objects."""
+    return [SearchResponse(
+        query=f"Query {start}",
+        results=[SearchResult(title=title, url=url, content=content, score=0.5, raw_content=raw_content)
+                 for title, url, content, raw_content in strings[start:start + per_response]],
+    ) for start in range(0, len(strings), per_response)]
+
+def measure(build: Callable[[], Any]) -> Tuple[int, float]:
+    """Get the bytes allocated by a build, and the seconds it took, while keeping what it built alive."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    built = build()
+    elapsed = time.perf_counter() - start
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del built
+    return allocated, elapsed
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--results", type=int, default=10_000)
+    parser.add_argument("--results-per-response", type=int, default=5)
+    args = parser.parse_args()
+
+    strings = make_strings(args.results)
+    runs = {
+        "dicts": measure(lambda: build_dicts(strings, args.results_per_response)),
+        "SearchResult": measure(lambda: build_objects(strings, args.results_per_response)),
+    }
+
+    print(f"{args.results:,} results, {args.results_per_response} per response, strings excluded")
+    print(f"{'representation':<14} {'bytes':>12} {'bytes/result':>13} {'build ms':>9}")
+    for name, (allocated, elapsed) in runs.items():
+        print(f"{name:<14} {allocated:>12,} {allocated / args.results:>13.0f} {elapsed * 1000:>9.1f}")
+    print(f"SearchResult takes {runs['SearchResult'][0] / runs['dicts'][0]:.0%} of the memory of dicts")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Measure report latency, throughput and peak memory of the report graph, offline.
+
+Usage:
+    python benchmarks/throughput.py [--sections 4,8] [--queries 2,4] [--max-search-depth 1,2] [--search-api tavily,exa]
+                                    [--reports 20] [--concurrency 4] [--llm-latency 0.05] [--search-latency 0.2]
+                                    [--batch-section-queries] [--output results.json] [--baseline results.json] [--tolerance 0.2]
+
+Runs the real report graph, with plans approved automatically, against fake chat models and local
+stand-ins of the search APIs that sleep for the given latencies. Every combination of section count,
+number_of_queries, max_search_depth and search API is a scenario, run in a fresh process so that its
+peak RSS is its own. For each scenario, `--reports` reports run with `--concurrency` at a time.
+With `--batch-section-queries`, the first queries of all sections are written in one call.
+
+With `--baseline`, the results are compared to an earlier `--output` file and the script exits with
+status 1 if a scenario's throughput dropped, or its p95 latency rose, by more than `--tolerance`.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from fakes import FakeChatModel, fake_backends
+from open_deep_research.checkpointing import open_checkpointer
+from open_deep_research.configuration import SearchAPI
+from open_deep_research.graph import builder
+
+def percentile(values: List[float], q: float) -> float:
+    """Compute a percentile with linear interpolation between the closest ranks."""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def peak_rss_mb() -> float:
+    """Get the peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+async def run_reports(scenario: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run the reports of one scenario and measure them."""
+    chat_model = FakeChatModel(num_sections=scenario["sections"], num_queries=scenario["queries"], latency=options["llm_latency"])
+    semaphore = asyncio.Semaphore(options["concurrency"])
+    latencies = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir, fake_backends(chat_model, search_latency=options["search_latency"]):
+        if options["checkpointer"] == "none":
+            graph = builder.compile()
+            checkpointer_context = None
+        else:
+            checkpointer_context = open_checkpointer(options["checkpointer"], os.path.join(tmp_dir, "checkpoints.sqlite"))
+            graph = builder.compile(checkpointer=await checkpointer_context.__aenter__())
+
+        async def run_report(i: int) -> None:
+            config = {"configurable": {"thread_id": f"report-{i}",
+                                       "plan_approval": "auto",
+                                       "search_api": scenario["search_api"],
+                                       "number_of_queries": scenario["queries"],
+                                       "max_search_depth": scenario["max_search_depth"],
+                                       "batch_section_queries": options["batch_section_queries"]}}
+            async with semaphore:
+                start = time.perf_counter()
+                await graph.ainvoke({"topic": f"Benchmark topic {i}"}, config)
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(run_report(i) for i in range(options["reports"])))
+        elapsed = time.perf_counter() - start
+
+        if checkpointer_context is not None:
+            await checkpointer_context.__aexit__(None, None, None)
+
+    return {
+        **scenario,
+        "reports": options["reports"],
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "reports_per_minute": options["reports"] / elapsed * 60,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def run_scenario(scenario: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one scenario, meant to be called in a fresh process."""
+    return asyncio.run(run_reports(scenario, options))
+
+def scenario_key(result: Dict[str, Any]) -> str:
+    """Identify a scenario across result files."""
+    return f"sections={result['sections']} queries={result['queries']} depth={result['max_search_depth']} search={result['search_api']}"
+
+def find_regressions(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    """List the scenarios that got slower than the baseline by more than the tolerance."""
+    baseline_by_key = {scenario_key(b): b for b in baseline}
+    regressions = []
+    for result in results:
+        base = baseline_by_key.get(scenario_key(result))
+        if base is None:
+            continue
+        if result["reports_per_minute"] < base["reports_per_minute"] * (1 - tolerance):
+            regressions.append(f"{scenario_key(result)}: {result['reports_per_minute']:.1f} reports/min, "
+                               f"baseline {base['reports_per_minute']:.1f}")
+        if result["p95"] > base["p95"] * (1 + tolerance):
+            regressions.append(f"{scenario_key(result)}: p95 {result['p95']:.2f}s, baseline {base['p95']:.2f}s")
+    return regressions
+
+def int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",")]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int_list, default=[4, 8], help="Sections per plan, two of them without research")
+    parser.add_argument("--queries", type=int_list, default=[2], help="number_of_queries values")
+    parser.add_argument("--max-search-depth", type=int_list, default=[1, 2], help="max_search_depth values")
+    parser.add_argument("--search-api", default="tavily", help="Comma-separated search APIs, or 'all'")
+    parser.add_argument("--reports", type=int, default=20, help="Reports per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="Reports run at once")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per LLM call")
+    parser.add_argument("--search-latency", type=float, default=0.2, help="Seconds per search query")
+    parser.add_argument("--batch-section-queries", action="store_true", help="Write the first queries of all sections in one call")
+    parser.add_argument("--checkpointer", choices=["none", "memory", "sqlite"], default="none")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare the results to this JSON file from an earlier --output")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression against the baseline")
+    args = parser.parse_args()
+
+    search_apis = [api.value for api in SearchAPI] if args.search_api == "all" else args.search_api.split(",")
+    scenarios = [{"sections": sections, "queries": queries, "max_search_depth": depth, "search_api": search_api}
+                 for sections in args.sections
+                 for queries in args.queries
+                 for depth in args.max_search_depth
+                 for search_api in search_apis]
+    options = {"reports": args.reports, "concurrency": args.concurrency, "llm_latency": args.llm_latency,
+               "search_latency": args.search_latency, "checkpointer": args.checkpointer,
+               "batch_section_queries": args.batch_section_queries}
+
+    print(f"{'scenario':<52} {'p50 s':>7} {'p95 s':>7} {'reports/min':>12} {'peak RSS MiB':>13}")
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for scenario in scenarios:
+        # A fresh process per scenario, so that peak RSS is not carried over from the previous one
+        with context.Pool(1) as pool:
+            result = pool.apply(run_scenario, (scenario, options))
+        results.append(result)
+        print(f"{scenario_key(result):<52} {result['p50']:>7.2f} {result['p95']:>7.2f} "
+              f"{result['reports_per_minute']:>12.1f} {result['peak_rss_mb']:>13.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"options": options, "results": results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
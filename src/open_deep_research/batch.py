@@ -0,0 +1,313 @@
+"""Generate reports for many topics at once, without human review of the plans.
+
+Usage:
+    open-deep-research-batch topics.jsonl --output-dir reports/ [--max-concurrency 4] [--config '{"search_api": "pubmed"}']
+
+Each line of the topics file is a JSON object with a `topic`, an optional `id` and an optional
+`config` of configurable fields for that topic only. Reports are written to `<output-dir>/reports/<id>.md`
+and per-topic metrics to `<output-dir>/metrics.jsonl`. Progress is checkpointed in the output
+directory, so running the same command again after a crash skips finished topics and resumes
+unfinished reports where they stopped.
+
+With `--record traffic.jsonl.gz`, every search and LLM call is archived. Running the same topics
+with `--replay traffic.jsonl.gz` into a new output directory then needs no network access or API
+keys, which makes slow or bad reports reproducible and lets profiling run offline.
+
+With `--llm-batch`, calls to Anthropic and OpenAI models go through their batch endpoints, which
+cost less but may take hours. Reports stop at every LLM call, the calls of all reports are
+submitted together, and each report resumes from its checkpoint when its results arrive. Raise
+`--max-concurrency` so that many reports share each batch. Running the same command again after
+a stop picks up the batches still in progress. `ANTHROPIC_BASE_URL` and `OPENAI_BASE_URL` point
+the batches to other servers, such as the stand-in in `benchmarks/batch_server.py`.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+import traceback
+from contextlib import AsyncExitStack, nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from langgraph.types import Command
+
+from open_deep_research.checkpointing import CheckpointerBackend, compact_thread, open_checkpointer
+from open_deep_research.configuration import PlanApproval
+from open_deep_research.graph import builder
+from open_deep_research.instrumentation import RunInstrumentation
+from open_deep_research.llm_batch import LLMBatchQueue, batch_clients, batch_llm_calls, get_llm_batch_queue, llm_batch_keys
+from open_deep_research.traffic import record_traffic, replay_traffic
+
+# Decides on a report plan: return True to approve it, or a string of feedback to regenerate it.
+# Called with the topic, the plan presented for review and the number of revisions so far.
+PlanPolicy = Callable[[str, str, int], Union[bool, str]]
+
+def approve_plan(topic: str, plan: str, revision: int) -> Union[bool, str]:
+    """Plan policy that approves every plan as generated."""
+    return True
+
+def feedback_once_policy(feedback: str) -> PlanPolicy:
+    """Plan policy that regenerates every plan once with the same feedback, then approves it."""
+    def policy(topic: str, plan: str, revision: int) -> Union[bool, str]:
+        return feedback if revision == 0 else True
+    return policy
+
+@dataclass
+class BatchTopic:
+    """A topic to write a report on."""
+    topic: str # Report topic
+    id: str # Identifier of the report, used for its file name and checkpoint thread
+    config: Dict[str, Any] = field(default_factory=dict) # Configurable fields for this topic only
+
+def load_topics(path: str) -> List[BatchTopic]:
+    """Load the topics of a batch from a JSONL file.
+
+    Args:
+        path: JSONL file with one object per line, each with a `topic` and optionally an `id` and a `config`
+
+    Returns:
+        The topics, in file order. Topics without an ID get one derived from the topic text.
+
+    Raises:
+        ValueError: If a line has no topic, or two topics have the same ID
+    """
+    topics = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if not item.get("topic"):
+                raise ValueError(f"Line {line_number} of {path} has no topic")
+            topic_id = str(item.get("id") or hashlib.sha256(item["topic"].encode("utf-8")).hexdigest()[:16])
+            topics.append(BatchTopic(topic=item["topic"], id=topic_id, config=item.get("config") or {}))
+
+    ids = [t.id for t in topics]
+    duplicates = sorted({i for i in ids if ids.count(i) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate topic IDs in {path}: {', '.join(duplicates)}")
+    return topics
+
+class StartRateLimiter:
+    """Spaces out the start of reports so that at most `per_minute` start in any minute."""
+
+    def __init__(self, per_minute: Optional[float]) -> None:
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self.next_start = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        """Wait until the next report may start."""
+        if not self.interval:
+            return
+        async with self.lock:
+            delay = self.next_start - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.next_start = max(self.next_start, time.monotonic()) + self.interval
+
+def load_completed_ids(metrics_path: str, reports_dir: str) -> set:
+    """Get the IDs of the topics whose report was already written by an earlier run of the batch."""
+    completed = set()
+    if not os.path.exists(metrics_path):
+        return completed
+    with open(metrics_path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            metrics = json.loads(line)
+            if metrics.get("status") == "completed" and os.path.exists(os.path.join(reports_dir, f"{metrics['id']}.md")):
+                completed.add(metrics["id"])
+    return completed
+
+async def run_topic(graph, item: BatchTopic, configurable: Dict[str, Any], plan_policy: PlanPolicy,
+                    max_plan_revisions: int, callbacks: List[Any]) -> str:
+    """Run the report graph for one topic to completion, deciding on plans with the plan policy.
+
+    If the checkpointer already has a thread for the topic, the report resumes where it stopped.
+    While a batch queue is active, the report waits for the results of its LLM calls and resumes.
+
+    Args:
+        graph: Report graph compiled with a checkpointer
+        item: Topic to write a report on
+        configurable: Configurable fields for the run
+        plan_policy: Decides on each plan presented for review
+        max_plan_revisions: Plans are approved once they have been revised this many times
+        callbacks: Callback handlers for the run
+
+    Returns:
+        The final report
+    """
+    thread = {"configurable": {**configurable, **item.config, "thread_id": item.id}, "callbacks": callbacks}
+
+    # Start a new report, or resume the one left by an earlier run
+    state = await graph.aget_state(thread)
+    graph_input = {"topic": item.topic} if not state.values else None
+    revision = 0
+
+    while True:
+        await graph.ainvoke(graph_input, thread)
+        state = await graph.aget_state(thread)
+        interrupts = [interrupt for task in state.tasks for interrupt in task.interrupts]
+        if not interrupts:
+            break
+
+        # The graph is waiting for LLM calls submitted in batches, rerun their nodes once they are done
+        batch_keys = llm_batch_keys([interrupt.value for interrupt in interrupts])
+        if batch_keys:
+            await get_llm_batch_queue().wait(batch_keys)
+            graph_input = None
+            continue
+
+        # The graph is waiting for a decision on the plan
+        decision = plan_policy(item.topic, interrupts[0].value, revision)
+        if revision >= max_plan_revisions:
+            decision = True
+        graph_input = Command(resume=decision)
+        revision += 1
+
+    return state.values["final_report"]
+
+async def run_batch(topics: List[BatchTopic], output_dir: str, configurable: Optional[Dict[str, Any]] = None,
+                    plan_policy: PlanPolicy = approve_plan, max_plan_revisions: int = 2, max_concurrency: int = 4,
+                    reports_per_minute: Optional[float] = None,
+                    checkpointer_backend: Union[CheckpointerBackend, str] = CheckpointerBackend.SQLITE,
+                    llm_batch_queue: Optional[LLMBatchQueue] = None) -> List[Dict[str, Any]]:
+    """Generate a report for every topic, several at a time.
+
+    Topics whose report was written by an earlier run with the same output directory are skipped.
+    With the SQLite checkpointer, unfinished reports resume from their last checkpoint.
+
+    Args:
+        topics: Topics to write reports on
+        output_dir: Directory for the reports, metrics, checkpoints and blobs
+        configurable: Configurable fields shared by all topics
+        plan_policy: Decides on each plan presented for review, approves every plan by default
+        max_plan_revisions: Plans are approved once they have been revised this many times
+        max_concurrency: Number of reports generated at once
+        reports_per_minute: Maximum number of reports started per minute, unlimited by default
+        checkpointer_backend: Checkpointer for the report threads, SQLite to resume after a crash
+        llm_batch_queue: Queue to run LLM calls through provider batch endpoints, called directly if None
+
+    Returns:
+        Metrics of the topics run by this call, in completion order
+    """
+    reports_dir = os.path.join(output_dir, "reports")
+    metrics_path = os.path.join(output_dir, "metrics.jsonl")
+    os.makedirs(reports_dir, exist_ok=True)
+
+    # Blobs must outlive the process along with the checkpoints that refer to them
+    configurable = {"blob_store_path": os.path.join(output_dir, "blobs"), **(configurable or {})}
+
+    # Nodes run again after each batch, so searches they already made are replayed from a cache. Only
+    # identical queries are replayed, so topics never get each other's sources for similar queries.
+    if llm_batch_queue is not None and not configurable.get("search_cache_path"):
+        configurable.update(search_cache_path=os.path.join(output_dir, "search_cache"), search_cache_threshold=1.0)
+
+    # Plans that are approved as generated skip the review interrupt altogether
+    if plan_policy is approve_plan:
+        configurable.setdefault("plan_approval", PlanApproval.AUTO.value)
+
+    completed_ids = load_completed_ids(metrics_path, reports_dir)
+    pending = [item for item in topics if item.id not in completed_ids]
+    print(f"{len(topics) - len(pending)} of {len(topics)} reports already done, generating {len(pending)}")
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    rate_limiter = StartRateLimiter(reports_per_minute)
+    metrics_lock = asyncio.Lock()
+    all_metrics = []
+
+    async with AsyncExitStack() as stack:
+        checkpointer = await stack.enter_async_context(
+            open_checkpointer(checkpointer_backend, os.path.join(output_dir, "checkpoints.sqlite"))
+        )
+        graph = builder.compile(checkpointer=checkpointer)
+
+        async def process(item: BatchTopic) -> None:
+            async with semaphore:
+                await rate_limiter.wait()
+                instrumentation = RunInstrumentation()
+                start = time.perf_counter()
+                metrics = {"id": item.id, "topic": item.topic}
+                try:
+                    report = await run_topic(graph, item, configurable, plan_policy, max_plan_revisions, [instrumentation])
+                    with open(os.path.join(reports_dir, f"{item.id}.md"), "w", encoding="utf-8") as f:
+                        f.write(report)
+                    await compact_thread(checkpointer, item.id)
+                    metrics.update(status="completed", report_chars=len(report))
+                except Exception as e:
+                    print(f"Error generating report '{item.id}': {str(e)}")
+                    metrics.update(status="failed", error=str(e), traceback=traceback.format_exc())
+                metrics.update(wall_time=time.perf_counter() - start, 
+                               llm_usage=instrumentation.totals(), 
+                               nodes=instrumentation.node_totals(), 
+                               search=instrumentation.search_totals())
+
+                async with metrics_lock:
+                    all_metrics.append(metrics)
+                    with open(metrics_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(metrics) + "\n")
+                    print(f"[{len(all_metrics)}/{len(pending)}] {metrics['status']}: {item.id} ({metrics['wall_time']:.1f}s)")
+
+        with batch_llm_calls(llm_batch_queue) if llm_batch_queue is not None else nullcontext():
+            await asyncio.gather(*(process(item) for item in pending))
+
+    return all_metrics
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run a batch of reports from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("topics", help="JSONL file with one topic per line")
+    parser.add_argument("--output-dir", required=True, help="Directory for reports, metrics and checkpoints")
+    parser.add_argument("--config", default="{}", help="JSON object of configurable fields shared by all topics")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="Number of reports generated at once")
+    parser.add_argument("--reports-per-minute", type=float, default=None, help="Maximum number of reports started per minute")
+    parser.add_argument("--plan-feedback", default=None, help="Feedback to regenerate every plan with once, before approving it")
+    parser.add_argument("--checkpointer", choices=[b.value for b in CheckpointerBackend], default=CheckpointerBackend.SQLITE.value,
+                        help="Checkpointer for report threads, sqlite resumes unfinished reports after a crash")
+    traffic = parser.add_mutually_exclusive_group()
+    traffic.add_argument("--record", help="Record every search and LLM call to this archive (.jsonl.gz)")
+    traffic.add_argument("--replay", help="Serve every search and LLM call from this archive, made by --record, without network access")
+    parser.add_argument("--replay-latency", choices=["zero", "original"], default="zero",
+                        help="Whether replayed calls take no time or as long as they did when recorded")
+    parser.add_argument("--llm-batch", action="store_true",
+                        help="Run Anthropic and OpenAI calls through their batch endpoints. Searches repeated when nodes "
+                             "run again after a batch are replayed from an exact-match cache in <output-dir>/search_cache")
+    parser.add_argument("--llm-batch-poll-interval", type=float, default=60.0, help="Seconds between polls of batches in progress")
+    parser.add_argument("--llm-batch-window", type=float, default=10.0, 
+                        help="Seconds without new LLM calls after which the waiting calls are submitted")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        traffic_context = record_traffic(args.record)
+    elif args.replay:
+        traffic_context = replay_traffic(args.replay, original_latency=args.replay_latency == "original")
+    else:
+        traffic_context = nullcontext()
+
+    configurable = json.loads(args.config)
+    llm_batch_queue = None
+    if args.llm_batch:
+        llm_batch_queue = LLMBatchQueue(os.path.join(args.output_dir, "llm_batches"), batch_clients(configurable.get("api_keys")),
+                                        collect_window=args.llm_batch_window, poll_interval=args.llm_batch_poll_interval)
+
+    plan_policy = feedback_once_policy(args.plan_feedback) if args.plan_feedback else approve_plan
+    with traffic_context:
+        metrics = asyncio.run(run_batch(load_topics(args.topics), args.output_dir,
+                                        configurable=configurable,
+                                        plan_policy=plan_policy,
+                                        max_concurrency=args.max_concurrency,
+                                        reports_per_minute=args.reports_per_minute,
+                                        checkpointer_backend=args.checkpointer,
+                                        llm_batch_queue=llm_batch_queue))
+
+    failed = [m["id"] for m in metrics if m["status"] != "completed"]
+    print(f"Generated {len(metrics) - len(failed)} reports, {len(failed)} failed")
+    if failed:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+
+# Prefix of the handles that stand in for blobs in the graph state
+BLOB_REF_PREFIX = "blob:sha256:"
+
+class BlobStore(ABC):
+    """Content-addressed store for large strings kept out of the graph state.
+
+    Blobs are keyed by the SHA-256 of their content, so storing the same string twice is free
+    and a handle always resolves to the exact string it was created from.
+    """
+
+    def put(self, data: str) -> str:
+        """Store a string and return its handle."""
+        key = hashlib.sha256(data.encode("utf-8")).hexdigest()
+        self._write(key, data)
+        return BLOB_REF_PREFIX + key
+
+    def get(self, ref: str) -> str:
+        """Return the string a handle refers to.
+
+        Raises:
+            KeyError: If the blob is not in the store
+        """
+        return self._read(ref[len(BLOB_REF_PREFIX):])
+
+    @abstractmethod
+    def prune(self, max_age_seconds: float) -> int:
+        """Delete blobs that have not been stored or read for longer than max_age_seconds.
+
+        Returns:
+            Number of deleted blobs
+        """
+
+    @abstractmethod
+    def _write(self, key: str, data: str) -> None:
+        """Store the content of a blob under its key."""
+
+    @abstractmethod
+    def _read(self, key: str) -> str:
+        """Return the content of a blob, marking it as used.
+
+        Raises:
+            KeyError: If the blob is not in the store
+        """
+
+class InMemoryBlobStore(BlobStore):
+    """Blob store that keeps blobs in process memory. Pairs with the in-memory checkpointer."""
+
+    def __init__(self) -> None:
+        self._blobs: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _write(self, key: str, data: str) -> None:
+        with self._lock:
+            self._blobs[key] = (data, time.time())
+
+    def _read(self, key: str) -> str:
+        with self._lock:
+            data, _ = self._blobs[key]
+            self._blobs[key] = (data, time.time())
+            return data
+
+    def prune(self, max_age_seconds: float) -> int:
+        cutoff = time.time() - max_age_seconds
+        with self._lock:
+            expired = [key for key, (_, last_used) in self._blobs.items() if last_used < cutoff]
+            for key in expired:
+                del self._blobs[key]
+        return len(expired)
+
+class FileBlobStore(BlobStore):
+    """Blob store that keeps one file per blob in a local directory.
+
+    The directory can be shared by several worker processes, alongside a SQLite checkpointer.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _blob_path(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], key)
+
+    def _write(self, key: str, data: str) -> None:
+        blob_path = self._blob_path(key)
+        if os.path.exists(blob_path):
+            # Same content is already stored, just mark it as used
+            os.utime(blob_path)
+            return
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        # Write to a temporary file first, so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(blob_path))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, blob_path)
+
+    def _read(self, key: str) -> str:
+        blob_path = self._blob_path(key)
+        try:
+            with open(blob_path, encoding="utf-8") as f:
+                data = f.read()
+        except FileNotFoundError:
+            raise KeyError(key)
+        os.utime(blob_path)
+        return data
+
+    def prune(self, max_age_seconds: float) -> int:
+        cutoff = time.time() - max_age_seconds
+        deleted = 0
+        for root, _, files in os.walk(self.path):
+            for name in files:
+                blob_path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(blob_path) < cutoff:
+                        os.remove(blob_path)
+                        deleted += 1
+                except FileNotFoundError:
+                    continue
+        return deleted
+
+# One store per path, shared by every node of every run in this process
+_blob_stores: Dict[Optional[str], BlobStore] = {}
+_blob_stores_lock = threading.Lock()
+
+def get_blob_store(path: Optional[str] = None) -> BlobStore:
+    """Get the blob store for a directory, or the process-wide in-memory store if path is None."""
+    with _blob_stores_lock:
+        if path not in _blob_stores:
+            _blob_stores[path] = InMemoryBlobStore() if path is None else FileBlobStore(path)
+        return _blob_stores[path]
+
+def store_blob(store: BlobStore, data: str, min_size: int) -> str:
+    """Move a string into the blob store if it is large, and return what to keep in the state.
+
+    Args:
+        store: Blob store for large strings
+        data: String to keep in the state
+        min_size: Strings shorter than this many characters are kept inline
+
+    Returns:
+        A handle to the stored blob, or the string itself if it is small
+    """
+    if not data or len(data) < min_size:
+        return data
+    return store.put(data)
+
+def load_blob(store: BlobStore, value: str) -> str:
+    """Resolve a value from the state that may be a blob handle.
+
+    Args:
+        store: Blob store the handle was created in
+        value: Handle returned by store_blob, or an inline string
+
+    Returns:
+        The original string
+    """
+    if value and value.startswith(BLOB_REF_PREFIX):
+        return store.get(value)
+    return value
@@ -0,0 +1,146 @@
+import time
+import weakref
+from contextlib import asynccontextmanager
+from enum import Enum
+from typing import AsyncIterator, Dict, List, Optional, Union
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+
+class CheckpointerBackend(Enum):
+    MEMORY = "memory"
+    SQLITE = "sqlite"
+
+# Process-wide in-memory checkpointer, shared by every caller of open_checkpointer
+_memory_checkpointer: Optional[MemorySaver] = None
+
+# Last activity per thread for in-memory checkpointers. SQLite keeps it in the database instead,
+# so that several workers sharing one database see each other's threads.
+_memory_thread_activity: "weakref.WeakKeyDictionary[MemorySaver, Dict[str, float]]" = weakref.WeakKeyDictionary()
+
+@asynccontextmanager
+async def open_checkpointer(backend: Union[CheckpointerBackend, str], path: str = "checkpoints.sqlite") -> AsyncIterator[BaseCheckpointSaver]:
+    """Open a checkpointer for the selected backend.
+
+    The memory backend keeps every thread in this process and is shared by all callers. The SQLite
+    backend stores threads in a local database file that several worker processes can share. It
+    requires the `langgraph-checkpoint-sqlite` package.
+
+    Args:
+        backend: Checkpointer backend to use
+        path: Database file for the SQLite backend
+
+    Yields:
+        The checkpointer, ready to be passed to `builder.compile(checkpointer=...)`
+    """
+    global _memory_checkpointer
+    backend = CheckpointerBackend(backend)
+
+    if backend == CheckpointerBackend.MEMORY:
+        if _memory_checkpointer is None:
+            _memory_checkpointer = MemorySaver()
+        yield _memory_checkpointer
+
+    elif backend == CheckpointerBackend.SQLITE:
+        try:
+            from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+        except ImportError as e:
+            raise ImportError("The SQLite checkpointer requires the langgraph-checkpoint-sqlite package. "
+                              "Install it with `pip install open-deep-research[sqlite]`.") from e
+
+        async with AsyncSqliteSaver.from_conn_string(path) as checkpointer:
+            await checkpointer.setup()
+            await checkpointer.conn.execute(
+                "CREATE TABLE IF NOT EXISTS thread_activity (thread_id TEXT PRIMARY KEY, last_seen REAL NOT NULL)"
+            )
+            await checkpointer.conn.commit()
+            yield checkpointer
+
+def _is_sqlite(checkpointer: BaseCheckpointSaver) -> bool:
+    """Check whether a checkpointer stores its threads in SQLite."""
+    return type(checkpointer).__name__ == "AsyncSqliteSaver"
+
+async def touch_thread(checkpointer: BaseCheckpointSaver, thread_id: str) -> None:
+    """Mark a thread as active now, so that it is not evicted.
+
+    Args:
+        checkpointer: Checkpointer that stores the thread
+        thread_id: Thread to mark as active
+    """
+    now = time.time()
+    if _is_sqlite(checkpointer):
+        await checkpointer.conn.execute(
+            "INSERT INTO thread_activity (thread_id, last_seen) VALUES (?, ?) "
+            "ON CONFLICT(thread_id) DO UPDATE SET last_seen = excluded.last_seen",
+            (thread_id, now),
+        )
+        await checkpointer.conn.commit()
+    else:
+        _memory_thread_activity.setdefault(checkpointer, {})[thread_id] = now
+
+async def evict_expired_threads(checkpointer: BaseCheckpointSaver, ttl_seconds: float) -> List[str]:
+    """Delete every thread that has not been active for longer than the TTL.
+
+    Only threads marked with `touch_thread` are tracked.
+
+    Args:
+        checkpointer: Checkpointer that stores the threads
+        ttl_seconds: Time since the last activity after which a thread is deleted
+
+    Returns:
+        The IDs of the deleted threads
+    """
+    cutoff = time.time() - ttl_seconds
+    if _is_sqlite(checkpointer):
+        async with checkpointer.conn.execute(
+            "SELECT thread_id FROM thread_activity WHERE last_seen < ?", (cutoff,)
+        ) as cursor:
+            expired = [row[0] for row in await cursor.fetchall()]
+    else:
+        activity = _memory_thread_activity.get(checkpointer, {})
+        expired = [thread_id for thread_id, last_seen in activity.items() if last_seen < cutoff]
+
+    for thread_id in expired:
+        await checkpointer.adelete_thread(thread_id)
+        if _is_sqlite(checkpointer):
+            await checkpointer.conn.execute("DELETE FROM thread_activity WHERE thread_id = ?", (thread_id,))
+        else:
+            _memory_thread_activity[checkpointer].pop(thread_id, None)
+
+    if expired and _is_sqlite(checkpointer):
+        await checkpointer.conn.commit()
+    return expired
+
+async def compact_thread(checkpointer: BaseCheckpointSaver, thread_id: str) -> None:
+    """Drop every checkpoint of a thread except the latest one of the parent graph.
+
+    The latest checkpoint holds the full state, along with the pending writes needed to resume
+    an interrupt, so the thread can still be resumed. Earlier checkpoints and the checkpoints of
+    finished section subgraphs only keep old copies of bulky state such as source strings. Only
+    call this between runs of a thread, never while a run is in progress.
+
+    Only the SQLite backend is compacted. In-memory threads are bounded by TTL eviction only.
+
+    Args:
+        checkpointer: Checkpointer that stores the thread
+        thread_id: Thread to compact
+    """
+    if not _is_sqlite(checkpointer):
+        return
+
+    async with checkpointer.conn.execute(
+        "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = '' "
+        "ORDER BY checkpoint_id DESC LIMIT 1",
+        (thread_id,),
+    ) as cursor:
+        row = await cursor.fetchone()
+    if row is None:
+        return
+
+    latest_checkpoint_id = row[0]
+    for table in ("checkpoints", "writes"):
+        await checkpointer.conn.execute(
+            f"DELETE FROM {table} WHERE thread_id = ? AND NOT (checkpoint_ns = '' AND checkpoint_id = ?)",
+            (thread_id, latest_checkpoint_id),
+        )
+    await checkpointer.conn.commit()
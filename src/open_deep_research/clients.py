@@ -0,0 +1,42 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Number of search API clients kept per search API, least recently used first out
+SEARCH_CLIENT_CACHE_SIZE = 64
+
+def credential_hash(credential: Optional[str]) -> Optional[str]:
+    """Identify a credential without revealing it, or None for no credential."""
+    if not credential:
+        return None
+    return hashlib.sha256(credential.encode("utf-8")).hexdigest()[:16]
+
+class ClientCache(Generic[T]):
+    """Process-wide LRU of API clients, so their connection pools are reused across runs.
+
+    Keys are built with credential_hash rather than the credentials themselves, and only the
+    maxsize most recently used clients are kept, so a long-running multi-tenant server neither
+    holds every tenant's credential in its keys nor a client per tenant forever.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._clients: "OrderedDict[Hashable, T]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, create: Callable[[], T]) -> T:
+        """Get the client of a key, creating it with create on first use."""
+        with self._lock:
+            if key in self._clients:
+                self._clients.move_to_end(key)
+            else:
+                self._clients[key] = create()
+                if len(self._clients) > self.maxsize:
+                    self._clients.popitem(last=False)
+            return self._clients[key]
+
+    def __len__(self) -> int:
+        return len(self._clients)
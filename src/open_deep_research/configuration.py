@@ -1,11 +1,17 @@
+import copy
+import json
 import os
+import threading
+import typing
+from collections import OrderedDict
+from collections.abc import Mapping
 from enum import Enum
+from types import MappingProxyType
 from dataclasses import dataclass, fields
-from typing import Any, Optional, Dict 
+from typing import Any, Optional, Dict, List
 
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.runnables import RunnableConfig
-from dataclasses import dataclass
 
 DEFAULT_REPORT_STRUCTURE = """Use this structure to create a report on the user-provided topic:
 
@@ -28,31 +34,181 @@ class SearchAPI(Enum):
     LINKUP = "linkup"
     DUCKDUCKGO = "duckduckgo"
     GOOGLESEARCH = "googlesearch"
+    LOCAL = "local"
 
-@dataclass(kw_only=True)
+    @classmethod
+    def _missing_(cls, value: Any) -> Optional["SearchAPI"]:
+        """Accept the names of search backends registered by other packages, see search_backends."""
+        from open_deep_research.search_backends import get_search_backend
+        try:
+            get_search_backend(value)
+        except (TypeError, ValueError):
+            return None
+        # Kept as a pseudo-member, so that every lookup of the name gets the same one
+        member = object.__new__(cls)
+        member._name_ = str(value).upper()
+        member._value_ = value
+        return cls._value2member_map_.setdefault(value, member)
+
+class PlanApproval(Enum):
+    AUTO = "auto" # Approve the generated plan without review
+    LLM = "llm" # Have the planner model review the plan
+    HUMAN = "human" # Interrupt for human review of the plan
+
+class ModelRole(Enum):
+    QUERY_WRITER = "query_writer" # Writes search queries, for planning and for sections
+    PLANNER = "planner" # Writes the report plan
+    WRITER = "writer" # Writes sections from their sources
+    GRADER = "grader" # Grades sections and reviews plans
+    FINAL_WRITER = "final_writer" # Writes the sections that need no research, from the researched ones
+
+@dataclass(kw_only=True, frozen=True)
 class Configuration:
     """The configurable fields for the chatbot."""
     report_structure: str = DEFAULT_REPORT_STRUCTURE # Defaults to the default report structure
     number_of_queries: int = 2 # Number of search queries to generate per iteration
     max_search_depth: int = 2 # Maximum number of reflection + search iterations
+    batch_section_queries: bool = False # Generate the first search queries of all research sections in one call once the plan is approved
     planner_provider: str = "google_genai"  # Defaults to Google as provider
     planner_model: str = "gemini-2.0-flash" # Defaults to gemini-2.0-flash
     writer_provider: str = "google_genai" # Defaults to Google as provider
     writer_model: str = "gemini-2.0-flash" # Defaults to gemini-2.0-flash
+    query_writer_provider: Optional[str] = None # Defaults to writer_provider
+    query_writer_model: Optional[str] = None # Defaults to writer_model
+    grader_provider: Optional[str] = None # Defaults to planner_provider
+    grader_model: Optional[str] = None # Defaults to planner_model
+    final_writer_provider: Optional[str] = None # Defaults to writer_provider
+    final_writer_model: Optional[str] = None # Defaults to writer_model
+    model_routes: Optional[Dict[str, List[Dict[str, Any]]]] = None # Candidate models per role with their cost, latency and input size limit, see routing.ModelRoute
+    max_llm_cost_per_call: Optional[float] = None # Routed calls use models expected to cost at most this many USD, when one fits
+    max_llm_latency: Optional[float] = None # Routed calls use models expected to take at most this many seconds, when one fits
     search_api: SearchAPI = SearchAPI.TAVILY # Default to DUCKDUCKGO
     search_api_config: Optional[Dict[str, Any]] = None 
+    fallback_search_api: Optional[SearchAPI] = None # Search API for queries that search_api still fails after retries, e.g. during an outage
+    max_sources: Optional[int] = 8 # Sources kept per search after ranking the results of all queries, all if None
+    source_char_budget: Optional[int] = 64_000 # Characters of formatted sources kept per search, lowest ranked sources are dropped first, unlimited if None
+    search_cache_path: Optional[str] = None # Directory of the semantic search cache shared across runs, no caching if None
+    search_cache_threshold: float = 0.97 # Minimum similarity between a query and a cached query with the same key terms to reuse the cached results
+    search_cache_max_age: Optional[int] = 7 * 24 * 3600 # Cached results older than this many seconds are not reused, no limit if None
+    plan_approval: PlanApproval = PlanApproval.HUMAN # How the report plan is approved before research starts
+    max_plan_revisions: int = 2 # Maximum number of times an LLM review can send the plan back for regeneration
+    api_keys: Optional[Dict[str, str]] = None # Credentials for this run by environment variable name (e.g. {"TAVILY_API_KEY": ...}), falling back to the environment
+    blob_store_path: Optional[str] = None # Directory for large strings kept out of the graph state, defaults to in-memory
+    blob_min_size: int = 1024 # Strings in the graph state of at least this many characters are replaced by blob handles
 
     @classmethod
     def from_runnable_config(
         cls, config: Optional[RunnableConfig] = None
     ) -> "Configuration":
-        """Create a Configuration instance from a RunnableConfig."""
+        """Create a Configuration instance from a RunnableConfig.
+
+        Each field is read from the environment variable of its upper-cased name, then from the 
+        configurable of the config, and keeps its default if neither sets it. Values are coerced 
+        to the type of the field, so strings from environment variables become enums, numbers, 
+        booleans or JSON objects. Falsy values such as max_search_depth=0 are kept.
+
+        Instances are frozen and cached per thread and configurable values, so the nodes and 
+        sections of a run share one instance, resolved and validated by the first node. The 
+        environment is read when an instance is resolved, not on every call. Since the instance 
+        is shared, dict fields such as api_keys are read-only views of a copy of their value.
+
+        Raises:
+            ValueError: If a value cannot be coerced to the type of its field
+        """
         configurable = (
             config["configurable"] if config and "configurable" in config else {}
         )
+        names = _field_names(cls)
+        key = (cls, configurable.get("thread_id"),
+               tuple((k, _freeze(v)) for k, v in configurable.items() if k in names))
+        with _configuration_cache_lock:
+            cached = _configuration_cache.get(key)
+            if cached is not None:
+                _configuration_cache.move_to_end(key)
+                return cached
+
+        types = _field_types(cls)
         values: dict[str, Any] = {
-            f.name: os.environ.get(f.name.upper(), configurable.get(f.name))
-            for f in fields(cls)
-            if f.init
+            name: _coerce(name, value, types[name])
+            for name in names
+            # Empty environment variables count as unset
+            if (value := os.environ.get(name.upper()) or configurable.get(name)) is not None
         }
-        return cls(**{k: v for k, v in values.items() if v})
+        instance = cls(**values)
+        with _configuration_cache_lock:
+            _configuration_cache[key] = instance
+            if len(_configuration_cache) > CONFIGURATION_CACHE_SIZE:
+                _configuration_cache.popitem(last=False)
+        return instance
+
+# Number of resolved configurations kept, one per distinct set of values
+CONFIGURATION_CACHE_SIZE = 256
+
+_configuration_cache: "OrderedDict[Any, Configuration]" = OrderedDict()
+_configuration_cache_lock = threading.Lock()
+_field_names_cache: Dict[type, Dict[str, None]] = {}
+_field_types_cache: Dict[type, Dict[str, Any]] = {}
+
+def _field_names(cls: type) -> Dict[str, None]:
+    """Get the names of the init fields of a configuration class, in order and with fast membership tests."""
+    if cls not in _field_names_cache:
+        _field_names_cache[cls] = dict.fromkeys(f.name for f in fields(cls) if f.init)
+    return _field_names_cache[cls]
+
+def _field_types(cls: type) -> Dict[str, Any]:
+    """Get the type of each field of a configuration class, without Optional."""
+    if cls not in _field_types_cache:
+        types = {}
+        for name, hint in typing.get_type_hints(cls).items():
+            args = [a for a in typing.get_args(hint) if a is not type(None)]
+            types[name] = args[0] if typing.get_origin(hint) is typing.Union and len(args) == 1 else hint
+        _field_types_cache[cls] = types
+    return _field_types_cache[cls]
+
+def _freeze(value: Any) -> Any:
+    """Turn a configuration value into a hashable one with the same content."""
+    if value is None or isinstance(value, (str, int, float)):
+        return (type(value), value)
+    if isinstance(value, Mapping):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, Enum):
+        return (type(value), value.value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return (type(value), value)
+
+def _coerce(name: str, value: Any, field_type: Any) -> Any:
+    """Convert a configuration value to the type of its field."""
+    origin = typing.get_origin(field_type) or field_type
+    try:
+        if isinstance(origin, type) and issubclass(origin, Enum):
+            return value if isinstance(value, origin) else origin(value)
+        if origin is bool:
+            if isinstance(value, str):
+                if value.strip().lower() in ("1", "true", "yes", "on"):
+                    return True
+                if value.strip().lower() in ("0", "false", "no", "off", ""):
+                    return False
+                raise ValueError(value)
+            return bool(value)
+        if origin in (int, float):
+            return origin(value)
+        if origin in (dict, list):
+            # Environment variables hold JSON, other values are copied so that later changes 
+            # to the caller's objects do not reach the shared instance
+            if isinstance(value, str):
+                value = json.loads(value)
+            else:
+                value = copy.deepcopy(dict(value) if isinstance(value, Mapping) else value)
+            if not isinstance(value, origin):
+                raise ValueError(value)
+            # Nor can the nodes sharing the instance change its dicts
+            return MappingProxyType(value) if origin is dict else value
+    except (ValueError, TypeError) as e:
+        expected = f"one of {[m.value for m in origin]}" if isinstance(origin, type) and issubclass(origin, Enum) else origin.__name__
+        raise ValueError(f"Invalid value for configuration field {name}: {value!r}, expected {expected}") from e
+    return value
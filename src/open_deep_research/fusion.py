@@ -0,0 +1,108 @@
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from open_deep_research.search_results import SearchResponse, SearchResult
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Constant of reciprocal-rank fusion: a source ranked r-th (from 1) by a query contributes 1 / (RRF_K + r)
+RRF_K = 60
+
+# Characters each source adds to the formatted string besides its content: title, URL and separators
+SOURCE_OVERHEAD_CHARS = 300
+
+def normalize_scores(results: List[SearchResult]) -> "np.ndarray":
+    """Scale the scores of one search response to [0, 1], so responses of different backends compare.
+
+    Results without a numeric score take the lowest score of the response. If no result has a score,
+    the backend's order is used, best first.
+
+    Args:
+        results: Results of one search response, in the backend's order
+
+    Returns:
+        Normalized score of each result
+    """
+    # numpy is imported on first use, so importing the graph does not pay for it
+    import numpy as np
+
+    count = len(results)
+    scores = np.array([r.score if isinstance(r.score, (int, float)) else np.nan for r in results], dtype=float)
+    if np.isnan(scores).all():
+        return 1.0 - np.arange(count) / count
+    scores = np.where(np.isnan(scores), np.nanmin(scores), scores)
+    spread = scores.max() - scores.min()
+    return (scores - scores.min()) / spread if spread > 0 else np.ones(count)
+
+def estimate_source_chars(source: SearchResult, include_raw_content: bool, max_chars_per_source: int) -> int:
+    """Estimate the length of a source once formatted by deduplicate_and_format_sources."""
+    chars = SOURCE_OVERHEAD_CHARS + len(source.title or "") + len(source.url or "") + len(source.content or "")
+    if include_raw_content:
+        chars += min(len(source.raw_content or ""), max_chars_per_source)
+    return chars
+
+def fuse_search_results(search_results: List[SearchResponse], max_sources: Optional[int] = None,
+                        char_budget: Optional[int] = None, include_raw_content: bool = True,
+                        max_chars_per_source: int = 16_000) -> List[SearchResult]:
+    """Merge the results of several queries into one ranked, deduplicated list of sources.
+
+    Scores are normalized within each response, each response ranks its results by normalized
+    score, and the ranks are combined with reciprocal-rank fusion: a source found by several queries,
+    or ranked high by one, comes first. Ties are broken by the best normalized score of the source.
+    The list is then cut to the top max_sources, and to the longest prefix that fits char_budget.
+
+    Args:
+        search_results: Search responses, one per query, possibly from different backends
+        max_sources: Maximum number of sources to keep, all if None
+        char_budget: Maximum estimated length of the formatted sources, unlimited if None.
+            The top source is always kept.
+        include_raw_content: Whether raw content will be formatted, for the length estimate
+        max_chars_per_source: Length raw content will be truncated to, for the length estimate
+
+    Returns:
+        Sources, best first, each appearing once
+    """
+    import numpy as np
+
+    sources: List[SearchResult] = []
+    source_index: Dict[str, int] = {}
+    indices, contributions, normalized_scores = [], [], []
+
+    for response in search_results:
+        results = response.results
+        if not results:
+            continue
+        normalized = normalize_scores(results)
+
+        # Rank of each result within its response, from 0, by normalized score
+        ranks = np.empty(len(results), dtype=float)
+        ranks[np.argsort(-normalized, kind="stable")] = np.arange(len(results))
+
+        for result in results:
+            if result.url not in source_index:
+                source_index[result.url] = len(sources)
+                sources.append(result)
+        indices.append(np.array([source_index[result.url] for result in results]))
+        contributions.append(1.0 / (RRF_K + ranks + 1))
+        normalized_scores.append(normalized)
+
+    if not sources:
+        return []
+
+    indices = np.concatenate(indices)
+    fused = np.zeros(len(sources))
+    np.add.at(fused, indices, np.concatenate(contributions))
+    best_score = np.zeros(len(sources))
+    np.maximum.at(best_score, indices, np.concatenate(normalized_scores))
+
+    # Sort by fused score, then by best score, both descending
+    order = np.lexsort((-best_score, -fused))
+    if max_sources is not None:
+        order = order[:max_sources]
+
+    if char_budget is not None:
+        sizes = np.array([estimate_source_chars(sources[i], include_raw_content, max_chars_per_source) for i in order])
+        fits = np.cumsum(sizes) <= char_budget
+        order = order[:max(1, int(fits.sum()))]
+
+    return [sources[i] for i in order]
@@ -1,11 +1,19 @@
 import gradio as gr
 import os
 import uuid
-from langgraph.checkpoint.memory import MemorySaver
+from open_deep_research.blobs import get_blob_store
+from open_deep_research.checkpointing import (
+    compact_thread,
+    evict_expired_threads,
+    open_checkpointer,
+    touch_thread,
+)
 from open_deep_research.graph import builder
+from open_deep_research.instrumentation import RunInstrumentation
 from IPython.display import Markdown
 from langgraph.types import Command
 import asyncio
+from contextlib import AsyncExitStack
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -147,18 +155,62 @@ REPORT_STRUCTURE = """You are an AI assistant tasked with generating a clinical
 
 Generate the report following the appropriate structure and instructions based on the user's input. Think step by step, ensuring the report is tailored, comprehensive, and clinically relevant. Let's think step by step."""
 
-# Initialize the graph
-memory = MemorySaver()
-graph = builder.compile(checkpointer=memory)
+# Checkpointer configuration. Use "sqlite" to keep threads in a database file that several workers can share
+CHECKPOINTER_BACKEND = os.getenv("CHECKPOINTER_BACKEND", "memory")
+CHECKPOINTER_PATH = os.getenv("CHECKPOINTER_PATH", "checkpoints.sqlite")
+# Directory for the large strings kept out of the checkpoints. Must be shared by all workers using the same database,
+# so with a SQLite checkpointer it defaults to a directory next to the database rather than to memory
+BLOB_STORE_PATH = os.getenv("BLOB_STORE_PATH") or (
+    os.path.splitext(CHECKPOINTER_PATH)[0] + "_blobs" if CHECKPOINTER_BACKEND == "sqlite" else None
+)
+# Threads and blobs that have not been used for this long are deleted
+THREAD_TTL_SECONDS = float(os.getenv("THREAD_TTL_SECONDS", 24 * 60 * 60))
+# Seconds between two sweeps of the expired threads and blobs, run in the background rather than by requests
+EVICTION_INTERVAL_SECONDS = float(os.getenv("EVICTION_INTERVAL_SECONDS", 10 * 60))
+
+# File to append the node timings and search calls of every run to, as JSONL. Unset to only print a summary
+INSTRUMENTATION_PATH = os.getenv("INSTRUMENTATION_PATH") or None
+
+# Queue configuration: number of requests handled at once per event, and number of requests that can wait
+GRADIO_CONCURRENCY_LIMIT = int(os.getenv("GRADIO_CONCURRENCY_LIMIT", 8))
+GRADIO_MAX_QUEUE_SIZE = int(os.getenv("GRADIO_MAX_QUEUE_SIZE", 64))
+
+# The graph and its checkpointer are created once, on Gradio's event loop, and shared by all requests
+graph = None
+checkpointer = None
+graph_lock = asyncio.Lock()
+graph_exit_stack = AsyncExitStack()
+eviction_task = None
+
+async def evict_periodically(checkpointer):
+    """Delete the expired threads and blobs every EVICTION_INTERVAL_SECONDS, until cancelled."""
+    loop = asyncio.get_running_loop()
+    blob_store = get_blob_store(BLOB_STORE_PATH)
+    while True:
+        try:
+            await evict_expired_threads(checkpointer, THREAD_TTL_SECONDS)
+            # Pruning walks the blob directory, so it runs in a worker thread, off the event loop
+            await loop.run_in_executor(None, blob_store.prune, THREAD_TTL_SECONDS)
+        except Exception as e:
+            print(f"Error evicting expired threads: {str(e)}")
+        await asyncio.sleep(EVICTION_INTERVAL_SECONDS)
+
+async def get_graph():
+    """Compile the graph with its checkpointer on first use, start the eviction of expired threads, and return both."""
+    global graph, checkpointer, eviction_task
+    async with graph_lock:
+        if graph is None:
+            checkpointer = await graph_exit_stack.enter_async_context(
+                open_checkpointer(CHECKPOINTER_BACKEND, CHECKPOINTER_PATH)
+            )
+            graph = builder.compile(checkpointer=checkpointer)
+            eviction_task = asyncio.create_task(evict_periodically(checkpointer))
+    return graph, checkpointer
 
 # Store thread state between interactions
 thread_state = {}
 
 async def generate_report(topic, tavily_api_key, google_api_key, feedback=None, thread_id=None):
-    # Set API keys
-    os.environ["TAVILY_API_KEY"] = tavily_api_key
-    os.environ["GOOGLE_API_KEY"] = google_api_key
-    
     # Configure the thread
     if thread_id is None:
         thread_id = str(uuid.uuid4())
@@ -173,9 +225,35 @@ async def generate_report(topic, tavily_api_key, google_api_key, feedback=None,
             "writer_model": "gemini-2.0-flash",
             "max_search_depth": 2,
             "report_structure": REPORT_STRUCTURE,
+            "blob_store_path": BLOB_STORE_PATH,
+            # API keys of this user, passed to the models and search clients of this run only
+            "api_keys": {
+                "TAVILY_API_KEY": tavily_api_key,
+                "GOOGLE_API_KEY": google_api_key,
+            },
         }
     }
     
+    # Record node timings, token usage and search calls of this run
+    instrumentation = RunInstrumentation()
+    thread["callbacks"] = [instrumentation]
+    
+    graph, checkpointer = await get_graph()
+    await touch_thread(checkpointer, thread_id)
+    
+    result = await stream_report(graph, thread, topic, feedback, thread_id)
+    
+    # Keep only the latest checkpoint of the thread, which is all that is needed to resume it
+    await compact_thread(checkpointer, thread_id)
+    
+    print(f"Run summary for thread {thread_id}:")
+    instrumentation.print_summary()
+    if INSTRUMENTATION_PATH:
+        instrumentation.write_jsonl(INSTRUMENTATION_PATH)
+    
+    return result
+
+async def stream_report(graph, thread, topic, feedback, thread_id):
     result = {}
     
     if feedback is None:
@@ -211,17 +289,6 @@ async def generate_report(topic, tavily_api_key, google_api_key, feedback=None,
     
     return result
 
-def run_report_generation(topic, tavily_api_key, google_api_key, feedback=None, thread_id=None):
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        result = loop.run_until_complete(
-            generate_report(topic, tavily_api_key, google_api_key, feedback, thread_id)
-        )
-        return result
-    finally:
-        loop.close()
-
 with gr.Blocks(theme=gr.themes.Soft()) as demo:
     gr.Markdown("# 🔬 Open Medical Research Assistant")
     gr.Markdown("Generate comprehensive, evidence-based medical reports with AI assistance")
@@ -313,7 +380,7 @@ with gr.Blocks(theme=gr.themes.Soft()) as demo:
                 report_file = gr.File(visible=False, label="Download Report")
     
     # Function to handle initial plan generation
-    def handle_submit(topic, tavily_key, google_key):
+    async def handle_submit(topic, tavily_key, google_key):
         if not topic or not tavily_key or not google_key:
             missing = []
             if not topic: missing.append("Research Topic")
@@ -331,7 +398,7 @@ with gr.Blocks(theme=gr.themes.Soft()) as demo:
         plan_loading.visible = True
         status_indicator.value = "🔍 Analyzing topic and generating research plan..."
             
-        result = run_report_generation(topic, tavily_key, google_key)
+        result = await generate_report(topic, tavily_key, google_key)
         
         if result["status"] == "plan_ready":
             return {
@@ -352,12 +419,12 @@ with gr.Blocks(theme=gr.themes.Soft()) as demo:
             }
     
     # Function to handle plan approval
-    def handle_approve(topic, tavily_key, google_key, current_thread_id):
+    async def handle_approve(topic, tavily_key, google_key, current_thread_id):
         status_indicator.value = "🔍 Researching and generating report based on approved plan..."
         progress_indicator.value = "This may take a few minutes. The system is searching the web and compiling information..."
         progress_indicator.visible = True
         
-        result = run_report_generation(topic, tavily_key, google_key, feedback=True, thread_id=current_thread_id)
+        result = await generate_report(topic, tavily_key, google_key, feedback=True, thread_id=current_thread_id)
         
         if result["status"] == "report_ready":
             return {
@@ -382,7 +449,7 @@ with gr.Blocks(theme=gr.themes.Soft()) as demo:
         }
     
     # Function to handle feedback submission
-    def handle_feedback_submit(topic, tavily_key, google_key, feedback, current_thread_id):
+    async def handle_feedback_submit(topic, tavily_key, google_key, feedback, current_thread_id):
         if not feedback:
             return {
                 status_indicator: gr.Markdown(value="⚠️ Please provide feedback for revision")
@@ -392,7 +459,7 @@ with gr.Blocks(theme=gr.themes.Soft()) as demo:
         revision_loading.visible = True
         status_indicator.value = "🔄 Revising research plan based on your feedback..."
             
-        result = run_report_generation(topic, tavily_key, google_key, feedback=feedback, thread_id=current_thread_id)
+        result = await generate_report(topic, tavily_key, google_key, feedback=feedback, thread_id=current_thread_id)
         
         if result["status"] == "plan_ready":
             return {
@@ -475,5 +542,8 @@ with gr.Blocks(theme=gr.themes.Soft()) as demo:
         outputs=[report_file]
     )
 
+# Async handlers run on Gradio's event loop, so waiting reports do not hold worker threads
+demo.queue(default_concurrency_limit=GRADIO_CONCURRENCY_LIMIT, max_size=GRADIO_MAX_QUEUE_SIZE)
+
 if __name__ == "__main__":
     demo.launch()
\ No newline at end of file
@@ -1,7 +1,6 @@
+import asyncio
 from typing import Literal
 
-from langchain.chat_models import init_chat_model
-from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
 
 from langgraph.constants import Send
@@ -12,26 +11,50 @@ from open_deep_research.state import (
     ReportStateInput,
     ReportStateOutput,
     Sections,
+    PlanReview,
     ReportState,
     SectionState,
     SectionOutputState,
     Queries,
+    ReportQueries,
     Feedback
 )
 
 from open_deep_research.prompts import (
     report_planner_query_writer_instructions,
+    report_planner_query_writer_inputs,
+    report_planner_feedback_query_writer_instructions,
+    report_planner_feedback_query_writer_inputs,
     report_planner_instructions,
+    report_planner_inputs,
+    report_plan_reviewer_instructions,
+    report_plan_reviewer_inputs,
     query_writer_instructions, 
+    query_writer_inputs,
+    batch_query_writer_instructions,
+    batch_query_writer_inputs,
     section_writer_instructions,
+    section_writer_inputs,
     final_section_writer_instructions,
+    final_section_writer_inputs,
     section_grader_instructions,
-    section_writer_inputs
+    section_grader_inputs
 )
 
-from open_deep_research.configuration import Configuration
+from open_deep_research.blobs import get_blob_store, load_blob, store_blob
+from open_deep_research.configuration import Configuration, ModelRole, PlanApproval
+from open_deep_research.routing import estimate_tokens, select_model
+from open_deep_research.search_backends import get_search_backend
+from open_deep_research.semantic_cache import get_search_cache
 from open_deep_research.utils import (
+    SOURCE_TEXT_EVENT,
+    astream_search_queries,
+    build_prompt_messages,
+    emit_instrumentation_event,
+    execute_search,
+    format_search_results,
     format_sections, 
+    get_chat_model,
     get_config_value, 
     get_search_params, 
     select_and_execute_search
@@ -39,93 +62,259 @@ from open_deep_research.utils import (
 
 ## Nodes -- 
 
+def get_role_model(configurable: Configuration, role: ModelRole, instructions: str, inputs: str, 
+                   allow_thinking: bool = True):
+    """Pick the model of a call for its role and input size, and build its prompt messages.
+    
+    Args:
+        configurable: Configuration of the run
+        role: Role of the call, see select_model
+        instructions: System instructions of the call
+        inputs: User inputs of the call
+        allow_thinking: Whether the call may use a thinking budget
+        
+    Returns:
+        The chat model and the prompt messages for its provider
+    """
+    choice = select_model(configurable, role, estimate_tokens(instructions + inputs), allow_thinking)
+    model = get_chat_model(model=choice.model, model_provider=choice.provider, api_keys=configurable.api_keys, **choice.kwargs)
+    return model, build_prompt_messages(choice.provider, instructions, inputs)
+
 async def generate_report_plan(state: ReportState, config: RunnableConfig):
     """Generate the initial report plan with sections.
     
     This node:
     1. Gets configuration for the report structure and search parameters
     2. Generates search queries to gather context for planning
-    3. Performs web searches using those queries
+    3. Performs web searches using those queries, starting each search as soon as its query is written
     4. Uses an LLM to generate a structured plan with sections
     
+    When the plan is regenerated from feedback, the search context from earlier runs is reused, 
+    and only queries for topics newly requested in the feedback are searched.
+    
     Args:
         state: Current graph state containing the report topic
         config: Configuration for models, search APIs, etc.
         
     Returns:
-        Dict containing the generated sections
+        Dict containing the generated sections and the cached planning search context
     """
 
     # Inputs
     topic = state["topic"]
     feedback = state.get("feedback_on_report_plan", None)
+    planning_queries = state.get("planning_queries") or []
 
     # Get configuration
     configurable = Configuration.from_runnable_config(config)
+    blob_store = get_blob_store(configurable.blob_store_path)
+    planning_source_str = load_blob(blob_store, state.get("planning_source_str") or "")
     report_structure = configurable.report_structure
     number_of_queries = configurable.number_of_queries
     search_api = get_config_value(configurable.search_api)
+    search_backend = get_search_backend(search_api)
     search_api_config = configurable.search_api_config or {}  # Get the config dict, default to empty
     params_to_pass = get_search_params(search_api, search_api_config)  # Filter parameters
+    fallback_search_api = get_config_value(configurable.fallback_search_api) if configurable.fallback_search_api else None
+    search_cache = get_search_cache(configurable.search_cache_path) if configurable.search_cache_path else None
 
     # Convert JSON object to string if necessary
     if isinstance(report_structure, dict):
         report_structure = str(report_structure)
 
-    # Set writer model (model used for query writing)
-    writer_provider = get_config_value(configurable.writer_provider)
-    writer_model_name = get_config_value(configurable.writer_model)
-    writer_model = init_chat_model(model=writer_model_name, model_provider=writer_provider) 
-    structured_llm = writer_model.with_structured_output(Queries)
-
-    # Format system instructions
-    system_instructions_query = report_planner_query_writer_instructions.format(topic=topic, report_organization=report_structure, number_of_queries=number_of_queries)
-
-    # Generate queries  
-    results = structured_llm.invoke([SystemMessage(content=system_instructions_query),
-                                     HumanMessage(content="Generate search queries that will help with planning the sections of the report.")])
-
-    # Web search
-    query_list = [query.search_query for query in results.queries]
-
-    # Search the web with parameters
-    source_str = await select_and_execute_search(search_api, query_list, params_to_pass)
-
-    # Format system instructions
-    system_instructions_sections = report_planner_instructions.format(topic=topic, report_organization=report_structure, context=source_str, feedback=feedback)
-
-    # Set the planner
-    planner_provider = get_config_value(configurable.planner_provider)
-    planner_model = get_config_value(configurable.planner_model)
+    # Format system instructions and inputs
+    query_message = "Generate search queries that will help with planning the sections of the report."
+    if not planning_queries:
+        # First run: search for context to plan the report
+        query_llm, query_messages = get_role_model(configurable, ModelRole.QUERY_WRITER, 
+                                                   report_planner_query_writer_instructions.format(report_organization=report_structure, number_of_queries=number_of_queries), 
+                                                   report_planner_query_writer_inputs.format(topic=topic) + query_message)
+    elif feedback:
+        # Plan regeneration: only search for topics the feedback adds
+        query_llm, query_messages = get_role_model(configurable, ModelRole.QUERY_WRITER, 
+                                                   report_planner_feedback_query_writer_instructions.format(number_of_queries=number_of_queries), 
+                                                   report_planner_feedback_query_writer_inputs.format(topic=topic, 
+                                                                                                      previous_queries="\n".join(planning_queries), 
+                                                                                                      feedback=feedback) + query_message)
+    else:
+        query_llm, query_messages = None, None
+
+    # Generate queries and search the web as each query arrives
+    new_queries = []
+    if query_messages:
+        search_tasks = []
+        async for query in astream_search_queries(query_llm.with_structured_output(Queries), query_messages):
+            if query in planning_queries or query in new_queries:
+                continue
+            new_queries.append(query)
+            if search_backend.concurrent:
+                search_tasks.append(asyncio.create_task(execute_search(search_api, [query], params_to_pass, configurable.api_keys, fallback_search_api,
+                                                                       search_cache, configurable.search_cache_threshold, configurable.search_cache_max_age)))
+
+        # Search APIs that pace their own queries get the whole list at once
+        if new_queries and not search_backend.concurrent:
+            search_tasks.append(asyncio.create_task(execute_search(search_api, new_queries, params_to_pass, configurable.api_keys, fallback_search_api,
+                                                                   search_cache, configurable.search_cache_threshold, configurable.search_cache_max_age)))
+
+        search_results = [response for responses in await asyncio.gather(*search_tasks) for response in responses]
+        if search_results:
+            new_source_str = format_search_results(search_api, search_results, configurable.max_sources, configurable.source_char_budget)
+            await emit_instrumentation_event(SOURCE_TEXT_EVENT, {"search_api": search_api, "bytes": len(new_source_str.encode("utf-8"))})
+            planning_source_str = f"{planning_source_str}\n\n{new_source_str}" if planning_source_str else new_source_str
 
     # Report planner instructions
     planner_message = """Generate the sections of the report. Your response must include a 'sections' field containing a list of sections. 
                         Each section must have: name, description, plan, research, and content fields."""
 
-    # Run the planner
-    if planner_model == "claude-3-7-sonnet-latest":
-        # Allocate a thinking budget for claude-3-7-sonnet-latest as the planner model
-        planner_llm = init_chat_model(model=planner_model, 
-                                      model_provider=planner_provider, 
-                                      max_tokens=20_000, 
-                                      thinking={"type": "enabled", "budget_tokens": 16_000})
+    # Set the planner, models that support it get a thinking budget
+    planner_llm, planner_messages = get_role_model(configurable, ModelRole.PLANNER, 
+                                                   report_planner_instructions.format(report_organization=report_structure), 
+                                                   report_planner_inputs.format(topic=topic, context=planning_source_str, feedback=feedback) + planner_message)
 
-    else:
-        # With other models, thinking tokens are not specifically allocated
-        planner_llm = init_chat_model(model=planner_model, 
-                                      model_provider=planner_provider)
-    
     # Generate the report sections
     structured_llm = planner_llm.with_structured_output(Sections)
-    report_sections = structured_llm.invoke([SystemMessage(content=system_instructions_sections),
-                                             HumanMessage(content=planner_message)])
+    report_sections = await structured_llm.ainvoke(planner_messages)
 
     # Get sections
     sections = report_sections.sections
 
-    return {"sections": sections}
+    # Without review, the plan is never regenerated, so the planning context is not kept
+    if PlanApproval(configurable.plan_approval) == PlanApproval.AUTO:
+        planning_source_str = ""
+
+    return {"sections": sections, 
+            "planning_queries": planning_queries + new_queries, 
+            "planning_source_str": store_blob(blob_store, planning_source_str, configurable.blob_min_size)}
+
+def route_report_plan(state: ReportState, config: RunnableConfig):
+    """Route the report plan to the approval step selected in the configuration.
+    
+    In auto mode, section research starts right away, so the graph runs without an interrupt 
+    and does not need a checkpointer.
+    
+    Args:
+        state: Current graph state with the generated sections
+        config: Configuration for the workflow
+        
+    Returns:
+        Send commands for section research, or the name of the next node
+    """
+    configurable = Configuration.from_runnable_config(config)
+    plan_approval = PlanApproval(configurable.plan_approval)
+    if plan_approval == PlanApproval.AUTO:
+        return start_section_research(state, configurable)
+    elif plan_approval == PlanApproval.LLM:
+        return "review_report_plan"
+    return "human_feedback"
+
+def start_section_research(state: ReportState, configurable: Configuration):
+    """Create parallel research tasks for the sections of an approved plan.
+    
+    With batch_section_queries, the queries of all research sections are written first by 
+    generate_section_queries, which then creates the tasks.
+    
+    Args:
+        state: Current graph state with the approved sections
+        configurable: Configuration of the run
+        
+    Returns:
+        Send commands for section research, or the name of the batched query writing node
+    """
+    research_sections = [s for s in state["sections"] if s.research]
+    if configurable.batch_section_queries and len(research_sections) > 1:
+        return "generate_section_queries"
+    return [
+        Send("build_section_with_web_research", {"topic": state["topic"], "section": s, "search_iterations": 0}) 
+        for s in research_sections
+    ]
+
+async def generate_section_queries(state: ReportState, config: RunnableConfig) -> Command[Literal["build_section_with_web_research"]]:
+    """Generate the first search queries of all research sections in one call and start their research.
+    
+    This replaces one generate_queries call per section by a single structured call. Sections 
+    missing from the response get no queries here, and write their own in generate_queries.
+    
+    Args:
+        state: Current graph state with the approved sections
+        config: Configuration including number of queries to generate
+        
+    Returns:
+        Command sending each research section to research with its queries
+    """
 
-def human_feedback(state: ReportState, config: RunnableConfig) -> Command[Literal["generate_report_plan","build_section_with_web_research"]]:
+    # Get state 
+    topic = state["topic"]
+    research_sections = [s for s in state["sections"] if s.research]
+
+    # Get configuration
+    configurable = Configuration.from_runnable_config(config)
+    number_of_queries = configurable.number_of_queries
+
+    # Set the query writer, and format system instructions and inputs
+    sections_str = "\n\n".join(f"Section: {s.name}\nTopic: {s.description}" for s in research_sections)
+    query_llm, query_messages = get_role_model(configurable, ModelRole.QUERY_WRITER, 
+                                               batch_query_writer_instructions.format(number_of_queries=number_of_queries), 
+                                               batch_query_writer_inputs.format(topic=topic, sections=sections_str) 
+                                               + "Generate search queries for each of the report sections.")
+
+    # Generate queries for all sections
+    report_queries = await query_llm.with_structured_output(ReportQueries).ainvoke(query_messages)
+    queries_by_section = {q.section_name.strip(): q.queries for q in report_queries.sections if q.queries}
+
+    sends = []
+    for s in research_sections:
+        section_input = {"topic": topic, "section": s, "search_iterations": 0}
+        if s.name.strip() in queries_by_section:
+            section_input["search_queries"] = queries_by_section[s.name.strip()][:number_of_queries]
+        sends.append(Send("build_section_with_web_research", section_input))
+    return Command(goto=sends)
+
+async def review_report_plan(state: ReportState, config: RunnableConfig) -> Command[Literal["generate_report_plan","generate_section_queries","build_section_with_web_research"]]:
+    """Have the planner model review the report plan and route to next steps.
+    
+    This node:
+    1. Asks the planner model whether the plan is ready for research and writing
+    2. Routes to either:
+       - Section writing if the plan is approved, or was already revised max_plan_revisions times
+       - Plan regeneration with the review as feedback otherwise
+    
+    Args:
+        state: Current graph state with sections to review
+        config: Configuration for the workflow
+        
+    Returns:
+        Command to either regenerate plan or start section writing
+    """
+
+    # Get state 
+    topic = state["topic"]
+    sections = state["sections"]
+    plan_revisions = state.get("plan_revisions", 0)
+
+    # Get configuration
+    configurable = Configuration.from_runnable_config(config)
+    report_structure = configurable.report_structure
+    if isinstance(report_structure, dict):
+        report_structure = str(report_structure)
+
+    if plan_revisions < configurable.max_plan_revisions:
+        # Review the plan with the grader model, without thinking: this is a short yes/no check
+        reviewer_llm, reviewer_messages = get_role_model(configurable, ModelRole.GRADER, 
+                                                         report_plan_reviewer_instructions.format(report_organization=report_structure), 
+                                                         report_plan_reviewer_inputs.format(topic=topic, sections=format_sections(sections)) 
+                                                         + "Review the report plan.", 
+                                                         allow_thinking=False)
+        review = await reviewer_llm.with_structured_output(PlanReview).ainvoke(reviewer_messages)
+
+        if not review.approved and review.feedback:
+            return Command(goto="generate_report_plan", 
+                           update={"feedback_on_report_plan": review.feedback, "plan_revisions": plan_revisions + 1})
+
+    # The plan is approved, kick off section writing
+    # The planning context is no longer needed once the plan is approved, so drop it from the state
+    return Command(goto=start_section_research(state, configurable), update={"planning_source_str": ""})
+
+def human_feedback(state: ReportState, config: RunnableConfig) -> Command[Literal["generate_report_plan","generate_section_queries","build_section_with_web_research"]]:
     """Get human feedback on the report plan and route to next steps.
     
     This node:
@@ -144,7 +333,6 @@ def human_feedback(state: ReportState, config: RunnableConfig) -> Command[Litera
     """
 
     # Get sections
-    topic = state["topic"]
     sections = state['sections']
     sections_str = "\n\n".join(
         f"Section: {section.name}\n"
@@ -163,11 +351,9 @@ def human_feedback(state: ReportState, config: RunnableConfig) -> Command[Litera
     # If the user approves the report plan, kick off section writing
     if isinstance(feedback, bool) and feedback is True:
         # Treat this as approve and kick off section writing
-        return Command(goto=[
-            Send("build_section_with_web_research", {"topic": topic, "section": s, "search_iterations": 0}) 
-            for s in sections 
-            if s.research
-        ])
+        # The planning context is no longer needed once the plan is approved, so drop it from the state
+        return Command(goto=start_section_research(state, Configuration.from_runnable_config(config)), 
+                       update={"planning_source_str": ""})
     
     # If the user provides feedback, regenerate the report plan 
     elif isinstance(feedback, str):
@@ -199,20 +385,14 @@ def generate_queries(state: SectionState, config: RunnableConfig):
     configurable = Configuration.from_runnable_config(config)
     number_of_queries = configurable.number_of_queries
 
-    # Generate queries 
-    writer_provider = get_config_value(configurable.writer_provider)
-    writer_model_name = get_config_value(configurable.writer_model)
-    writer_model = init_chat_model(model=writer_model_name, model_provider=writer_provider) 
-    structured_llm = writer_model.with_structured_output(Queries)
-
-    # Format system instructions
-    system_instructions = query_writer_instructions.format(topic=topic, 
-                                                           section_topic=section.description, 
-                                                           number_of_queries=number_of_queries)
+    # Set the query writer, and format system instructions and inputs
+    query_llm, query_messages = get_role_model(configurable, ModelRole.QUERY_WRITER, 
+                                               query_writer_instructions.format(number_of_queries=number_of_queries), 
+                                               query_writer_inputs.format(topic=topic, section_topic=section.description) 
+                                               + "Generate search queries on the provided topic.")
 
     # Generate queries  
-    queries = structured_llm.invoke([SystemMessage(content=system_instructions),
-                                     HumanMessage(content="Generate search queries on the provided topic.")])
+    queries = query_llm.with_structured_output(Queries).invoke(query_messages)
 
     return {"search_queries": queries.queries}
 
@@ -240,14 +420,22 @@ async def search_web(state: SectionState, config: RunnableConfig):
     search_api = get_config_value(configurable.search_api)
     search_api_config = configurable.search_api_config or {}  # Get the config dict, default to empty
     params_to_pass = get_search_params(search_api, search_api_config)  # Filter parameters
+    fallback_search_api = get_config_value(configurable.fallback_search_api) if configurable.fallback_search_api else None
+    search_cache = get_search_cache(configurable.search_cache_path) if configurable.search_cache_path else None
 
     # Web search
     query_list = [query.search_query for query in search_queries]
 
     # Search the web with parameters
-    source_str = await select_and_execute_search(search_api, query_list, params_to_pass)
+    source_str = await select_and_execute_search(search_api, query_list, params_to_pass, configurable.api_keys, fallback_search_api,
+                                                 configurable.max_sources, configurable.source_char_budget, search_cache,
+                                                 configurable.search_cache_threshold, configurable.search_cache_max_age)
 
-    return {"source_str": source_str, "search_iterations": state["search_iterations"] + 1}
+    # Keep the sources out of the state, only their handle is checkpointed
+    blob_store = get_blob_store(configurable.blob_store_path)
+    source_ref = store_blob(blob_store, source_str, configurable.blob_min_size)
+
+    return {"source_str": source_ref, "search_iterations": state["search_iterations"] + 1}
 
 def write_section(state: SectionState, config: RunnableConfig) -> Command[Literal[END, "search_web"]]:
     """Write a section of the report and evaluate if more research is needed.
@@ -270,10 +458,11 @@ def write_section(state: SectionState, config: RunnableConfig) -> Command[Litera
     # Get state 
     topic = state["topic"]
     section = state["section"]
-    source_str = state["source_str"]
 
     # Get configuration
     configurable = Configuration.from_runnable_config(config)
+    blob_store = get_blob_store(configurable.blob_store_path)
+    source_str = load_blob(blob_store, state["source_str"])
 
     # Format system instructions
     section_writer_inputs_formatted = section_writer_inputs.format(topic=topic, 
@@ -282,13 +471,9 @@ def write_section(state: SectionState, config: RunnableConfig) -> Command[Litera
                                                              context=source_str, 
                                                              section_content=section.content)
 
-    # Generate section  
-    writer_provider = get_config_value(configurable.writer_provider)
-    writer_model_name = get_config_value(configurable.writer_model)
-    writer_model = init_chat_model(model=writer_model_name, model_provider=writer_provider) 
-
-    section_content = writer_model.invoke([SystemMessage(content=section_writer_instructions),
-                                           HumanMessage(content=section_writer_inputs_formatted)])
+    # Generate section, with a model picked for the size of its sources
+    writer_model, writer_messages = get_role_model(configurable, ModelRole.WRITER, section_writer_instructions, section_writer_inputs_formatted)
+    section_content = writer_model.invoke(writer_messages)
     
     # Write content to the section object  
     section.content = section_content.content
@@ -298,33 +483,23 @@ def write_section(state: SectionState, config: RunnableConfig) -> Command[Litera
                               "If the grade is 'pass', return empty strings for all follow-up queries. "
                               "If the grade is 'fail', provide specific search queries to gather missing information.")
     
-    section_grader_instructions_formatted = section_grader_instructions.format(topic=topic, 
-                                                                               section_topic=section.description,
-                                                                               section=section.content, 
-                                                                               number_of_follow_up_queries=configurable.number_of_queries)
-
-    # Use planner model for reflection
-    planner_provider = get_config_value(configurable.planner_provider)
-    planner_model = get_config_value(configurable.planner_model)
-
-    if planner_model == "claude-3-7-sonnet-latest":
-        # Allocate a thinking budget for claude-3-7-sonnet-latest as the planner model
-        reflection_model = init_chat_model(model=planner_model, 
-                                           model_provider=planner_provider, 
-                                           max_tokens=20_000, 
-                                           thinking={"type": "enabled", "budget_tokens": 16_000}).with_structured_output(Feedback)
-    else:
-        reflection_model = init_chat_model(model=planner_model, 
-                                           model_provider=planner_provider).with_structured_output(Feedback)
+    section_grader_inputs_formatted = section_grader_inputs.format(topic=topic, 
+                                                                   section_topic=section.description,
+                                                                   section=section.content)
+
+    # Use the grader model for reflection
+    reflection_model, reflection_messages = get_role_model(configurable, ModelRole.GRADER, 
+                                                           section_grader_instructions.format(number_of_follow_up_queries=configurable.number_of_queries), 
+                                                           section_grader_inputs_formatted + section_grader_message)
     # Generate feedback
-    feedback = reflection_model.invoke([SystemMessage(content=section_grader_instructions_formatted),
-                                        HumanMessage(content=section_grader_message)])
+    feedback = reflection_model.with_structured_output(Feedback).invoke(reflection_messages)
 
     # If the section is passing or the max search depth is reached, publish the section to completed sections 
     if feedback.grade == "pass" or state["search_iterations"] >= configurable.max_search_depth:
-        # Publish the section to completed sections 
+        # Publish the section to completed sections with its content as a handle, and drop its sources from the state
+        completed_section = section.model_copy(update={"content": store_blob(blob_store, section.content, configurable.blob_min_size)})
         return  Command(
-        update={"completed_sections": [section]},
+        update={"completed_sections": [completed_section], "source_str": ""},
         goto=END
     )
 
@@ -351,30 +526,29 @@ def write_final_sections(state: SectionState, config: RunnableConfig):
 
     # Get configuration
     configurable = Configuration.from_runnable_config(config)
+    blob_store = get_blob_store(configurable.blob_store_path)
 
     # Get state 
     topic = state["topic"]
     section = state["section"]
-    completed_report_sections = state["report_sections_from_research"]
+    completed_report_sections = load_blob(blob_store, state["report_sections_from_research"])
     
-    # Format system instructions
-    system_instructions = final_section_writer_instructions.format(topic=topic, section_name=section.name, section_topic=section.description, context=completed_report_sections)
+    # Format inputs
+    final_section_writer_inputs_formatted = final_section_writer_inputs.format(topic=topic, section_name=section.name, section_topic=section.description, context=completed_report_sections)
 
     # Generate section  
-    writer_provider = get_config_value(configurable.writer_provider)
-    writer_model_name = get_config_value(configurable.writer_model)
-    writer_model = init_chat_model(model=writer_model_name, model_provider=writer_provider) 
-    
-    section_content = writer_model.invoke([SystemMessage(content=system_instructions),
-                                           HumanMessage(content="Generate a report section based on the provided sources.")])
+    writer_model, writer_messages = get_role_model(configurable, ModelRole.FINAL_WRITER, 
+                                                   final_section_writer_instructions, 
+                                                   final_section_writer_inputs_formatted + "Generate a report section based on the provided sources.")
+    section_content = writer_model.invoke(writer_messages)
     
-    # Write content to section 
-    section.content = section_content.content
+    # Write content to section, kept in the state as a handle
+    section.content = store_blob(blob_store, section_content.content, configurable.blob_min_size)
 
     # Write the updated section to completed sections
     return {"completed_sections": [section]}
 
-def gather_completed_sections(state: ReportState):
+def gather_completed_sections(state: ReportState, config: RunnableConfig):
     """Format completed sections as context for writing final sections.
     
     This node takes all completed research sections and formats them into
@@ -382,20 +556,26 @@ def gather_completed_sections(state: ReportState):
     
     Args:
         state: Current state with completed sections
+        config: Configuration for the blob store
         
     Returns:
-        Dict with formatted sections as context
+        Dict with a handle to the formatted sections as context
     """
 
-    # List of completed sections
-    completed_sections = state["completed_sections"]
+    # Get configuration
+    configurable = Configuration.from_runnable_config(config)
+    blob_store = get_blob_store(configurable.blob_store_path)
+
+    # List of completed sections, with their content loaded from the blob store
+    completed_sections = [s.model_copy(update={"content": load_blob(blob_store, s.content)}) 
+                          for s in state["completed_sections"]]
 
     # Format completed section to str to use as context for final sections
     completed_report_sections = format_sections(completed_sections)
 
-    return {"report_sections_from_research": completed_report_sections}
+    return {"report_sections_from_research": store_blob(blob_store, completed_report_sections, configurable.blob_min_size)}
 
-def compile_final_report(state: ReportState):
+def compile_final_report(state: ReportState, config: RunnableConfig):
     """Compile all sections into the final report.
     
     This node:
@@ -405,14 +585,19 @@ def compile_final_report(state: ReportState):
     
     Args:
         state: Current state with all completed sections
+        config: Configuration for the blob store
         
     Returns:
         Dict containing the complete report
     """
 
+    # Get configuration
+    configurable = Configuration.from_runnable_config(config)
+    blob_store = get_blob_store(configurable.blob_store_path)
+
     # Get sections
     sections = state["sections"]
-    completed_sections = {s.name: s.content for s in state["completed_sections"]}
+    completed_sections = {s.name: load_blob(blob_store, s.content) for s in state["completed_sections"]}
 
     # Update sections with completed content while maintaining original order
     for section in sections:
@@ -443,6 +628,10 @@ def initiate_final_section_writing(state: ReportState):
         if not s.research
     ]
 
+def route_section_queries(state: SectionState):
+    """Search right away with the queries written by generate_section_queries, if the section has them."""
+    return "search_web" if state.get("search_queries") else "generate_queries"
+
 # Report section sub-graph -- 
 
 # Add nodes 
@@ -452,7 +641,7 @@ section_builder.add_node("search_web", search_web)
 section_builder.add_node("write_section", write_section)
 
 # Add edges
-section_builder.add_edge(START, "generate_queries")
+section_builder.add_conditional_edges(START, route_section_queries, ["generate_queries", "search_web"])
 section_builder.add_edge("generate_queries", "search_web")
 section_builder.add_edge("search_web", "write_section")
 
@@ -462,6 +651,8 @@ section_builder.add_edge("search_web", "write_section")
 builder = StateGraph(ReportState, input=ReportStateInput, output=ReportStateOutput, config_schema=Configuration)
 builder.add_node("generate_report_plan", generate_report_plan)
 builder.add_node("human_feedback", human_feedback)
+builder.add_node("review_report_plan", review_report_plan)
+builder.add_node("generate_section_queries", generate_section_queries)
 builder.add_node("build_section_with_web_research", section_builder.compile())
 builder.add_node("gather_completed_sections", gather_completed_sections)
 builder.add_node("write_final_sections", write_final_sections)
@@ -469,7 +660,7 @@ builder.add_node("compile_final_report", compile_final_report)
 
 # Add edges
 builder.add_edge(START, "generate_report_plan")
-builder.add_edge("generate_report_plan", "human_feedback")
+builder.add_conditional_edges("generate_report_plan", route_report_plan, ["human_feedback", "review_report_plan", "generate_section_queries", "build_section_with_web_research"])
 builder.add_edge("build_section_with_web_research", "gather_completed_sections")
 builder.add_conditional_edges("gather_completed_sections", initiate_final_section_writing, ["write_final_sections"])
 builder.add_edge("write_final_sections", "compile_final_report")
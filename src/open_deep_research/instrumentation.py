@@ -0,0 +1,281 @@
+import json
+import time
+from collections import defaultdict
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+
+from open_deep_research.usage import LLMUsageHandler
+from open_deep_research.utils import SEARCH_EVENT, SOURCE_TEXT_EVENT
+
+@dataclass
+class NodeSpan:
+    """One execution of a graph node."""
+    node: str # Graph node
+    section: Optional[str] = None # Report section the node worked on, if any
+    iteration: Optional[int] = None # Search iterations done on the section when the node started
+    start: float = 0.0 # Unix time at which the node started
+    wall_time: float = 0.0 # Wall time of the node in seconds
+    llm_calls: int = 0 # LLM calls made by the node
+    input_tokens: int = 0 # LLM input tokens of the node
+    output_tokens: int = 0 # LLM output tokens of the node
+    search_calls: int = 0 # Search API calls made by the node
+    search_latency: float = 0.0 # Wall time of the search API calls in seconds, overlapping calls add up
+    source_bytes: int = 0 # Bytes of formatted source text produced by the node
+    error: Optional[str] = None # Error raised by the node, if any
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the span as a plain dict."""
+        return asdict(self)
+
+@dataclass
+class SearchCall:
+    """One call to a search API."""
+    node: Optional[str] # Graph node that made the call
+    search_api: str # Search API that served the call
+    queries: int # Number of queries in the call
+    results: int # Number of results returned
+    errors: int # Number of queries that failed after retries
+    latency: float # Wall time of the call in seconds
+    cache_hits: int = 0 # Number of queries answered by the search cache
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the call as a plain dict."""
+        return asdict(self)
+
+class RunInstrumentation(LLMUsageHandler):
+    """Callback handler that records where the time and tokens of a run go, without a remote tracer.
+
+    For every node execution, and every search iteration of a section, it records the wall time,
+    the LLM input and output tokens and the search latency and source text produced. Search calls are
+    also recorded per backend. The records can be exported as JSONL or in the Prometheus text format.
+
+    Example:
+        instrumentation = RunInstrumentation()
+        await graph.ainvoke({"topic": topic}, {"callbacks": [instrumentation], ...})
+        instrumentation.print_summary()
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.spans: List[NodeSpan] = []
+        self.search_calls: List[SearchCall] = []
+        self._parents: Dict[UUID, Optional[UUID]] = {}
+        self._open_spans: Dict[UUID, tuple[NodeSpan, float]] = {}
+
+    def _enclosing_span(self, run_id: Optional[UUID]) -> Optional[NodeSpan]:
+        """Find the innermost node span that a run belongs to."""
+        while run_id is not None:
+            if run_id in self._open_spans:
+                return self._open_spans[run_id][0]
+            run_id = self._parents.get(run_id)
+        return None
+
+    def on_chain_start(self, serialized: Dict[str, Any], inputs: Dict[str, Any], *, run_id: UUID,
+                       parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None,
+                       **kwargs: Any) -> None:
+        """Open a span when a graph node starts."""
+        self._parents[run_id] = parent_run_id
+        node = (metadata or {}).get("langgraph_node")
+        # Runnables inside a node carry the node's metadata too, only the node itself opens a span
+        if node is None or kwargs.get("name") != node:
+            return
+
+        span = NodeSpan(node=node, start=time.time())
+        if isinstance(inputs, dict):
+            section = inputs.get("section")
+            span.section = getattr(section, "name", None)
+            span.iteration = inputs.get("search_iterations")
+        self._open_spans[run_id] = (span, time.perf_counter())
+
+    def _close_span(self, run_id: UUID, error: Optional[BaseException] = None) -> None:
+        """Close the span of a node, if the run is one."""
+        self._parents.pop(run_id, None)
+        opened = self._open_spans.pop(run_id, None)
+        if opened is None:
+            return
+        span, start = opened
+        span.wall_time = time.perf_counter() - start
+        if error is not None:
+            span.error = repr(error)
+        self.spans.append(span)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        """Close the span of a finished node."""
+        self._close_span(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        """Close the span of a failed node.
+
+        Interrupts for human feedback are raised as errors too, so they close the span of the
+        node that waits for feedback.
+        """
+        self._close_span(run_id, error)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], *,
+                            run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        """Start timing an LLM call and note the node it belongs to."""
+        self._parents[run_id] = parent_run_id
+        super().on_chat_model_start(serialized, messages, run_id=run_id, **kwargs)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        """Add the token usage of a finished LLM call to its node."""
+        recorded = len(self.records)
+        super().on_llm_end(response, run_id=run_id, **kwargs)
+        span = self._enclosing_span(run_id)
+        self._parents.pop(run_id, None)
+        if span is None or len(self.records) == recorded:
+            return
+        record = self.records[-1]
+        span.llm_calls += 1
+        span.input_tokens += record.input_tokens
+        span.output_tokens += record.output_tokens
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        """Forget a failed LLM call."""
+        self._parents.pop(run_id, None)
+        super().on_llm_error(error, run_id=run_id, **kwargs)
+
+    def on_custom_event(self, name: str, data: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        """Record the search calls and source text reported by the search utilities."""
+        span = self._enclosing_span(run_id)
+        if name == SEARCH_EVENT:
+            self.search_calls.append(SearchCall(node=span.node if span else None, **data))
+            if span is not None:
+                span.search_calls += 1
+                span.search_latency += data["latency"]
+        elif name == SOURCE_TEXT_EVENT and span is not None:
+            span.source_bytes += data["bytes"]
+
+    def node_totals(self) -> Dict[str, Dict[str, Any]]:
+        """Sum the spans of each node.
+
+        Returns:
+            Dict from node name to its number of runs, wall time, tokens, searches and source bytes
+        """
+        totals: Dict[str, Dict[str, Any]] = defaultdict(lambda: {"runs": 0, "wall_time": 0.0, "llm_calls": 0,
+                                                                 "input_tokens": 0, "output_tokens": 0,
+                                                                 "search_calls": 0, "search_latency": 0.0,
+                                                                 "source_bytes": 0})
+        for span in self.spans:
+            node_totals = totals[span.node]
+            node_totals["runs"] += 1
+            for key in ("wall_time", "llm_calls", "input_tokens", "output_tokens", "search_calls", "search_latency", "source_bytes"):
+                node_totals[key] += getattr(span, key)
+        return dict(totals)
+
+    def search_totals(self) -> Dict[str, Dict[str, Any]]:
+        """Sum the search calls of each search API.
+
+        Returns:
+            Dict from search API to its number of calls, queries, results, failed queries, cached queries and latency
+        """
+        totals: Dict[str, Dict[str, Any]] = defaultdict(lambda: {"calls": 0, "queries": 0, "results": 0, "errors": 0, "cache_hits": 0, "latency": 0.0})
+        for call in self.search_calls:
+            api_totals = totals[call.search_api]
+            api_totals["calls"] += 1
+            api_totals["queries"] += call.queries
+            api_totals["results"] += call.results
+            api_totals["errors"] += call.errors
+            api_totals["cache_hits"] += call.cache_hits
+            api_totals["latency"] += call.latency
+        return dict(totals)
+
+    def model_totals(self) -> Dict[str, Dict[str, Any]]:
+        """Sum the LLM calls served by each model in each role.
+
+        Returns:
+            Dict from "role/model" to its number of calls, tokens and latency
+        """
+        totals: Dict[str, Dict[str, Any]] = defaultdict(lambda: {"calls": 0, "input_tokens": 0, "output_tokens": 0, "latency": 0.0})
+        for record in self.records:
+            model_totals = totals[f"{record.role or 'unknown'}/{record.model or 'unknown'}"]
+            model_totals["calls"] += 1
+            model_totals["input_tokens"] += record.input_tokens
+            model_totals["output_tokens"] += record.output_tokens
+            model_totals["latency"] += record.latency
+        return dict(totals)
+
+    def write_jsonl(self, path: str) -> None:
+        """Append every node span and search call to a JSONL file, one record per line.
+
+        Args:
+            path: File to append to
+        """
+        with open(path, "a", encoding="utf-8") as f:
+            for span in self.spans:
+                f.write(json.dumps({"type": "node", **span.to_dict()}) + "\n")
+            for call in self.search_calls:
+                f.write(json.dumps({"type": "search", **call.to_dict()}) + "\n")
+
+    def to_prometheus(self) -> str:
+        """Render the totals in the Prometheus text exposition format.
+
+        Returns:
+            Metrics text, e.g. for a textfile collector
+        """
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples: List[tuple[Dict[str, str], float]]) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_str = ",".join(f'{key}="{value}"' for key, value in labels.items())
+                lines.append(f"{name}{{{label_str}}} {value}")
+
+        node_totals = self.node_totals()
+        metric("odr_node_runs_total", "counter", "Executions of each graph node.",
+               [({"node": node}, t["runs"]) for node, t in node_totals.items()])
+        metric("odr_node_seconds_total", "counter", "Wall time spent in each graph node.",
+               [({"node": node}, t["wall_time"]) for node, t in node_totals.items()])
+        metric("odr_llm_tokens_total", "counter", "LLM tokens used by each graph node.",
+               [({"node": node, "direction": direction}, t[f"{direction}_tokens"])
+                for node, t in node_totals.items() for direction in ("input", "output")])
+        metric("odr_source_bytes_total", "counter", "Bytes of formatted source text produced by each graph node.",
+               [({"node": node}, t["source_bytes"]) for node, t in node_totals.items()])
+
+        model_totals = self.model_totals()
+        metric("odr_llm_calls_total", "counter", "LLM calls served by each model in each role.",
+               [(dict(zip(("role", "model"), key.split("/", 1))), t["calls"]) for key, t in model_totals.items()])
+
+        search_totals = self.search_totals()
+        metric("odr_search_calls_total", "counter", "Calls to each search API.",
+               [({"search_api": api}, t["calls"]) for api, t in search_totals.items()])
+        metric("odr_search_cache_hits_total", "counter", "Queries of each search API answered by the search cache.",
+               [({"search_api": api}, t["cache_hits"]) for api, t in search_totals.items()])
+        metric("odr_search_seconds_total", "counter", "Wall time of the calls to each search API.",
+               [({"search_api": api}, t["latency"]) for api, t in search_totals.items()])
+        return "\n".join(lines) + "\n"
+
+    def summary_table(self) -> str:
+        """Format the totals of each node and search API as a text table."""
+        rows = [("node", "runs", "wall s", "llm calls", "in tok", "out tok", "searches", "search s", "source KB")]
+        for node, t in sorted(self.node_totals().items(), key=lambda item: -item[1]["wall_time"]):
+            rows.append((node, str(t["runs"]), f"{t['wall_time']:.2f}", str(t["llm_calls"]), str(t["input_tokens"]),
+                         str(t["output_tokens"]), str(t["search_calls"]), f"{t['search_latency']:.2f}",
+                         f"{t['source_bytes'] / 1024:.1f}"))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        lines = ["  ".join(cell.ljust(width) if i == 0 else cell.rjust(width) for i, (cell, width) in enumerate(zip(row, widths)))
+                 for row in rows]
+
+        model_totals = self.model_totals()
+        if model_totals:
+            lines.append("")
+            for key, t in sorted(model_totals.items()):
+                lines.append(f"{key}: {t['calls']} calls, {t['input_tokens']} in tok, {t['output_tokens']} out tok, {t['latency']:.2f}s")
+
+        search_totals = self.search_totals()
+        if search_totals:
+            lines.append("")
+            for api, t in sorted(search_totals.items()):
+                mean = t["latency"] / t["calls"] if t["calls"] else 0.0
+                lines.append(f"{api}: {t['calls']} calls, {t['queries']} queries, {t['results']} results, {t['errors']} failed, {t['cache_hits']} cached, "
+                             f"{t['latency']:.2f}s total, {mean:.2f}s mean")
+        return "\n".join(lines)
+
+    def print_summary(self) -> None:
+        """Print the summary table of the run."""
+        print(self.summary_table())
@@ -0,0 +1,446 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableSequence
+from langgraph.types import interrupt
+
+from open_deep_research.traffic import request_key
+
+if TYPE_CHECKING:
+    import aiohttp
+
+# Marks the interrupts of LLM calls waiting for a batch, see llm_batch_keys
+LLM_BATCH_INTERRUPT = "llm_batch"
+
+class BatchClient(ABC):
+    """Client of a provider's batch endpoint.
+
+    Subclasses translate LangChain calls to the request bodies of the provider's API and back,
+    and submit and poll batches of such requests.
+    """
+    provider: str = "" # Model provider, as for init_chat_model
+
+    def request_body(self, model: BaseChatModel, messages: Any, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the API request body of a call to a chat model.
+
+        Args:
+            model: Chat model the call is made with
+            messages: Input of the call
+            kwargs: Arguments bound to the model, e.g. tools for structured output
+
+        Returns:
+            JSON-serializable request body
+        """
+        return model._get_request_payload(messages, **kwargs)
+
+    @abstractmethod
+    def parse_response(self, model: BaseChatModel, body: Dict[str, Any]) -> AIMessage:
+        """Turn an API response body into the message the chat model would have returned."""
+
+    @abstractmethod
+    async def submit(self, session: "aiohttp.ClientSession", requests: Dict[str, Dict[str, Any]]) -> str:
+        """Submit a batch of request bodies by ID, and return the ID of the batch."""
+
+    @abstractmethod
+    async def poll(self, session: "aiohttp.ClientSession", batch_id: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Get the results of a batch by request ID, or None while it is in progress.
+
+        Each result is {"response": body} for a request that succeeded, or {"error": message}.
+        """
+
+class AnthropicBatchClient(BatchClient):
+    """Client of the Anthropic Message Batches API."""
+    provider = "anthropic"
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None) -> None:
+        self.api_key = api_key or os.environ.get("ANTHROPIC_API_KEY", "")
+        self.base_url = (base_url or os.environ.get("ANTHROPIC_BASE_URL") or "https://api.anthropic.com").rstrip("/")
+
+    def _headers(self) -> Dict[str, str]:
+        return {"x-api-key": self.api_key, "anthropic-version": "2023-06-01", "content-type": "application/json"}
+
+    def request_body(self, model: BaseChatModel, messages: Any, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        body = super().request_body(model, messages, kwargs)
+        # Unset fields are left out, as the Anthropic SDK does
+        return {k: v for k, v in body.items() if v is not None and k != "stream"}
+
+    def parse_response(self, model: BaseChatModel, body: Dict[str, Any]) -> AIMessage:
+        from anthropic.types import Message
+        return model._format_output(Message.model_validate(body)).generations[0].message
+
+    async def submit(self, session: "aiohttp.ClientSession", requests: Dict[str, Dict[str, Any]]) -> str:
+        payload = {"requests": [{"custom_id": custom_id, "params": params} for custom_id, params in requests.items()]}
+        async with session.post(f"{self.base_url}/v1/messages/batches", json=payload, headers=self._headers()) as response:
+            response.raise_for_status()
+            return (await response.json())["id"]
+
+    async def poll(self, session: "aiohttp.ClientSession", batch_id: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        async with session.get(f"{self.base_url}/v1/messages/batches/{batch_id}", headers=self._headers()) as response:
+            response.raise_for_status()
+            batch = await response.json()
+        if batch["processing_status"] != "ended":
+            return None
+
+        results = {}
+        async with session.get(batch["results_url"], headers=self._headers()) as response:
+            response.raise_for_status()
+            for line in (await response.text()).splitlines():
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                result = item["result"]
+                if result["type"] == "succeeded":
+                    results[item["custom_id"]] = {"response": result["message"]}
+                else:
+                    results[item["custom_id"]] = {"error": f"{result['type']}: {json.dumps(result.get('error'))}"}
+        return results
+
+class OpenAIBatchClient(BatchClient):
+    """Client of the OpenAI Batch API, for chat completions."""
+    provider = "openai"
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None) -> None:
+        self.api_key = api_key or os.environ.get("OPENAI_API_KEY", "")
+        self.base_url = (base_url or os.environ.get("OPENAI_BASE_URL") or "https://api.openai.com/v1").rstrip("/")
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    def request_body(self, model: BaseChatModel, messages: Any, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        body = super().request_body(model, messages, kwargs)
+        body.pop("stream", None)
+        return body
+
+    def parse_response(self, model: BaseChatModel, body: Dict[str, Any]) -> AIMessage:
+        return model._create_chat_result(body).generations[0].message
+
+    async def _file_lines(self, session: "aiohttp.ClientSession", file_id: Optional[str]) -> List[Dict[str, Any]]:
+        if not file_id:
+            return []
+        async with session.get(f"{self.base_url}/files/{file_id}/content", headers=self._headers()) as response:
+            response.raise_for_status()
+            return [json.loads(line) for line in (await response.text()).splitlines() if line.strip()]
+
+    async def submit(self, session: "aiohttp.ClientSession", requests: Dict[str, Dict[str, Any]]) -> str:
+        import aiohttp
+
+        lines = "".join(json.dumps({"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": body}) + "\n"
+                        for custom_id, body in requests.items())
+        form = aiohttp.FormData()
+        form.add_field("purpose", "batch")
+        form.add_field("file", lines.encode("utf-8"), filename="batch.jsonl", content_type="application/jsonl")
+        async with session.post(f"{self.base_url}/files", data=form, headers=self._headers()) as response:
+            response.raise_for_status()
+            file_id = (await response.json())["id"]
+        payload = {"input_file_id": file_id, "endpoint": "/v1/chat/completions", "completion_window": "24h"}
+        async with session.post(f"{self.base_url}/batches", json=payload, headers=self._headers()) as response:
+            response.raise_for_status()
+            return (await response.json())["id"]
+
+    async def poll(self, session: "aiohttp.ClientSession", batch_id: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        async with session.get(f"{self.base_url}/batches/{batch_id}", headers=self._headers()) as response:
+            response.raise_for_status()
+            batch = await response.json()
+        if batch["status"] not in ("completed", "failed", "expired", "cancelled"):
+            return None
+
+        results = {}
+        for item in await self._file_lines(session, batch.get("output_file_id")) + await self._file_lines(session, batch.get("error_file_id")):
+            response = item.get("response") or {}
+            if response.get("status_code") == 200:
+                results[item["custom_id"]] = {"response": response["body"]}
+            else:
+                results[item["custom_id"]] = {"error": json.dumps(item.get("error") or response.get("body"))}
+        if batch["status"] == "failed" and not results:
+            # The whole batch was rejected, e.g. by validation, so no request has a result of its own
+            return {"*": {"error": json.dumps(batch.get("errors"))}}
+        return results
+
+def batch_clients(api_keys: Optional[Dict[str, str]] = None) -> Dict[str, BatchClient]:
+    """Create a client for every provider with a batch endpoint, models of other providers are called directly.
+
+    Args:
+        api_keys: Credentials by environment variable name, falling back to the environment
+
+    Returns:
+        The clients by model provider
+    """
+    api_keys = api_keys or {}
+    return {
+        "anthropic": AnthropicBatchClient(api_keys.get("ANTHROPIC_API_KEY")),
+        "openai": OpenAIBatchClient(api_keys.get("OPENAI_API_KEY")),
+    }
+
+class LLMBatchQueue:
+    """Collects the LLM calls of many report threads and runs them through provider batch endpoints.
+
+    A chat model wrapped by BatchChatModel does not call the provider. It looks the request up in
+    the queue's results and, without a result yet, adds the request to the queue and interrupts
+    the graph. Once requests stop arriving for collect_window seconds, or max_batch_requests are
+    waiting, they are submitted as one batch per provider and polled every poll_interval seconds.
+    When results arrive, the threads are resumed from their checkpoints and the interrupted nodes
+    run again, this time finding their results.
+
+    Results and submitted batches are kept in a directory, so a run stopped while batches are in
+    progress picks them up when started again instead of submitting the requests a second time.
+    """
+
+    def __init__(self, path: str, clients: Dict[str, BatchClient], collect_window: float = 10.0,
+                 poll_interval: float = 60.0, max_batch_requests: int = 10_000) -> None:
+        self.path = path
+        self.clients = clients
+        self.collect_window = collect_window
+        self.poll_interval = poll_interval
+        self.max_batch_requests = max_batch_requests
+        self._results_path = os.path.join(path, "results.jsonl")
+        self._batches_path = os.path.join(path, "batches.jsonl")
+        self._lock = threading.Lock()
+        self._results: Dict[str, Dict[str, Any]] = {} # Response bodies by request key
+        self._errors: Dict[str, str] = {} # Errors of failed requests, kept in memory only so that a new run retries them
+        self._pending: Dict[str, Tuple[str, Dict[str, Any]]] = {} # Provider and body of requests not submitted yet
+        self._batches: Dict[str, Tuple[str, List[str]]] = {} # Provider and request keys of batches in progress
+        self._last_enqueued = time.monotonic()
+        self._driver: Optional[asyncio.Task] = None
+        self._condition: Optional[asyncio.Condition] = None
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    def _load(self) -> None:
+        """Read the results and the batches in progress left by earlier runs."""
+        if os.path.exists(self._results_path):
+            with open(self._results_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self._results[record["key"]] = record["response"]
+        if os.path.exists(self._batches_path):
+            with open(self._batches_path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if record.get("ended"):
+                        self._batches.pop(record["batch_id"], None)
+                    else:
+                        self._batches[record["batch_id"]] = (record["provider"], record["keys"])
+
+    def _append(self, path: str, record: Dict[str, Any]) -> None:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def supports(self, model_provider: str) -> bool:
+        """Check whether calls to a provider's models go through batches."""
+        return model_provider in self.clients
+
+    def result(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get the response body of a request, None if it has none yet, or raise if the request failed."""
+        with self._lock:
+            if key in self._errors:
+                raise RuntimeError(f"Batch request {key} failed: {self._errors[key]}")
+            return self._results.get(key)
+
+    def enqueue(self, key: str, provider: str, body: Dict[str, Any]) -> None:
+        """Add a request to the next batch, unless it is already waiting or in a batch in progress."""
+        with self._lock:
+            if key in self._results or key in self._pending or any(key in keys for _, keys in self._batches.values()):
+                return
+            self._pending[key] = (provider, body)
+            self._last_enqueued = time.monotonic()
+
+    def _unsettled(self, keys: List[str]) -> Tuple[List[str], List[str]]:
+        """Split the requests without a result or error into those waiting or in a batch, and the others."""
+        with self._lock:
+            queued = set(self._pending).union(*(keys for _, keys in self._batches.values()))
+            missing = [key for key in keys if key not in self._results and key not in self._errors]
+        return [key for key in missing if key in queued], [key for key in missing if key not in queued]
+
+    async def wait(self, keys: List[str]) -> None:
+        """Wait until every request has a result or has failed, submitting and polling batches as needed.
+
+        Raises:
+            RuntimeError: If some of the requests were never queued, or if submitting and polling
+                stopped on an unexpected error, which is raised again by every later wait
+        """
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        while True:
+            queued, unknown = self._unsettled(keys)
+            if unknown:
+                raise RuntimeError(f"{len(unknown)} requests were never queued")
+            if not queued:
+                return
+            # A driver that crashed is not restarted, it would likely crash again straight away
+            if self._driver is not None and self._driver.done() and not self._driver.cancelled():
+                error = self._driver.exception()
+                if error is not None:
+                    raise RuntimeError(f"Batch queue stopped on an error: {str(error)}") from error
+            if self._driver is None or self._driver.done():
+                self._driver = asyncio.create_task(self._drive())
+            async with self._condition:
+                await self._condition.wait_for(lambda: not self._unsettled(keys)[0] or self._driver.done())
+
+    async def _drive(self) -> None:
+        """Submit waiting requests and poll batches until nothing is waiting or in progress."""
+        # aiohttp is imported on first use, so importing the graph does not pay for it
+        import aiohttp
+
+        next_poll = 0.0
+        try:
+            async with aiohttp.ClientSession() as session:
+                while True:
+                    with self._lock:
+                        pending = len(self._pending)
+                        idle = time.monotonic() - self._last_enqueued
+                        if not pending and not self._batches:
+                            break
+                    if pending and (pending >= self.max_batch_requests or idle >= self.collect_window):
+                        await self._submit(session)
+                    if self._batches and time.monotonic() >= next_poll:
+                        next_poll = time.monotonic() + self.poll_interval
+                        await self._poll(session)
+                    await asyncio.sleep(min(1.0, self.collect_window, self.poll_interval))
+        finally:
+            # Wakes the waiters up, even if the driver stopped on an error
+            async with self._condition:
+                self._condition.notify_all()
+
+    async def _submit(self, session: "aiohttp.ClientSession") -> None:
+        """Submit the waiting requests, in batches of at most max_batch_requests per provider."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        by_provider: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for key, (provider, body) in pending.items():
+            by_provider.setdefault(provider, {})[key] = body
+
+        for provider, requests in by_provider.items():
+            keys = list(requests)
+            for start in range(0, len(keys), self.max_batch_requests):
+                chunk = keys[start:start + self.max_batch_requests]
+                try:
+                    batch_id = await self.clients[provider].submit(session, {key: requests[key] for key in chunk})
+                except Exception as e:
+                    print(f"Error submitting a batch of {len(chunk)} {provider} requests: {str(e)}")
+                    await self._fail(chunk, f"batch submission failed: {str(e)}")
+                    continue
+                print(f"Submitted {provider} batch {batch_id} with {len(chunk)} requests")
+                with self._lock:
+                    self._batches[batch_id] = (provider, chunk)
+                    self._append(self._batches_path, {"batch_id": batch_id, "provider": provider, "keys": chunk})
+
+    async def _poll(self, session: "aiohttp.ClientSession") -> None:
+        """Poll the batches in progress, and store the results of those that ended."""
+        with self._lock:
+            batches = dict(self._batches)
+        for batch_id, (provider, keys) in batches.items():
+            try:
+                results = await self.clients[provider].poll(session, batch_id)
+            except Exception as e:
+                # Polling is retried at the next interval
+                print(f"Error polling {provider} batch {batch_id}: {str(e)}")
+                continue
+            if results is None:
+                continue
+
+            with self._lock:
+                for key in keys:
+                    result = results.get(key) or results.get("*") or {"error": "missing from the batch results"}
+                    if "response" in result:
+                        self._results[key] = result["response"]
+                        self._append(self._results_path, {"key": key, "response": result["response"]})
+                    else:
+                        self._errors[key] = result["error"]
+                del self._batches[batch_id]
+                self._append(self._batches_path, {"batch_id": batch_id, "ended": True})
+            print(f"{provider} batch {batch_id} ended with {sum(key in self._results for key in keys)} of {len(keys)} requests succeeded")
+            async with self._condition:
+                self._condition.notify_all()
+
+    async def _fail(self, keys: List[str], error: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._errors[key] = error
+        async with self._condition:
+            self._condition.notify_all()
+
+_active_queue: Optional[LLMBatchQueue] = None
+
+def get_llm_batch_queue() -> Optional[LLMBatchQueue]:
+    """Get the queue that LLM calls are batched through, if any."""
+    return _active_queue
+
+@contextmanager
+def batch_llm_calls(queue: LLMBatchQueue) -> Iterator[LLMBatchQueue]:
+    """Run the LLM calls of the graphs run inside the block through provider batch endpoints.
+
+    The graphs must be compiled with a checkpointer. Their runs stop at an interrupt whose value
+    is marked with LLM_BATCH_INTERRUPT for every LLM call without a result yet. Wait for the
+    results with queue.wait(llm_batch_keys(interrupts)), then resume the thread with None as input.
+    """
+    global _active_queue
+    previous, _active_queue = _active_queue, queue
+    try:
+        yield queue
+    finally:
+        _active_queue = previous
+
+def llm_batch_keys(interrupt_values: List[Any]) -> List[str]:
+    """Get the request keys of the interrupts of LLM calls waiting for a batch."""
+    return [value["key"] for value in interrupt_values
+            if isinstance(value, dict) and value.get("type") == LLM_BATCH_INTERRUPT]
+
+class BatchChatModel(Runnable):
+    """Stands in for a chat model while a batch queue is active, see LLMBatchQueue.
+
+    Supports what the graph does with chat models: invoke, ainvoke and astream, on the model or on
+    with_structured_output of a pydantic schema, which uses tool calling. Results do not reach
+    callbacks, so token usage is not reported for batched calls.
+    """
+
+    def __init__(self, queue: LLMBatchQueue, model: BaseChatModel, model_provider: str,
+                 bound_kwargs: Optional[Dict[str, Any]] = None, parser: Optional[Runnable] = None) -> None:
+        self.queue = queue
+        self.model = model
+        self.model_provider = model_provider
+        self.bound_kwargs = bound_kwargs or {} # Arguments of the call, e.g. tools for structured output
+        self.parser = parser # Parses the message into the structured output
+
+    def with_structured_output(self, schema: type, **kwargs: Any) -> "BatchChatModel":
+        kwargs.setdefault("method", "function_calling")
+        structured = self.model.with_structured_output(schema, **kwargs)
+        if not isinstance(structured, RunnableSequence) or not hasattr(structured.first, "kwargs"):
+            raise ValueError(f"Structured output of {self.model_provider} models is not supported in batch mode")
+        binding, *parsers = structured.steps
+        bound_kwargs = {k: v for k, v in binding.kwargs.items() if k != "ls_structured_output_format"}
+        parser = parsers[0] if len(parsers) == 1 else RunnableSequence(*parsers)
+        return BatchChatModel(self.queue, binding.bound, self.model_provider, bound_kwargs, parser)
+
+    def _result(self, input: Any) -> AIMessage:
+        client = self.queue.clients[self.model_provider]
+        body = client.request_body(self.model, input, dict(self.bound_kwargs))
+        key = request_key({"provider": self.model_provider, "body": body})
+        response = self.queue.result(key)
+        if response is None:
+            self.queue.enqueue(key, self.model_provider, body)
+            # Stops the graph here, the node runs again once the thread is resumed
+            interrupt({"type": LLM_BATCH_INTERRUPT, "key": key})
+        return client.parse_response(self.model, response)
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        message = self._result(input)
+        return self.parser.invoke(message) if self.parser is not None else message
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        message = self._result(input)
+        return await self.parser.ainvoke(message) if self.parser is not None else message
+
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any):
+        # The whole response arrives as one chunk
+        yield await self.ainvoke(input, config, **kwargs)
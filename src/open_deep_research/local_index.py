@@ -0,0 +1,421 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from open_deep_research.search_results import SearchResult
+from open_deep_research.semantic_cache import EMBEDDING_DIM, TOKEN_PATTERN, hashed_ngram_embedding
+
+# Words too common to help ranking, left out of the index
+STOPWORDS = frozenset("""a an and are as at be but by for from has have in is it its of on or that the this to was were
+will with what which who how when where why do does not no can than then there these those into about""".split())
+
+# Files the indexer reads, by extension
+SUPPORTED_EXTENSIONS = {".txt", ".md", ".html", ".htm", ".pdf"}
+
+# Documents are indexed as passages of about this many characters, so results point at the relevant part
+CHUNK_CHARS = 2000
+
+# BM25 parameters: term frequency saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Number of segments above which an update merges them all into one
+MAX_SEGMENTS = 16
+
+def tokenize(text: str) -> List[str]:
+    """Split a text into lowercased words, without stopwords."""
+    return [word for word in TOKEN_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+
+def term_hash(term: str) -> int:
+    """Hash a term to the unsigned 64-bit key it is stored under."""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+def chunk_text(text: str, chunk_chars: int = CHUNK_CHARS) -> List[str]:
+    """Split a text into passages of about chunk_chars characters, at paragraph boundaries where possible."""
+    chunks: List[str] = []
+    current = ""
+    for paragraph in (p.strip() for p in text.split("\n\n")):
+        if not paragraph:
+            continue
+        # Paragraphs longer than a passage are cut into pieces
+        pieces = [paragraph[i:i + chunk_chars] for i in range(0, len(paragraph), chunk_chars)]
+        for piece in pieces:
+            if current and len(current) + len(piece) + 2 > chunk_chars:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+def read_document(path: str) -> Tuple[str, str]:
+    """Read the title and text of a corpus file.
+
+    Args:
+        path: File with one of the SUPPORTED_EXTENSIONS
+
+    Returns:
+        Title, from the document if it has one or else from the file name, and plain text
+    """
+    extension = os.path.splitext(path)[1].lower()
+    title = os.path.splitext(os.path.basename(path))[0]
+    if extension == ".pdf":
+        import fitz
+        with fitz.open(path) as pdf:
+            text = "\n\n".join(page.get_text() for page in pdf)
+            title = (pdf.metadata or {}).get("title") or title
+    elif extension in (".html", ".htm"):
+        from bs4 import BeautifulSoup
+        with open(path, encoding="utf-8", errors="replace") as f:
+            soup = BeautifulSoup(f.read(), "html.parser")
+        if soup.title and soup.title.string:
+            title = soup.title.string.strip()
+        text = soup.get_text("\n\n")
+    else:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        first_line = next((line.strip().lstrip("#").strip() for line in text.splitlines() if line.strip()), "")
+        title = first_line[:200] or title
+    return title, text
+
+def load_array(path: str, dtype: Any, columns: Optional[int] = None) -> np.ndarray:
+    """Memory-map an array file read-only, or return an empty array if the file is empty."""
+    itemsize = np.dtype(dtype).itemsize * (columns or 1)
+    count = os.path.getsize(path) // itemsize
+    if count == 0:
+        return np.zeros((0, columns) if columns else 0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count, columns) if columns else (count,))
+
+class Segment:
+    """Immutable part of the index, written by one indexer run.
+
+    A segment directory holds the postings of its passages sorted by term hash (term_hashes.u64 with
+    term_offsets.i64 into postings_docs.i32 and postings_tfs.f32), the passage lengths, the passages
+    as JSON lines with their offsets and, optionally, a hashed n-gram vector per passage. Every array
+    is memory-mapped, so opening a segment reads nothing but what a query touches.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.term_hashes = load_array(os.path.join(path, "term_hashes.u64"), np.uint64)
+        self.term_offsets = load_array(os.path.join(path, "term_offsets.i64"), np.int64)
+        self.postings_docs = load_array(os.path.join(path, "postings_docs.i32"), np.int32)
+        self.postings_tfs = load_array(os.path.join(path, "postings_tfs.f32"), np.float32)
+        self.doc_lengths = load_array(os.path.join(path, "doc_lengths.i32"), np.int32)
+        self.doc_offsets = load_array(os.path.join(path, "doc_offsets.i64"), np.int64)
+        vectors_path = os.path.join(path, "vectors.f32")
+        self.vectors: Optional[np.ndarray] = None
+        if os.path.exists(vectors_path):
+            self.vectors = load_array(vectors_path, np.float32, columns=EMBEDDING_DIM)
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def postings(self, key: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the passages containing a term and the term's frequency in each."""
+        i = int(np.searchsorted(self.term_hashes, np.uint64(key)))
+        if i == len(self.term_hashes) or self.term_hashes[i] != np.uint64(key):
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        start, end = self.term_offsets[i], self.term_offsets[i + 1]
+        return self.postings_docs[start:end], self.postings_tfs[start:end]
+
+    def document(self, doc_id: int) -> Dict[str, Any]:
+        """Read a passage: its title, URL, source file and text."""
+        with open(os.path.join(self.path, "docs.jsonl"), "rb") as f:
+            f.seek(int(self.doc_offsets[doc_id]))
+            return json.loads(f.read(int(self.doc_offsets[doc_id + 1] - self.doc_offsets[doc_id])))
+
+    @staticmethod
+    def write(path: str, passages: List[Dict[str, Any]], with_vectors: bool) -> None:
+        """Write passages as a new segment directory.
+
+        Args:
+            path: Directory of the segment, must not exist yet
+            passages: Dicts with title, url, path and text
+            with_vectors: Whether to store a vector per passage for hybrid search
+        """
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        doc_lengths = []
+        for doc_id, passage in enumerate(passages):
+            counts = Counter(tokenize(f"{passage['title']}\n{passage['text']}"))
+            doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        terms = list(postings)
+        hashes = np.array([term_hash(term) for term in terms], dtype=np.uint64)
+        order = np.argsort(hashes)
+        counts = np.array([len(postings[terms[i]]) for i in order], dtype=np.int64)
+        term_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        entries = np.array([entry for i in order for entry in postings[terms[i]]], dtype=np.int64).reshape(-1, 2)
+
+        # Write to a temporary directory first, so readers never see a partial segment
+        tmp_path = tempfile.mkdtemp(dir=os.path.dirname(path))
+        hashes[order].tofile(os.path.join(tmp_path, "term_hashes.u64"))
+        term_offsets.tofile(os.path.join(tmp_path, "term_offsets.i64"))
+        entries[:, 0].astype(np.int32).tofile(os.path.join(tmp_path, "postings_docs.i32"))
+        entries[:, 1].astype(np.float32).tofile(os.path.join(tmp_path, "postings_tfs.f32"))
+        np.array(doc_lengths, dtype=np.int32).tofile(os.path.join(tmp_path, "doc_lengths.i32"))
+        doc_offsets = [0]
+        with open(os.path.join(tmp_path, "docs.jsonl"), "wb") as f:
+            for passage in passages:
+                doc_offsets.append(doc_offsets[-1] + f.write(json.dumps(passage).encode("utf-8") + b"\n"))
+        np.array(doc_offsets, dtype=np.int64).tofile(os.path.join(tmp_path, "doc_offsets.i64"))
+        if with_vectors:
+            hashed_ngram_embedding([passage["text"] for passage in passages]).tofile(os.path.join(tmp_path, "vectors.f32"))
+        os.replace(tmp_path, path)
+
+class LocalIndex:
+    """BM25 index of a local corpus, with optional hybrid vector scoring, kept in a directory.
+
+    The index is a list of immutable segments and a manifest.json that lists them, records the
+    indexed files with their modification time and passages, and marks the passages of changed or
+    removed files as deleted. An update only reads the new and changed files, and writes them as one
+    new segment. BM25 statistics are computed over the passages that are not deleted.
+
+    Example:
+        index = LocalIndex("guidelines.index")
+        index.update(["guidelines/"])
+        results = index.search("first-line treatment of type 2 diabetes")
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.manifest_path = os.path.join(path, "manifest.json")
+        self.manifest: Dict[str, Any] = {"segments": [], "files": {}, "deleted": {}, "vectors": False, "next_segment": 0}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        self._open_segments()
+
+    def _open_segments(self) -> None:
+        """Map the segments of the manifest and compute the statistics of the live passages."""
+        self.segments = [Segment(os.path.join(self.path, name)) for name in self.manifest["segments"]]
+        self.deleted = []
+        self.num_docs = 0
+        total_length = 0
+        for name, segment in zip(self.manifest["segments"], self.segments):
+            deleted = np.zeros(len(segment), dtype=bool)
+            deleted[self.manifest["deleted"].get(name, [])] = True
+            self.deleted.append(deleted)
+            self.num_docs += int((~deleted).sum())
+            total_length += int(segment.doc_lengths[~deleted].sum()) if len(segment) else 0
+        self.average_length = total_length / self.num_docs if self.num_docs else 0.0
+
+    def _save_manifest(self) -> None:
+        # Write to a temporary file first, so readers never see a partial manifest
+        fd, tmp_path = tempfile.mkstemp(dir=self.path)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def search(self, query: str, max_results: int = 5, vector_weight: float = 0.0) -> List[SearchResult]:
+        """Find the passages that best match a query.
+
+        Args:
+            query: Search query
+            max_results: Number of passages to return
+            vector_weight: Share of the score given to the similarity of the query and passage vectors,
+                from 0 (BM25 only) to 1 (vectors only). Ignored if the index has no vectors.
+
+        Returns:
+            Results with the passage text as raw content, best first
+        """
+        keys = [term_hash(term) for term in set(tokenize(query))]
+        segment_postings = [[segment.postings(key) for key in keys] for segment in self.segments]
+        # Document frequency of each term, over all segments
+        df = np.array([sum(len(postings[i][0]) for postings in segment_postings) for i in range(len(keys))], dtype=np.float64)
+        idf = np.log(1 + (self.num_docs - df + 0.5) / (df + 0.5))
+
+        use_vectors = vector_weight > 0 and self.manifest["vectors"]
+        query_vector = hashed_ngram_embedding([query])[0] if use_vectors else None
+        scores = []
+        for segment, postings, deleted in zip(self.segments, segment_postings, self.deleted):
+            bm25 = np.zeros(len(segment), dtype=np.float32)
+            for term_idf, (docs, tfs) in zip(idf, postings):
+                if not len(docs):
+                    continue
+                lengths = segment.doc_lengths[docs] / max(self.average_length, 1e-9)
+                bm25[docs] += term_idf * tfs * (BM25_K1 + 1) / (tfs + BM25_K1 * (1 - BM25_B + BM25_B * lengths))
+            similarity = segment.vectors @ query_vector if use_vectors and segment.vectors is not None else None
+            bm25[deleted] = 0.0
+            scores.append((bm25, similarity))
+
+        # BM25 scores are scaled to [0, 1] by the best one, to be mixed with cosine similarities
+        max_bm25 = max((float(bm25.max()) for bm25, _ in scores if len(bm25)), default=0.0) or 1.0
+        candidates = []
+        for segment_id, ((bm25, similarity), deleted) in enumerate(zip(scores, self.deleted)):
+            combined = bm25 / max_bm25
+            if similarity is not None:
+                combined = (1 - vector_weight) * combined + vector_weight * np.where(deleted, 0.0, similarity)
+            if not len(combined):
+                continue
+            top = np.argpartition(-combined, min(max_results, len(combined)) - 1)[:max_results]
+            candidates.extend((float(combined[i]), segment_id, int(i)) for i in top if combined[i] > 0)
+
+        results = []
+        for score, segment_id, doc_id in sorted(candidates, reverse=True)[:max_results]:
+            passage = self.segments[segment_id].document(doc_id)
+            results.append(SearchResult(
+                title=passage["title"],
+                url=passage["url"],
+                content=passage["text"][:1000],
+                score=score,
+                raw_content=passage["text"],
+            ))
+        return results
+
+    def update(self, corpus_paths: Iterable[str], with_vectors: Optional[bool] = None,
+               chunk_chars: int = CHUNK_CHARS) -> Dict[str, int]:
+        """Index the new and changed files under the corpus paths, and forget the removed ones.
+
+        Args:
+            corpus_paths: Files and directories to index, directories are walked recursively
+            with_vectors: Whether to store passage vectors for hybrid search. Defaults to what the
+                index was created with. Turning vectors on for an existing index rebuilds it.
+            chunk_chars: Length of the passages in characters
+
+        Returns:
+            Number of added, updated and removed files, and of passages written
+        """
+        roots = [os.path.abspath(path) for path in corpus_paths]
+        found: Dict[str, os.stat_result] = {}
+        for root in roots:
+            paths = [root] if os.path.isfile(root) else (os.path.join(d, name) for d, _, names in os.walk(root) for name in names)
+            for path in paths:
+                if os.path.splitext(path)[1].lower() in SUPPORTED_EXTENSIONS:
+                    found[path] = os.stat(path)
+
+        files = self.manifest["files"]
+        under_roots = [path for path in files if any(path == root or path.startswith(root.rstrip(os.sep) + os.sep) for root in roots)]
+        removed = [path for path in under_roots if path not in found]
+        changed = [path for path, stat in found.items()
+                   if path not in files or (files[path]["mtime"], files[path]["size"]) != (stat.st_mtime, stat.st_size)]
+        summary = {"added": sum(path not in files for path in changed), "updated": sum(path in files for path in changed),
+                   "removed": len(removed), "passages": 0}
+
+        # Passages of removed and changed files are deleted, changed files get new ones
+        for path in removed + [path for path in changed if path in files]:
+            entry = files.pop(path)
+            self.manifest["deleted"].setdefault(entry["segment"], []).extend(entry["docs"])
+
+        passages = []
+        name = f"segment-{self.manifest['next_segment']:06d}"
+        for path in sorted(changed):
+            try:
+                title, text = read_document(path)
+            except Exception as e:
+                print(f"Skipping {path}: {str(e)}")
+                continue
+            first_doc = len(passages)
+            uri = Path(path).as_uri()
+            for i, chunk in enumerate(chunk_text(text, chunk_chars)):
+                passages.append({"title": title, "url": f"{uri}#passage-{i}", "path": path, "text": chunk})
+            files[path] = {"mtime": found[path].st_mtime, "size": found[path].st_size, "segment": name,
+                           "docs": list(range(first_doc, len(passages)))}
+        summary["passages"] = len(passages)
+
+        # Passages indexed without vectors need to be rewritten with them
+        rebuild = with_vectors is True and not self.manifest["vectors"] and bool(self.manifest["segments"])
+        if with_vectors is not None:
+            self.manifest["vectors"] = with_vectors
+        if passages:
+            os.makedirs(self.path, exist_ok=True)
+            Segment.write(os.path.join(self.path, name), passages, self.manifest["vectors"])
+            self.manifest["segments"].append(name)
+            self.manifest["next_segment"] += 1
+        os.makedirs(self.path, exist_ok=True)
+        self._save_manifest()
+        self._open_segments()
+
+        if rebuild or len(self.segments) > MAX_SEGMENTS:
+            self.compact()
+        return summary
+
+    def compact(self) -> None:
+        """Merge all segments into one, dropping deleted passages."""
+        name = f"segment-{self.manifest['next_segment']:06d}"
+        passages = []
+        files: Dict[str, Dict[str, Any]] = {}
+        for segment, deleted in zip(self.segments, self.deleted):
+            for doc_id in np.flatnonzero(~deleted):
+                passage = segment.document(int(doc_id))
+                entry = files.setdefault(passage["path"], {**self.manifest["files"][passage["path"]], "segment": name, "docs": []})
+                entry["docs"].append(len(passages))
+                passages.append(passage)
+
+        old_segments = self.manifest["segments"]
+        if passages:
+            Segment.write(os.path.join(self.path, name), passages, self.manifest["vectors"])
+        self.manifest.update({"segments": [name] if passages else [], "files": files, "deleted": {},
+                              "next_segment": self.manifest["next_segment"] + 1})
+        self._save_manifest()
+        self._open_segments()
+        for old in old_segments:
+            shutil.rmtree(os.path.join(self.path, old), ignore_errors=True)
+
+# One index per directory, shared by every run in this process
+_local_indexes: Dict[str, Tuple[LocalIndex, float]] = {}
+_local_indexes_lock = threading.Lock()
+
+def get_local_index(path: str) -> LocalIndex:
+    """Get the process-wide index of a directory, reopened when the indexer has updated it.
+
+    Raises:
+        ValueError: If the directory holds no index
+    """
+    manifest_path = os.path.join(path, "manifest.json")
+    if not os.path.exists(manifest_path):
+        raise ValueError(f"No local search index in {path}, build one with open-deep-research-index")
+    mtime = os.path.getmtime(manifest_path)
+    with _local_indexes_lock:
+        if path not in _local_indexes or _local_indexes[path][1] != mtime:
+            _local_indexes[path] = (LocalIndex(path), mtime)
+        return _local_indexes[path][0]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build and query the index of the local search API.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = subparsers.add_parser("index", help="Index new and changed files, and forget removed ones")
+    index_parser.add_argument("corpus", nargs="+", help="Files and directories to index (.txt, .md, .html, .pdf)")
+    index_parser.add_argument("--index-dir", required=True, help="Directory of the index")
+    index_parser.add_argument("--vectors", action="store_true", default=None, help="Store passage vectors for hybrid search")
+    index_parser.add_argument("--chunk-chars", type=int, default=CHUNK_CHARS, help="Length of the indexed passages")
+    index_parser.add_argument("--compact", action="store_true", help="Merge all segments into one after indexing")
+
+    search_parser = subparsers.add_parser("search", help="Query the index")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--index-dir", required=True, help="Directory of the index")
+    search_parser.add_argument("--max-results", type=int, default=5)
+    search_parser.add_argument("--vector-weight", type=float, default=0.0)
+    args = parser.parse_args()
+
+    index = LocalIndex(args.index_dir)
+    if args.command == "index":
+        start = time.perf_counter()
+        summary = index.update(args.corpus, with_vectors=args.vectors, chunk_chars=args.chunk_chars)
+        if args.compact:
+            index.compact()
+        print(f"{summary['added']} added, {summary['updated']} updated, {summary['removed']} removed, "
+              f"{summary['passages']} passages written in {time.perf_counter() - start:.1f}s; "
+              f"{index.num_docs} passages in {len(index.segments)} segments")
+    else:
+        start = time.perf_counter()
+        results = index.search(args.query, args.max_results, args.vector_weight)
+        print(f"{len(results)} results in {(time.perf_counter() - start) * 1000:.1f} ms")
+        for result in results:
+            print(f"{result.score:.3f}  {result.title}  {result.url}")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,8 @@
-report_planner_query_writer_instructions="""You are performing research for a report. 
+# Each prompt is split into instructions, which are stable across calls and sent first as the system 
+# message, and inputs, which change from call to call and are sent last. Providers cache the longest 
+# stable prefix of a prompt, so nothing call-specific may be formatted into the instructions.
 
-<Report topic>
-{topic}
-</Report topic>
+report_planner_query_writer_instructions="""You are performing research for a report. 
 
 <Report organization>
 {report_organization}
@@ -24,23 +24,51 @@ Call the Queries tool
 </Format>
 """
 
-report_planner_instructions="""I want a plan for a report that is concise and focused.
+report_planner_query_writer_inputs="""
+<Report topic>
+{topic}
+</Report topic>
+"""
 
+report_planner_feedback_query_writer_instructions="""You are revising the research behind a report plan based on feedback from review.
+
+<Task>
+The previous search queries have already been run, and their results will be reused to revise the plan.
+
+Decide whether the feedback asks for topics that the previous search queries do not cover:
+
+1. If it does, generate up to {number_of_queries} web search queries that cover only those new topics
+2. If the feedback only asks to restructure, rename, merge, split or reorder sections, generate no queries
+
+Do not repeat or rephrase any of the previous search queries.
+</Task>
+
+<Format>
+Call the Queries tool 
+</Format>
+"""
+
+report_planner_feedback_query_writer_inputs="""
 <Report topic>
-The topic of the report is:
 {topic}
 </Report topic>
 
+<Previous search queries>
+{previous_queries}
+</Previous search queries>
+
+<Feedback>
+{feedback}
+</Feedback>
+"""
+
+report_planner_instructions="""I want a plan for a report that is concise and focused.
+
 <Report organization>
 The report should follow this organization: 
 {report_organization}
 </Report organization>
 
-<Context>
-Here is context to use to plan the sections of the report: 
-{context}
-</Context>
-
 <Task>
 Generate a list of sections for the report. Your plan should be tight and focused with NO overlapping sections or unnecessary filler. 
 
@@ -66,25 +94,61 @@ Integration guidelines:
 Before submitting, review your structure to ensure it has no redundant sections and follows a logical flow.
 </Task>
 
+<Format>
+Call the Sections tool 
+</Format>
+"""
+
+report_planner_inputs="""
+<Report topic>
+The topic of the report is:
+{topic}
+</Report topic>
+
+<Context>
+Here is context to use to plan the sections of the report: 
+{context}
+</Context>
+
 <Feedback>
 Here is feedback on the report structure from review (if any):
 {feedback}
 </Feedback>
+"""
+
+report_plan_reviewer_instructions="""You are reviewing the plan of a report before any section is researched or written.
+
+<Report organization>
+The report should follow this organization: 
+{report_organization}
+</Report organization>
+
+<Task>
+Decide whether the plan is ready for research and writing. Approve the plan if:
+
+1. It follows the report organization
+2. Its sections cover the report topic with NO overlapping sections or unnecessary filler
+3. Research is requested for the sections that need sources, and not for the introduction and conclusion
+
+Otherwise, do not approve it and give short, specific feedback on what to change in the plan.
+</Task>
 
 <Format>
-Call the Sections tool 
+Call the PlanReview tool 
 </Format>
 """
 
-query_writer_instructions="""You are an expert technical writer crafting targeted web search queries that will gather comprehensive information for writing a technical report section.
-
+report_plan_reviewer_inputs="""
 <Report topic>
 {topic}
 </Report topic>
 
-<Section topic>
-{section_topic}
-</Section topic>
+<Report plan>
+{sections}
+</Report plan>
+"""
+
+query_writer_instructions="""You are an expert technical writer crafting targeted web search queries that will gather comprehensive information for writing a technical report section.
 
 <Task>
 Your goal is to generate {number_of_queries} search queries that will help gather comprehensive information above the section topic. 
@@ -102,6 +166,45 @@ Call the Queries tool
 </Format>
 """
 
+query_writer_inputs="""
+<Report topic>
+{topic}
+</Report topic>
+
+<Section topic>
+{section_topic}
+</Section topic>
+"""
+
+batch_query_writer_instructions="""You are an expert technical writer crafting targeted web search queries that will gather comprehensive information for writing the sections of a technical report.
+
+<Task>
+Your goal is to generate {number_of_queries} search queries for each of the report sections below that will help gather comprehensive information about the section topic. 
+
+The queries for each section should:
+
+1. Be related to the topic of that section
+2. Examine different aspects of the section topic
+3. Not repeat the queries of the other sections
+
+Make the queries specific enough to find high-quality, relevant sources.
+</Task>
+
+<Format>
+Call the ReportQueries tool, with one entry per section, using the section names exactly as given
+</Format>
+"""
+
+batch_query_writer_inputs="""
+<Report topic>
+{topic}
+</Report topic>
+
+<Report sections>
+{sections}
+</Report sections>
+"""
+
 section_writer_instructions = """Write one section of a research report.
 
 <Task>
@@ -159,19 +262,7 @@ section_writer_inputs="""
 </Source material>
 """
 
-section_grader_instructions = """Review a report section relative to the specified topic:
-
-<Report topic>
-{topic}
-</Report topic>
-
-<section topic>
-{section_topic}
-</section topic>
-
-<section content>
-{section}
-</section content>
+section_grader_instructions = """Review a report section relative to the specified topic.
 
 <task>
 Evaluate whether the section content adequately addresses the section topic.
@@ -191,23 +282,21 @@ follow_up_queries: List[SearchQuery] = Field(
 </format>
 """
 
-final_section_writer_instructions="""You are an expert technical writer crafting a section that synthesizes information from the rest of the report.
-
+section_grader_inputs = """
 <Report topic>
 {topic}
 </Report topic>
 
-<Section name>
-{section_name}
-</Section name>
-
-<Section topic> 
+<section topic>
 {section_topic}
-</Section topic>
+</section topic>
 
-<Available report content>
-{context}
-</Available report content>
+<section content>
+{section}
+</section content>
+"""
+
+final_section_writer_instructions="""You are an expert technical writer crafting a section that synthesizes information from the rest of the report.
 
 <Task>
 1. Section-Specific Approach:
@@ -249,4 +338,22 @@ For Conclusion/Summary:
 - For conclusion: 100-150 word limit, ## for section title, only ONE structural element at most, no sources section
 - Markdown format (no codeblock)
 - Do not include word count or any preamble in your response
-</Quality Checks>"""
\ No newline at end of file
+</Quality Checks>"""
+
+final_section_writer_inputs="""
+<Report topic>
+{topic}
+</Report topic>
+
+<Section name>
+{section_name}
+</Section name>
+
+<Section topic> 
+{section_topic}
+</Section topic>
+
+<Available report content>
+{context}
+</Available report content>
+"""
\ No newline at end of file
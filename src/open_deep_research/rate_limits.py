@@ -0,0 +1,203 @@
+import asyncio
+import atexit
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Optional
+
+from open_deep_research.clients import credential_hash
+from open_deep_research.resilience import is_transient_error
+
+@dataclass
+class RateLimit:
+    """Request rates of a search API, in requests per second."""
+    initial_rate: float # Rate of a backend with no learned rate yet
+    min_rate: float # Rate never goes below this, however many requests are throttled
+    max_rate: float # Rate never goes above this, however healthy the backend is
+    jitter: float = 0.0 # Random spread of the interval between requests, as a fraction of it
+
+# Rates of each search API, registered with the rate_limit of its search backend (see search_backends), and of the
+# request streams that backends pace separately. Learned rates move between min_rate and max_rate, starting from initial_rate.
+DEFAULT_RATE_LIMITS: Dict[str, RateLimit] = {
+    # Scraping Google without an API key, with irregular intervals
+    "googlesearch_scrape": RateLimit(initial_rate=0.8, min_rate=0.05, max_rate=2.0, jitter=0.5),
+}
+
+class AdaptiveRateLimiter:
+    """Spaces out the requests to a backend at a rate learned with AIMD (additive increase, multiplicative decrease).
+
+    Every healthy response raises the rate by a fixed step, so that it climbs from min_rate to max_rate
+    over about 50 responses. Every response throttled by a rate limit, server error or timeout halves the
+    rate. Responses that are much slower than usual hold the rate, as a sign that the backend is saturating.
+    """
+
+    # Number of healthy responses to climb from min_rate to max_rate
+    RAMP_UP_RESPONSES = 50
+    # Factor applied to the rate on a throttled response
+    DECREASE_FACTOR = 0.5
+    # Responses slower than this multiple of the average latency do not raise the rate
+    SLOW_RESPONSE_FACTOR = 2.0
+
+    def __init__(self, limit: RateLimit, rate: Optional[float] = None) -> None:
+        self.limit = limit
+        self.rate = min(limit.max_rate, max(limit.min_rate, rate if rate is not None else limit.initial_rate))
+        self.average_latency: Optional[float] = None
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take the next free slot at the current rate.
+
+        Returns:
+            Seconds to wait until the slot
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            interval = 1 / self.rate
+            if self.limit.jitter:
+                interval *= 1 + random.uniform(-self.limit.jitter, self.limit.jitter)
+            self._next_slot = slot + interval
+        return slot - now
+
+    async def acquire(self) -> None:
+        """Wait for the next free slot at the current rate."""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record_success(self, latency: float) -> None:
+        """Raise the rate after a healthy response, unless it was unusually slow."""
+        with self._lock:
+            slow = self.average_latency is not None and latency > self.SLOW_RESPONSE_FACTOR * self.average_latency
+            self.average_latency = latency if self.average_latency is None else 0.8 * self.average_latency + 0.2 * latency
+            previous_rate = self.rate
+            if not slow:
+                step = (self.limit.max_rate - self.limit.min_rate) / self.RAMP_UP_RESPONSES
+                self.rate = min(self.limit.max_rate, self.rate + step)
+        if self.rate != previous_rate:
+            schedule_save()
+
+    def record_throttle(self) -> None:
+        """Cut the rate after a throttled response, and hold off the next request accordingly."""
+        with self._lock:
+            previous_rate = self.rate
+            self.rate = max(self.limit.min_rate, self.rate * self.DECREASE_FACTOR)
+            self._next_slot = max(self._next_slot, time.monotonic() + 1 / self.rate)
+        if self.rate != previous_rate:
+            schedule_save()
+
+    @asynccontextmanager
+    async def request(self) -> AsyncIterator[None]:
+        """Wait for a slot, then learn from how the request inside the block went.
+
+        Example:
+            async with limiter.request():
+                response = await client.search(query)
+        """
+        await self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            if is_transient_error(e):
+                self.record_throttle()
+            raise
+        self.record_success(time.perf_counter() - start)
+
+# File the learned rates are kept in between runs. Set SEARCH_RATE_LIMITS_PATH to an empty string to not persist them.
+RATE_LIMITS_PATH = os.getenv("SEARCH_RATE_LIMITS_PATH", os.path.join(os.path.expanduser("~"), ".cache", "open_deep_research", "search_rate_limits.json"))
+
+# One limiter per search API and credential, shared by every run in this process
+_rate_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+_saved_rates: Optional[Dict[str, float]] = None
+_last_save = 0.0
+# Whether a rate changed since the last save, and whether the exit hook saving them is registered
+_rates_changed = False
+_exit_hook_registered = False
+
+# Learned rates are written at most this often, and when the process exits, once a rate has changed
+SAVE_INTERVAL = 30.0
+
+def rate_limiter_key(search_api: str, credential: Optional[str] = None) -> str:
+    """Identify the limiter of a search API and credential, without revealing the credential."""
+    if not credential:
+        return search_api
+    return f"{search_api}:{credential_hash(credential)}"
+
+def load_rates() -> Dict[str, float]:
+    """Load the rates learned by earlier runs."""
+    if not RATE_LIMITS_PATH or not os.path.exists(RATE_LIMITS_PATH):
+        return {}
+    try:
+        with open(RATE_LIMITS_PATH, encoding="utf-8") as f:
+            return {key: float(rate) for key, rate in json.load(f).items()}
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable search rate limits in {RATE_LIMITS_PATH}: {str(e)}")
+        return {}
+
+def save_rates() -> None:
+    """Write the learned rates, merged with the ones saved by other processes, if any changed since the last save."""
+    global _rates_changed
+    with _rate_limiters_lock:
+        if not RATE_LIMITS_PATH or not _rates_changed:
+            return
+        _rates_changed = False
+        rates = {**load_rates(), **{key: limiter.rate for key, limiter in _rate_limiters.items()}}
+    try:
+        os.makedirs(os.path.dirname(RATE_LIMITS_PATH) or ".", exist_ok=True)
+        # Write to a temporary file first, so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(RATE_LIMITS_PATH) or ".")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(rates, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, RATE_LIMITS_PATH)
+    except OSError as e:
+        print(f"Could not save search rate limits to {RATE_LIMITS_PATH}: {str(e)}")
+        _rates_changed = True
+
+def schedule_save() -> None:
+    """Note that a rate changed, and save the rates if they were not saved recently.
+
+    The first change registers the exit hook saving the rates, so processes that never change a
+    rate never write the file. Saves made from an event loop run in a worker thread, since they
+    read and write the file.
+    """
+    global _last_save, _rates_changed, _exit_hook_registered
+    with _rate_limiters_lock:
+        _rates_changed = True
+        if not _exit_hook_registered:
+            atexit.register(save_rates)
+            _exit_hook_registered = True
+        if time.monotonic() - _last_save < SAVE_INTERVAL:
+            return
+        _last_save = time.monotonic()
+    try:
+        asyncio.get_running_loop().run_in_executor(None, save_rates)
+    except RuntimeError:
+        # No event loop in this thread
+        save_rates()
+
+def get_rate_limiter(search_api: str, credential: Optional[str] = None) -> AdaptiveRateLimiter:
+    """Get the process-wide rate limiter of a search API and credential.
+
+    Args:
+        search_api: Key of the search API in DEFAULT_RATE_LIMITS
+        credential: API key the requests are made with, as each key has its own quota
+
+    Returns:
+        The limiter, starting from the rate learned by earlier runs if there is one
+    """
+    global _saved_rates
+    key = rate_limiter_key(search_api, credential)
+    with _rate_limiters_lock:
+        if key not in _rate_limiters:
+            if _saved_rates is None:
+                _saved_rates = load_rates()
+            _rate_limiters[key] = AdaptiveRateLimiter(DEFAULT_RATE_LIMITS[search_api], _saved_rates.get(key))
+        return _rate_limiters[key]
@@ -0,0 +1,213 @@
+import asyncio
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from enum import Enum
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+from open_deep_research.search_results import SearchResponse
+
+class CircuitState(Enum):
+    CLOSED = "closed" # Requests go through
+    OPEN = "open" # Requests fail fast until the reset timeout has passed
+    HALF_OPEN = "half_open" # One trial request decides whether to close or reopen
+
+class CircuitBreaker:
+    """Stops calling a backend after repeated transient failures, and probes it again later.
+
+    After failure_threshold consecutive failed calls the circuit opens, and calls are refused
+    without reaching the backend. Once reset_timeout has passed, a single trial call is let
+    through: if it succeeds the circuit closes, otherwise it opens again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Check whether a call may go to the backend now.
+
+        Every allowed call must be followed by record_success or record_failure.
+        """
+        with self._lock:
+            if self.state == CircuitState.CLOSED:
+                return True
+            if self.state == CircuitState.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Let this call through as the trial, and refuse the others until it is done
+                self.state = CircuitState.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """Record a call that the backend answered."""
+        with self._lock:
+            self.state = CircuitState.CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        """Record a call that failed with a transient error."""
+        with self._lock:
+            self.failures += 1
+            if self.state == CircuitState.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = CircuitState.OPEN
+                self.opened_at = time.monotonic()
+
+# One circuit breaker per search API, shared by every run in this process
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(search_api: str) -> CircuitBreaker:
+    """Get the process-wide circuit breaker of a search API."""
+    with _circuit_breakers_lock:
+        if search_api not in _circuit_breakers:
+            _circuit_breakers[search_api] = CircuitBreaker()
+        return _circuit_breakers[search_api]
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter, honoring Retry-After when the backend sends one."""
+    max_attempts: int = 4 # Calls per query, including the first one
+    base_delay: float = 0.5 # Upper bound of the first delay in seconds, doubled on every retry
+    max_delay: float = 30.0 # Upper bound of any delay in seconds, including Retry-After
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Get the delay before the next attempt.
+
+        Args:
+            attempt: Number of the attempt that just failed, starting at 0
+            retry_after: Delay requested by the backend, if any
+
+        Returns:
+            Delay in seconds
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+# Error messages of transient failures, for backends that only report errors as strings
+TRANSIENT_ERROR_PATTERN = re.compile(r"\b(408|429|5\d\d)\b|too many requests|rate ?limit|timed? ?out|temporarily unavailable|connection (reset|refused|aborted|error)", re.IGNORECASE)
+
+def get_status_code(error: BaseException) -> Optional[int]:
+    """Get the HTTP status code of an error raised by requests, aiohttp or an API client."""
+    for source in (error, getattr(error, "response", None)):
+        for attribute in ("status_code", "status"):
+            status = getattr(source, attribute, None)
+            if isinstance(status, int):
+                return status
+    return None
+
+def is_transient_error(error: Union[BaseException, str]) -> bool:
+    """Check whether a failure is worth retrying: rate limits, server errors, timeouts and dropped connections.
+
+    Args:
+        error: Exception raised by a backend, or the error message it returned
+    """
+    if isinstance(error, BaseException):
+        status = get_status_code(error)
+        if status is not None:
+            return status in (408, 429) or 500 <= status < 600
+        if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+            return True
+    return bool(TRANSIENT_ERROR_PATTERN.search(str(error)))
+
+def get_retry_after(error: BaseException) -> Optional[float]:
+    """Get the delay requested by the Retry-After header of an error response, in seconds."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or getattr(error, "headers", None)
+    value = headers.get("Retry-After") if headers else None
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        # HTTP-date form
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def error_response(query: str, error: str) -> SearchResponse:
+    """Build an empty search response for a query that failed, so the report goes on without its sources."""
+    return SearchResponse(query=query, error=error)
+
+async def search_with_retry(search_api: str, query_list: List[str],
+                            search_fn: Callable[[List[str]], Awaitable[List[SearchResponse]]],
+                            policy: Optional[RetryPolicy] = None) -> List[SearchResponse]:
+    """Run search queries through a backend, retrying the queries that fail with transient errors.
+
+    Failures are either raised by the backend, failing every query of the call, or returned as
+    responses with an error, failing only those queries. Only the failed queries are retried.
+    Calls are refused while the circuit breaker of the search API is open, so a long outage costs
+    no waiting. Queries that still fail get an empty response with an error instead of
+    failing the report.
+
+    Args:
+        search_api: Name of the search API, selects its circuit breaker
+        query_list: Search queries to run
+        search_fn: Runs a list of queries against the backend, returning one response per query in order
+        policy: Retry policy, defaults to DEFAULT_RETRY_POLICY
+
+    Returns:
+        One search response per query, in order
+    """
+    policy = policy or DEFAULT_RETRY_POLICY
+    breaker = get_circuit_breaker(search_api)
+    responses: List[Optional[SearchResponse]] = [None] * len(query_list)
+    errors: Dict[int, str] = {}
+    pending = list(range(len(query_list)))
+
+    for attempt in range(policy.max_attempts):
+        if not breaker.allow_request():
+            for i in pending:
+                errors[i] = f"{search_api} is unavailable (circuit breaker open)"
+            break
+
+        retry_after = None
+        retry = []
+        try:
+            batch = await search_fn([query_list[i] for i in pending])
+        except Exception as e:
+            print(f"Error searching {search_api}: {str(e)}")
+            retry_after = get_retry_after(e)
+            for i in pending:
+                errors[i] = str(e)
+            retry = pending if is_transient_error(e) else []
+        else:
+            for i, response in zip(pending, batch):
+                if response.error:
+                    errors[i] = response.error
+                    if is_transient_error(response.error):
+                        retry.append(i)
+                else:
+                    responses[i] = response
+                    errors.pop(i, None)
+            # Queries the backend returned no response for fail, rather than being left out
+            for i in pending[len(batch):]:
+                errors[i] = f"no response from {search_api}"
+
+        # The backend is only unhealthy if nothing it was asked went through
+        if retry and len(retry) == len(pending):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+        pending = retry
+        if not pending:
+            break
+        if attempt < policy.max_attempts - 1:
+            await asyncio.sleep(policy.backoff(attempt, retry_after))
+
+    for i, error in errors.items():
+        if responses[i] is None:
+            responses[i] = error_response(query_list[i], error)
+    return responses
@@ -0,0 +1,119 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from open_deep_research.configuration import Configuration, ModelRole
+
+# Typical output tokens of a call in each role, to estimate its cost
+EXPECTED_OUTPUT_TOKENS = {
+    ModelRole.QUERY_WRITER: 200,
+    ModelRole.PLANNER: 2_000,
+    ModelRole.WRITER: 1_000,
+    ModelRole.GRADER: 300,
+    ModelRole.FINAL_WRITER: 1_000,
+}
+
+# Roles that get a thinking budget on models that support it, unless routes say otherwise
+THINKING_ROLES = {ModelRole.PLANNER, ModelRole.GRADER}
+
+# Models that get a thinking budget in THINKING_ROLES
+THINKING_MODELS = {"claude-3-7-sonnet-latest"}
+
+@dataclass
+class ModelRoute:
+    """A model that can serve a role, with what a call to it costs."""
+    provider: str # Model provider, as for init_chat_model
+    model: str # Model name
+    input_cost: float = 0.0 # USD per million input tokens
+    output_cost: float = 0.0 # USD per million output tokens
+    latency: Optional[float] = None # Typical seconds per call, unknown if None
+    max_input_tokens: Optional[int] = None # Largest input the model should get, e.g. a small model for short sections only
+    thinking_budget: Optional[int] = None # Thinking tokens per call, for models that support extended thinking
+
+    def expected_cost(self, input_tokens: int, output_tokens: int, thinking: bool = True) -> float:
+        """Estimate the cost of a call in USD, counting the thinking budget as output if thinking is used."""
+        if thinking:
+            output_tokens += self.thinking_budget or 0
+        return (input_tokens * self.input_cost + output_tokens * self.output_cost) / 1_000_000
+
+@dataclass
+class ModelChoice:
+    """The model picked for a call."""
+    role: ModelRole # Role the model serves
+    provider: str # Model provider
+    model: str # Model name
+    kwargs: Dict[str, Any] = field(default_factory=dict) # Additional arguments for get_chat_model
+    reason: str = "" # Why the model was picked
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a text, at about 4 characters per token."""
+    return len(text) // 4
+
+def model_kwargs(role: ModelRole, model: str, thinking_budget: Optional[int], allow_thinking: bool) -> Dict[str, Any]:
+    """Build the get_chat_model arguments of a model in a role."""
+    # The role is recorded with every call, see LLMUsageHandler
+    kwargs: Dict[str, Any] = {"metadata": {"model_role": role.value}}
+    if thinking_budget is None and role in THINKING_ROLES and model in THINKING_MODELS:
+        thinking_budget = 16_000
+    if thinking_budget and allow_thinking:
+        kwargs["max_tokens"] = thinking_budget + 4_000
+        kwargs["thinking"] = {"type": "enabled", "budget_tokens": thinking_budget}
+    return kwargs
+
+def default_model(configurable: Configuration, role: ModelRole) -> tuple[str, str]:
+    """Get the provider and model configured for a role, falling back to the planner or writer model."""
+    planner = (configurable.planner_provider, configurable.planner_model)
+    writer = (configurable.writer_provider, configurable.writer_model)
+    provider, model = {
+        ModelRole.QUERY_WRITER: (configurable.query_writer_provider or writer[0], configurable.query_writer_model or writer[1]),
+        ModelRole.PLANNER: planner,
+        ModelRole.WRITER: writer,
+        ModelRole.GRADER: (configurable.grader_provider or planner[0], configurable.grader_model or planner[1]),
+        ModelRole.FINAL_WRITER: (configurable.final_writer_provider or writer[0], configurable.final_writer_model or writer[1]),
+    }[role]
+    return provider, model
+
+def select_model(configurable: Configuration, role: ModelRole, input_tokens: int, allow_thinking: bool = True) -> ModelChoice:
+    """Pick the model for a call.
+
+    Without routes for the role in model_routes, the model configured for the role is used. With
+    routes, the cheapest route is used among those that accept the input size and are expected to
+    meet max_llm_cost_per_call and max_llm_latency. If no route meets the targets, the cheapest one
+    that accepts the input size is used, and if none accepts it, the one that accepts the largest inputs.
+
+    Args:
+        configurable: Configuration of the run
+        role: Role of the call
+        input_tokens: Estimated input tokens of the call, its complexity
+        allow_thinking: Whether the call may use a thinking budget
+
+    Returns:
+        The model to call
+    """
+    routes = [ModelRoute(**route) for route in (configurable.model_routes or {}).get(role.value, [])]
+    if not routes:
+        provider, model = default_model(configurable, role)
+        return ModelChoice(role, provider, model, model_kwargs(role, model, None, allow_thinking), "configured for the role")
+
+    output_tokens = EXPECTED_OUTPUT_TOKENS[role]
+
+    def cost(route: ModelRoute) -> float:
+        return route.expected_cost(input_tokens, output_tokens, allow_thinking)
+
+    def meets_targets(route: ModelRoute) -> bool:
+        if configurable.max_llm_cost_per_call is not None and cost(route) > configurable.max_llm_cost_per_call:
+            return False
+        if configurable.max_llm_latency is not None and route.latency is not None and route.latency > configurable.max_llm_latency:
+            return False
+        return True
+
+    fitting = [route for route in routes if route.max_input_tokens is None or input_tokens <= route.max_input_tokens]
+    within_targets = [route for route in fitting if meets_targets(route)]
+    if within_targets:
+        route, reason = min(within_targets, key=cost), "cheapest within targets"
+    elif fitting:
+        route, reason = min(fitting, key=cost), "cheapest for the input size, no route meets the targets"
+    else:
+        route = max(routes, key=lambda r: r.max_input_tokens)
+        reason = "largest input size, no route accepts the input"
+    return ModelChoice(role, route.provider, route.model, model_kwargs(role, route.model, route.thinking_budget, allow_thinking),
+                       f"{reason} ({input_tokens} input tokens)")
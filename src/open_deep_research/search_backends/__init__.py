@@ -0,0 +1,172 @@
+import asyncio
+import importlib
+import sys
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from importlib.metadata import entry_points
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple
+
+from open_deep_research.rate_limits import DEFAULT_RATE_LIMITS, RateLimit
+
+# Entry point group of the search backends of other packages. Each entry point loads a SearchBackend, e.g. in pyproject.toml:
+#   [project.entry-points."open_deep_research.search_backends"]
+#   brave = "my_package.search:BRAVE_BACKEND"
+ENTRY_POINT_GROUP = "open_deep_research.search_backends"
+
+@dataclass(frozen=True)
+class SearchBackend:
+    """A search API, with what the executor needs to know to call, schedule and budget it."""
+    name: str # Name of the search API, as set in search_api
+    module: str # Module of the search function, imported on first use
+    function: str # Name of the search function in the module, called with the queries and the parameters
+    params: Tuple[str, ...] = () # Parameters of search_api_config passed to the search function
+    credentials: Dict[str, str] = field(default_factory=dict) # Environment variable of each credential parameter, see get_search_credentials
+    rate_limit: Optional[RateLimit] = None # Request rates, for the search function's get_rate_limiter(name)
+    raw_content: bool = True # Whether results carry full content worth formatting, which the source budget then has to fit
+    concurrent: bool = True # Whether queries are independent and searched one by one as each is known, rather than as a batch the backend paces
+    max_concurrency: Optional[int] = None # Calls to the search function in flight at once per event loop, unlimited if None
+
+# Search backends by name. Modules are imported on first use, so a deployment only loads the
+# SDKs of the search APIs it actually searches with.
+SEARCH_BACKENDS: Dict[str, SearchBackend] = {}
+
+def register_search_backend(backend: SearchBackend) -> None:
+    """Make a search backend available to search_api and fallback_search_api, replacing any backend of the same name."""
+    SEARCH_BACKENDS[backend.name] = backend
+    if backend.rate_limit is not None:
+        DEFAULT_RATE_LIMITS[backend.name] = backend.rate_limit
+
+for _backend in (
+    # Tavily only returns the snippets we asked for, so raw content is left out
+    SearchBackend("tavily", "open_deep_research.search_backends.tavily", "tavily_search_async",
+                  credentials={"api_key": "TAVILY_API_KEY"},
+                  rate_limit=RateLimit(initial_rate=10.0, min_rate=0.5, max_rate=50.0),
+                  raw_content=False),
+    SearchBackend("perplexity", "open_deep_research.search_backends.perplexity", "perplexity_search",
+                  credentials={"api_key": "PERPLEXITY_API_KEY"},
+                  rate_limit=RateLimit(initial_rate=2.0, min_rate=0.1, max_rate=10.0),
+                  concurrent=False),
+    SearchBackend("exa", "open_deep_research.search_backends.exa", "exa_search",
+                  params=("max_characters", "num_results", "include_domains", "exclude_domains", "subpages"),
+                  credentials={"api_key": "EXA_API_KEY"},
+                  rate_limit=RateLimit(initial_rate=4.0, min_rate=0.2, max_rate=20.0),
+                  concurrent=False),
+    # arXiv asks clients for at most one request every 3 seconds, so its rate can only go down
+    SearchBackend("arxiv", "open_deep_research.search_backends.arxiv", "arxiv_search_async",
+                  params=("load_max_docs", "get_full_documents", "load_all_available_meta"),
+                  rate_limit=RateLimit(initial_rate=1 / 3, min_rate=0.05, max_rate=1 / 3),
+                  concurrent=False, max_concurrency=1),
+    # NCBI allows 3 requests per second without an API key and 10 with one
+    SearchBackend("pubmed", "open_deep_research.search_backends.pubmed", "pubmed_search_async",
+                  params=("top_k_results", "email", "api_key", "doc_content_chars_max"),
+                  credentials={"api_key": "PUBMED_API_KEY", "email": "PUBMED_EMAIL"},
+                  rate_limit=RateLimit(initial_rate=1.0, min_rate=0.2, max_rate=10.0),
+                  concurrent=False),
+    SearchBackend("linkup", "open_deep_research.search_backends.linkup", "linkup_search",
+                  params=("depth",),
+                  credentials={"api_key": "LINKUP_API_KEY"},
+                  rate_limit=RateLimit(initial_rate=5.0, min_rate=0.2, max_rate=20.0)),
+    # DDGS searches run on DDG_MAX_WORKERS threads, more calls in flight would only queue for them
+    SearchBackend("duckduckgo", "open_deep_research.search_backends.duckduckgo", "duckduckgo_search",
+                  params=("max_results", "fetch_full_content"),
+                  rate_limit=RateLimit(initial_rate=1.0, min_rate=0.1, max_rate=5.0),
+                  max_concurrency=4),
+    SearchBackend("googlesearch", "open_deep_research.search_backends.googlesearch", "google_search_async",
+                  params=("max_results", "include_raw_content"),
+                  credentials={"api_key": "GOOGLE_API_KEY", "cx": "GOOGLE_CX"},
+                  rate_limit=RateLimit(initial_rate=5.0, min_rate=0.2, max_rate=10.0),
+                  max_concurrency=5),
+    SearchBackend("local", "open_deep_research.search_backends.local", "local_search",
+                  params=("index_path", "max_results", "vector_weight")),
+):
+    register_search_backend(_backend)
+
+_entry_points_loaded = False
+_entry_points_lock = threading.Lock()
+
+def load_entry_point_backends() -> None:
+    """Register the search backends of the installed packages' entry points, once per process.
+
+    Entry points that fail to load or do not load a SearchBackend are reported and skipped.
+    """
+    global _entry_points_loaded
+    with _entry_points_lock:
+        if _entry_points_loaded:
+            return
+        _entry_points_loaded = True
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            try:
+                backend = entry_point.load()
+            except Exception as e:
+                print(f"Skipping search backend entry point {entry_point.name}: {str(e)}")
+                continue
+            if not isinstance(backend, SearchBackend):
+                print(f"Skipping search backend entry point {entry_point.name}: it is not a SearchBackend")
+                continue
+            register_search_backend(backend)
+
+def get_search_backend(search_api: str) -> SearchBackend:
+    """Get the backend of a search API, looking in the entry points for names not registered yet.
+
+    Args:
+        search_api: Name of the search API
+
+    Returns:
+        The search backend
+
+    Raises:
+        ValueError: If no backend has that name
+    """
+    if search_api not in SEARCH_BACKENDS:
+        load_entry_point_backends()
+    if search_api not in SEARCH_BACKENDS:
+        raise ValueError(f"Unsupported search API: {search_api}")
+    return SEARCH_BACKENDS[search_api]
+
+def get_search_function(search_api: str) -> Callable:
+    """Get the search function of a search API, importing its module on first use.
+
+    Args:
+        search_api: Name of the search API
+
+    Returns:
+        The search function, called with the queries and the parameters of the search API
+
+    Raises:
+        ValueError: If the search API is not supported
+    """
+    backend = get_search_backend(search_api)
+    return getattr(importlib.import_module(backend.module), backend.function)
+
+async def aget_search_function(search_api: str) -> Callable:
+    """Async version of get_search_function.
+
+    The first import of a module runs in a worker thread, since loading an SDK can take a second
+    during which the searches and LLM calls of other sections would otherwise stall.
+    """
+    if get_search_backend(search_api).module not in sys.modules:
+        await asyncio.get_running_loop().run_in_executor(None, get_search_function, search_api)
+    return get_search_function(search_api)
+
+# Semaphores enforcing max_concurrency, per event loop since asyncio primitives belong to one loop
+_concurrency_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+
+@asynccontextmanager
+async def concurrency_slot(search_api: str) -> AsyncIterator[None]:
+    """Hold one of the max_concurrency slots of a search API for the block, or none if it has no limit.
+
+    Example:
+        async with concurrency_slot("googlesearch"):
+            responses = await search_fn(queries)
+    """
+    max_concurrency = get_search_backend(search_api).max_concurrency
+    if max_concurrency is None:
+        yield
+        return
+    limits = _concurrency_limits.setdefault(asyncio.get_running_loop(), {})
+    if search_api not in limits:
+        limits[search_api] = asyncio.Semaphore(max_concurrency)
+    async with limits[search_api]:
+        yield
@@ -0,0 +1,121 @@
+import asyncio
+
+from langchain_community.retrievers import ArxivRetriever
+from langsmith import traceable
+
+from open_deep_research.rate_limits import get_rate_limiter
+from open_deep_research.search_results import SearchResponse, SearchResult
+
+@traceable
+async def arxiv_search_async(search_queries, load_max_docs=5, get_full_documents=True, load_all_available_meta=True):
+    """
+    Performs concurrent searches on arXiv using the ArxivRetriever.
+
+    Args:
+        search_queries (List[str]): List of search queries or article IDs
+        load_max_docs (int, optional): Maximum number of documents to return per query. Default is 5.
+        get_full_documents (bool, optional): Whether to fetch full text of documents. Default is True.
+        load_all_available_meta (bool, optional): Whether to load all available metadata. Default is True.
+
+    Returns:
+        List[SearchResponse]: Search responses from arXiv, one per query
+    """
+    
+    async def process_single_query(query):
+        try:
+            # Create retriever for each query
+            retriever = ArxivRetriever(
+                load_max_docs=load_max_docs,
+                get_full_documents=get_full_documents,
+                load_all_available_meta=load_all_available_meta
+            )
+            
+            # Run the synchronous retriever in a thread pool
+            loop = asyncio.get_running_loop()
+            async with rate_limiter.request():
+                docs = await loop.run_in_executor(None, lambda: retriever.invoke(query))
+            
+            results = []
+            # Assign decreasing scores based on the order
+            base_score = 1.0
+            score_decrement = 1.0 / (len(docs) + 1) if docs else 0
+            
+            for i, doc in enumerate(docs):
+                # Extract metadata
+                metadata = doc.metadata
+                
+                # Use entry_id as the URL (this is the actual arxiv link)
+                url = metadata.get('entry_id', '')
+                
+                # Format content with all useful metadata
+                content_parts = []
+
+                # Primary information
+                if 'Summary' in metadata:
+                    content_parts.append(f"Summary: {metadata['Summary']}")
+
+                if 'Authors' in metadata:
+                    content_parts.append(f"Authors: {metadata['Authors']}")
+
+                # Add publication information
+                published = metadata.get('Published')
+                published_str = published.isoformat() if hasattr(published, 'isoformat') else str(published) if published else ''
+                if published_str:
+                    content_parts.append(f"Published: {published_str}")
+
+                # Add additional metadata if available
+                if 'primary_category' in metadata:
+                    content_parts.append(f"Primary Category: {metadata['primary_category']}")
+
+                if 'categories' in metadata and metadata['categories']:
+                    content_parts.append(f"Categories: {', '.join(metadata['categories'])}")
+
+                if 'comment' in metadata and metadata['comment']:
+                    content_parts.append(f"Comment: {metadata['comment']}")
+
+                if 'journal_ref' in metadata and metadata['journal_ref']:
+                    content_parts.append(f"Journal Reference: {metadata['journal_ref']}")
+
+                if 'doi' in metadata and metadata['doi']:
+                    content_parts.append(f"DOI: {metadata['doi']}")
+
+                # Get PDF link if available in the links
+                pdf_link = ""
+                if 'links' in metadata and metadata['links']:
+                    for link in metadata['links']:
+                        if 'pdf' in link:
+                            pdf_link = link
+                            content_parts.append(f"PDF: {pdf_link}")
+                            break
+
+                # Join all content parts with newlines 
+                content = "\n".join(content_parts)
+                
+                result = SearchResult(
+                    title=metadata.get('Title', ''),
+                    url=url,  # Using entry_id as the URL
+                    content=content,
+                    score=base_score - (i * score_decrement),
+                    raw_content=doc.page_content if get_full_documents else None
+                )
+                results.append(result)
+                
+            return SearchResponse(query=query, results=results)
+        except Exception as e:
+            # Handle exceptions gracefully
+            print(f"Error processing arXiv query '{query}': {str(e)}")
+            return SearchResponse(query=query, error=str(e))
+    
+    # Process queries sequentially, paced by the rate limiter (at most 1 request per 3 seconds for arXiv)
+    rate_limiter = get_rate_limiter("arxiv")
+    search_docs = []
+    for query in search_queries:
+        try:
+            result = await process_single_query(query)
+            search_docs.append(result)
+        except Exception as e:
+            # Handle exceptions gracefully
+            print(f"Error processing arXiv query '{query}': {str(e)}")
+            search_docs.append(SearchResponse(query=query, error=str(e)))
+    
+    return search_docs
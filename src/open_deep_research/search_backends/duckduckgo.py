@@ -0,0 +1,85 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from duckduckgo_search import DDGS
+from langsmith import traceable
+
+from open_deep_research.rate_limits import get_rate_limiter
+from open_deep_research.search_backends.page_content import fetch_page_contents
+from open_deep_research.search_results import SearchResponse, SearchResult
+
+# Threads running DuckDuckGo searches, shared by every search in the process. DDGS is synchronous,
+# so this bounds the searches in flight without tying up the default executor.
+DDG_MAX_WORKERS = 4
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_sessions = threading.local()
+
+def get_ddg_executor() -> ThreadPoolExecutor:
+    """Get the process-wide thread pool of DuckDuckGo searches, created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DDG_MAX_WORKERS, thread_name_prefix="duckduckgo")
+        return _executor
+
+def get_ddgs() -> DDGS:
+    """Get the DDGS session of the current worker thread, so its connections and cookies are reused across searches."""
+    ddgs = getattr(_sessions, "ddgs", None)
+    if ddgs is None:
+        ddgs = _sessions.ddgs = DDGS()
+    return ddgs
+
+def search_text(query: str, max_results: int) -> List[dict]:
+    """Search DuckDuckGo on the session of the current thread.
+
+    A session that fails is dropped, so the next search starts with new cookies instead of the
+    ones DuckDuckGo may have throttled.
+    """
+    try:
+        return get_ddgs().text(query, max_results=max_results)
+    except Exception:
+        _sessions.ddgs = None
+        raise
+
+@traceable
+async def duckduckgo_search(search_queries, max_results: int = 5, fetch_full_content: bool = False):
+    """Perform searches using DuckDuckGo
+
+    Searches run on a bounded pool of threads with one DDGS session each, paced by the rate limiter
+    of DuckDuckGo. A throttled search raises, which halves the rate and lets search_with_retry back off.
+
+    Args:
+        search_queries (List[str]): List of search queries to process
+        max_results (int): Maximum number of results to return per query
+        fetch_full_content (bool): Whether to replace the snippets of the results with the text of their pages
+
+    Returns:
+        List[SearchResponse]: Search responses from DuckDuckGo, one per query
+    """
+    loop = asyncio.get_running_loop()
+    rate_limiter = get_rate_limiter("duckduckgo")
+
+    async def process_single_query(query):
+        async with rate_limiter.request():
+            ddg_results = await loop.run_in_executor(get_ddg_executor(), search_text, query, max_results)
+
+        results = [
+            SearchResult(
+                title=result.get('title', ''),
+                url=result.get('href', ''),
+                content=result.get('body', ''),
+                score=1.0 - (i * 0.1),  # Simple scoring mechanism
+                raw_content=result.get('body', '')
+            )
+            for i, result in enumerate(ddg_results)
+        ]
+        if fetch_full_content:
+            await fetch_page_contents(results)
+        return SearchResponse(query=query, results=results)
+
+    # Execute all queries concurrently, paced by the rate limiter
+    return await asyncio.gather(*(process_single_query(query) for query in search_queries))
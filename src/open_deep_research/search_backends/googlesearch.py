@@ -0,0 +1,204 @@
+import asyncio
+import math
+import os
+import weakref
+from typing import List, Optional, Union
+from urllib.parse import unquote
+
+from bs4 import BeautifulSoup
+from langsmith import traceable
+
+from open_deep_research.rate_limits import get_rate_limiter
+from open_deep_research.search_backends.page_content import fetch_page_contents, random_user_agent, shared_session
+from open_deep_research.search_results import SearchResponse, SearchResult
+
+# Result pages scraped from Google, set GOOGLE_SCRAPE_URL to scrape a stand-in server instead
+GOOGLE_SCRAPE_URL = "https://www.google.com/search"
+
+# Results on each scraped result page
+RESULTS_PER_PAGE = 10
+
+# Politeness budget of scraping, besides the pace of queries set by the googlesearch_scrape rate limiter:
+# result pages in flight at once per event loop, and result pages per query
+SCRAPE_MAX_CONCURRENCY = 2
+SCRAPE_MAX_PAGES = 3
+
+# Cookies that skip Google's consent page, sent with every scraping request
+CONSENT_COOKIES = {
+    'CONSENT': 'PENDING+987',
+    'SOCS': 'CAESHAgBEhIaAB',
+}
+
+# Semaphores enforcing SCRAPE_MAX_CONCURRENCY, per event loop since asyncio primitives belong to one loop
+_scrape_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+def parse_result_page(html: str) -> List[SearchResult]:
+    """Extract the results of a Google result page, in page order.
+
+    Args:
+        html: Result page, as served to text browsers
+
+    Returns:
+        Results with a title, a URL and a snippet, both as content and raw content
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    results = []
+    for result in soup.find_all("div", class_="ezO2md"):
+        link_tag = result.find("a", href=True)
+        title_tag = link_tag.find("span", class_="CVA68e") if link_tag else None
+        description_tag = result.find("span", class_="FrIlee")
+
+        if link_tag and title_tag and description_tag:
+            link = unquote(link_tag["href"].split("&")[0].replace("/url?q=", ""))
+            description = description_tag.text
+            results.append(SearchResult(
+                title=title_tag.text,
+                url=link,
+                content=description,
+                raw_content=description
+            ))
+    return results
+
+async def scrape_google(query: str, max_results: int) -> List[SearchResult]:
+    """Scrape the results of a query from Google's result pages.
+
+    Each query takes one slot of the scraping rate limiter, then requests the pages needed for
+    max_results, up to SCRAPE_MAX_PAGES, together on the shared session. At most
+    SCRAPE_MAX_CONCURRENCY pages are in flight at once per event loop, whatever the number of
+    queries. Pages are parsed in a worker thread, off the event loop. Errors are left to the
+    caller, after the rate limiter has seen them.
+
+    Args:
+        query: Search query
+        max_results: Maximum number of results to return
+
+    Returns:
+        Results without duplicate URLs, in page order
+    """
+    loop = asyncio.get_running_loop()
+    rate_limiter = get_rate_limiter("googlesearch_scrape")
+    semaphore = _scrape_semaphores.setdefault(loop, asyncio.Semaphore(SCRAPE_MAX_CONCURRENCY))
+    url = os.environ.get("GOOGLE_SCRAPE_URL") or GOOGLE_SCRAPE_URL
+    num_pages = min(SCRAPE_MAX_PAGES, max(1, math.ceil(max_results / RESULTS_PER_PAGE)))
+
+    async with shared_session() as session:
+        async def fetch_page(start: int) -> List[SearchResult]:
+            params = {
+                "q": query,
+                "num": max_results + 2,
+                "hl": "en",
+                "start": start,
+                "safe": "active",
+            }
+            async with semaphore:
+                async with session.get(url, params=params, cookies=CONSENT_COOKIES,
+                                       headers={"User-Agent": random_user_agent(), "Accept": "*/*"}) as response:
+                    response.raise_for_status()
+                    html = await response.text()
+            return await loop.run_in_executor(None, parse_result_page, html)
+
+        # One slot for all the pages of the query, so they overlap rather than wait for the pace of the limiter
+        async with rate_limiter.request():
+            pages = await asyncio.gather(*(fetch_page(page * RESULTS_PER_PAGE) for page in range(num_pages)))
+
+    results = {}
+    for page in pages:
+        for result in page:
+            results.setdefault(result.url, result)
+    return list(results.values())[:max_results]
+
+async def search_google_api(query: str, max_results: int, api_key: str, cx: str) -> List[SearchResult]:
+    """Search a query with the Google Custom Search API, on the shared session.
+
+    Args:
+        query: Search query
+        max_results: Maximum number of results to return
+        api_key: Google API key
+        cx: Custom search engine ID
+
+    Returns:
+        Results with a title, a URL and a snippet, both as content and raw content
+    """
+    rate_limiter = get_rate_limiter("googlesearch", api_key)
+    results = []
+    async with shared_session() as session:
+        # The API returns up to 10 results per request
+        for start_index in range(1, max_results + 1, 10):
+            # Calculate how many results to request in this batch
+            num = min(10, max_results - (start_index - 1))
+            params = {
+                'q': query,
+                'key': api_key,
+                'cx': cx,
+                'start': start_index,
+                'num': num
+            }
+            print(f"Requesting {num} results for '{query}' from Google API...")
+
+            async with rate_limiter.request():
+                async with session.get('https://www.googleapis.com/customsearch/v1', params=params) as response:
+                    if response.status != 200:
+                        error_text = await response.text()
+                        print(f"API error: {response.status}, {error_text}")
+                        response.raise_for_status()
+                    data = await response.json()
+
+            for item in data.get('items', []):
+                results.append(SearchResult(
+                    title=item.get('title', ''),
+                    url=item.get('link', ''),
+                    content=item.get('snippet', ''),
+                    raw_content=item.get('snippet', '')
+                ))
+
+            # If we didn't get a full page of results, no need to request more
+            if not data.get('items') or len(data.get('items', [])) < num:
+                break
+    return results
+
+@traceable
+async def google_search_async(search_queries: Union[str, List[str]], max_results: int = 5, include_raw_content: bool = True,
+                              api_key: Optional[str] = None, cx: Optional[str] = None):
+    """
+    Performs concurrent web searches using Google.
+    Uses Google Custom Search API if credentials are set, otherwise falls back to web scraping.
+
+    Args:
+        search_queries (List[str]): List of search queries to process
+        max_results (int): Maximum number of results to return per query
+        include_raw_content (bool): Whether to fetch full page content
+        api_key (str, optional): Google API key. Defaults to the GOOGLE_API_KEY environment variable.
+        cx (str, optional): Custom search engine ID. Defaults to the GOOGLE_CX environment variable.
+
+    Returns:
+        List[SearchResponse]: Search responses from Google, one per query
+    """
+    # Check for API credentials, falling back to environment variables
+    api_key = api_key or os.environ.get("GOOGLE_API_KEY")
+    cx = cx or os.environ.get("GOOGLE_CX")
+    use_api = bool(api_key and cx)
+
+    # Handle case where search_queries is a single string
+    if isinstance(search_queries, str):
+        search_queries = [search_queries]
+
+    async def search_single_query(query):
+        try:
+            if use_api:
+                results = await search_google_api(query, max_results, api_key, cx)
+            else:
+                print(f"Scraping Google for '{query}'...")
+                results = await scrape_google(query, max_results)
+
+            # If requested, fetch full page content asynchronously (for both API and web scraping)
+            if include_raw_content and results:
+                await fetch_page_contents(results)
+                print(f"Fetched full content for {len(results)} results")
+
+            return SearchResponse(query=query, results=results)
+        except Exception as e:
+            print(f"Error in Google search for query '{query}': {str(e)}")
+            return SearchResponse(query=query, error=str(e))
+
+    # Execute all searches concurrently, within the budgets of the API or of scraping
+    return await asyncio.gather(*(search_single_query(query) for query in search_queries))
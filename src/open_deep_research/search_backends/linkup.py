@@ -0,0 +1,57 @@
+import asyncio
+import os
+from typing import Optional
+
+from langsmith import traceable
+from linkup import LinkupClient
+
+from open_deep_research.clients import SEARCH_CLIENT_CACHE_SIZE, ClientCache, credential_hash
+from open_deep_research.rate_limits import get_rate_limiter
+from open_deep_research.search_results import SearchResponse, SearchResult
+
+_clients: ClientCache[LinkupClient] = ClientCache(SEARCH_CLIENT_CACHE_SIZE)
+
+def get_linkup_client(api_key: Optional[str]) -> LinkupClient:
+    """Get the shared Linkup client for an API key, so its connection pool is reused across searches."""
+    return _clients.get(credential_hash(api_key), lambda: LinkupClient(api_key=api_key))
+
+@traceable
+async def linkup_search(search_queries, depth: Optional[str] = "standard", api_key: Optional[str] = None):
+    """
+    Performs concurrent web searches using the Linkup API.
+
+    Args:
+        search_queries (List[SearchQuery]): List of search queries to process
+        depth (str, optional): "standard" (default)  or "deep". More details here https://docs.linkup.so/pages/documentation/get-started/concepts
+        api_key (str, optional): Linkup API key. Defaults to the LINKUP_API_KEY environment variable.
+
+    Returns:
+        List[SearchResponse]: Search responses from Linkup API, one per query
+    """
+    api_key = api_key or os.getenv("LINKUP_API_KEY")
+    client = get_linkup_client(api_key)
+    rate_limiter = get_rate_limiter("linkup", api_key)
+
+    async def search_single_query(query):
+        async with rate_limiter.request():
+            return await client.async_search(
+                query,
+                depth,
+                output_type="searchResults",
+            )
+
+    search_tasks = [search_single_query(query) for query in search_queries]
+
+    search_results = []
+    for query, response in zip(search_queries, await asyncio.gather(*search_tasks)):
+        search_results.append(
+            SearchResponse(
+                query=query,
+                results=[
+                    SearchResult(title=result.name, url=result.url, content=result.content)
+                    for result in response.results
+                ],
+            )
+        )
+
+    return search_results
@@ -0,0 +1,39 @@
+import asyncio
+import os
+from typing import Optional
+
+from langsmith import traceable
+
+from open_deep_research.local_index import get_local_index
+from open_deep_research.search_results import SearchResponse
+
+@traceable
+async def local_search(search_queries, index_path: Optional[str] = None, max_results: int = 5, vector_weight: float = 0.0):
+    """Search a local corpus indexed with open-deep-research-index, without any network access.
+    
+    Args:
+        search_queries (List[str]): List of search queries to process
+        index_path (str, optional): Directory of the index. Defaults to the LOCAL_INDEX_PATH environment variable.
+        max_results (int): Maximum number of passages to return per query
+        vector_weight (float): Share of the score given to vector similarity, for indexes built with --vectors.
+            Default is 0, BM25 only.
+        
+    Returns:
+        List[SearchResponse]: Search responses, one per query.
+            Each result is a passage of an indexed file, with a file:// URL.
+            
+    Raises:
+        ValueError: If no index path is given or the directory holds no index
+    """
+    index_path = index_path or os.environ.get("LOCAL_INDEX_PATH")
+    if not index_path:
+        raise ValueError("Set LOCAL_INDEX_PATH or the index_path search parameter to use the local search API")
+    index = get_local_index(index_path)
+    
+    def search_all():
+        return [SearchResponse(query=query, results=index.search(query, max_results, vector_weight))
+                for query in search_queries]
+    
+    # Queries take milliseconds, but are kept off the event loop all the same
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, search_all)
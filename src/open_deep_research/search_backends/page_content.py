@@ -0,0 +1,98 @@
+import asyncio
+import random
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+from open_deep_research.search_results import SearchResult
+
+# Accept header of page requests, as a browser would send it
+PAGE_ACCEPT = "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8"
+
+def random_user_agent() -> str:
+    """Generate a random text browser user agent string."""
+    lynx_version = f"Lynx/{random.randint(2, 3)}.{random.randint(8, 9)}.{random.randint(0, 2)}"
+    libwww_version = f"libwww-FM/{random.randint(2, 3)}.{random.randint(13, 15)}"
+    ssl_mm_version = f"SSL-MM/{random.randint(1, 2)}.{random.randint(3, 5)}"
+    openssl_version = f"OpenSSL/{random.randint(1, 3)}.{random.randint(0, 4)}.{random.randint(0, 9)}"
+    return f"{lynx_version} {libwww_version} {ssl_mm_version} {openssl_version}"
+
+# Session shared by the searches in flight on each event loop, see shared_session
+_shared_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+@asynccontextmanager
+async def shared_session() -> AsyncIterator[aiohttp.ClientSession]:
+    """Use the HTTP session shared by the searches in flight on the current event loop.
+
+    The first search opens the session and the last one in flight closes it, so concurrent searches
+    reuse its connections and no session outlives its loop. The cookie jar outlives the session,
+    so cookies a site sets (e.g. Google's) are sent by every later search of the loop.
+
+    Example:
+        async with shared_session() as session:
+            async with session.get(url) as response:
+                html = await response.text()
+    """
+    shared = _shared_sessions.setdefault(asyncio.get_running_loop(), {"session": None, "users": 0, "cookie_jar": None})
+    if shared["session"] is None:
+        if shared["cookie_jar"] is None:
+            shared["cookie_jar"] = aiohttp.CookieJar()
+        shared["session"] = aiohttp.ClientSession(cookie_jar=shared["cookie_jar"])
+    session = shared["session"]
+    shared["users"] += 1
+    try:
+        yield session
+    finally:
+        shared["users"] -= 1
+        if shared["users"] == 0 and shared["session"] is session:
+            # Detached before closing, so a search starting meanwhile opens a new session
+            shared["session"] = None
+            await session.close()
+
+def html_to_text(html: str) -> str:
+    """Extract the text of an HTML page."""
+    return BeautifulSoup(html, "html.parser").get_text()
+
+async def fetch_page_contents(results: List[SearchResult], max_concurrency: int = 3, timeout: float = 10.0) -> None:
+    """Replace the raw content of search results with the text of their pages.
+
+    Pages are fetched concurrently on the shared session, a few at a time and after a short random
+    pause each, so a site linked by several results is not hit all at once. HTML is parsed in a
+    worker thread, off the event loop. Pages that cannot be fetched or parsed get a note as raw content
+    instead, so a failure costs one source rather than the search.
+
+    Args:
+        results: Results to fill in, changed in place
+        max_concurrency: Pages fetched at once
+        timeout: Seconds allowed per page
+    """
+    if not results:
+        return
+    semaphore = asyncio.Semaphore(max_concurrency)
+    loop = asyncio.get_running_loop()
+
+    async def fetch(session: aiohttp.ClientSession, result: SearchResult) -> None:
+        async with semaphore:
+            try:
+                await asyncio.sleep(0.2 + random.random() * 0.6)
+                headers = {"User-Agent": random_user_agent(), "Accept": PAGE_ACCEPT}
+                async with session.get(result.url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                    if response.status != 200:
+                        return
+                    content_type = response.headers.get("Content-Type", "").lower()
+                    # PDFs and other binary files are not parsed
+                    if "application/pdf" in content_type or "application/octet-stream" in content_type:
+                        result.raw_content = f"[Binary content: {content_type}. Content extraction not supported for this file type.]"
+                        return
+                    # Decode with replacements for non-UTF8 characters
+                    html = await response.text(errors="replace")
+                result.raw_content = await loop.run_in_executor(None, html_to_text, html)
+            except Exception as e:
+                print(f"Warning: Failed to fetch content for {result.url}: {str(e)}")
+                result.raw_content = f"[Error fetching content: {str(e)}]"
+
+    async with shared_session() as session:
+        await asyncio.gather(*(fetch(session, result) for result in results))
@@ -0,0 +1,86 @@
+import os
+from typing import Optional
+
+from langsmith import traceable
+
+from open_deep_research.rate_limits import get_rate_limiter
+from open_deep_research.search_backends.page_content import shared_session
+from open_deep_research.search_results import SearchResponse, SearchResult
+
+@traceable
+async def perplexity_search(search_queries, api_key: Optional[str] = None):
+    """Search the web using the Perplexity API.
+
+    Queries are searched one after another on the shared session, paced by the rate limiter of Perplexity.
+
+    Args:
+        search_queries (List[SearchQuery]): List of search queries to process
+        api_key (str, optional): Perplexity API key. Defaults to the PERPLEXITY_API_KEY environment variable.
+
+    Returns:
+        List[SearchResponse]: Search responses from Perplexity API, one per query
+    """
+
+    api_key = api_key or os.getenv("PERPLEXITY_API_KEY")
+    rate_limiter = get_rate_limiter("perplexity", api_key)
+    headers = {
+        "accept": "application/json",
+        "content-type": "application/json",
+        "Authorization": f"Bearer {api_key}"
+    }
+
+    search_docs = []
+    async with shared_session() as session:
+        for query in search_queries:
+
+            payload = {
+                "model": "sonar-pro",
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": "Search the web and provide factual information with sources."
+                    },
+                    {
+                        "role": "user",
+                        "content": query
+                    }
+                ]
+            }
+
+            async with rate_limiter.request():
+                async with session.post(
+                    "https://api.perplexity.ai/chat/completions",
+                    headers=headers,
+                    json=payload
+                ) as response:
+                    response.raise_for_status()  # Raise exception for bad status codes
+                    data = await response.json()
+
+            # Parse the response
+            content = data["choices"][0]["message"]["content"]
+            citations = data.get("citations", ["https://perplexity.ai"])
+
+            # Create results list for this query
+            results = []
+
+            # First citation gets the full content
+            results.append(SearchResult(
+                title=f"Perplexity Search, Source 1",
+                url=citations[0],
+                content=content,
+                raw_content=content,
+                score=1.0
+            ))
+
+            # Add additional citations without duplicating content
+            for i, citation in enumerate(citations[1:], start=2):
+                results.append(SearchResult(
+                    title=f"Perplexity Search, Source {i}",
+                    url=citation,
+                    content="See primary source for full content",
+                    score=0.5  # Lower score for secondary sources
+                ))
+
+            search_docs.append(SearchResponse(query=query, results=results))
+
+    return search_docs
@@ -0,0 +1,104 @@
+import asyncio
+
+from langchain_community.utilities.pubmed import PubMedAPIWrapper
+from langsmith import traceable
+
+from open_deep_research.rate_limits import get_rate_limiter
+from open_deep_research.search_results import SearchResponse, SearchResult
+
+@traceable
+async def pubmed_search_async(search_queries, top_k_results=5, email=None, api_key=None, doc_content_chars_max=4000):
+    """
+    Performs concurrent searches on PubMed using the PubMedAPIWrapper.
+
+    Args:
+        search_queries (List[str]): List of search queries
+        top_k_results (int, optional): Maximum number of documents to return per query. Default is 5.
+        email (str, optional): Email address for PubMed API. Required by NCBI.
+        api_key (str, optional): API key for PubMed API for higher rate limits.
+        doc_content_chars_max (int, optional): Maximum characters for document content. Default is 4000.
+
+    Returns:
+        List[SearchResponse]: Search responses from PubMed, one per query
+    """
+    
+    async def process_single_query(query):
+        try:
+            # print(f"Processing PubMed query: '{query}'")
+            
+            # Create PubMed wrapper for the query
+            wrapper = PubMedAPIWrapper(
+                top_k_results=top_k_results,
+                doc_content_chars_max=doc_content_chars_max,
+                email=email if email else "your_email@example.com",
+                api_key=api_key if api_key else ""
+            )
+            
+            # Run the synchronous wrapper in a thread pool
+            loop = asyncio.get_running_loop()
+            
+            # Use wrapper.lazy_load instead of load to get better visibility
+            async with rate_limiter.request():
+                docs = await loop.run_in_executor(None, lambda: list(wrapper.lazy_load(query)))
+            
+            print(f"Query '{query}' returned {len(docs)} results")
+            
+            results = []
+            # Assign decreasing scores based on the order
+            base_score = 1.0
+            score_decrement = 1.0 / (len(docs) + 1) if docs else 0
+            
+            for i, doc in enumerate(docs):
+                # Format content with metadata
+                content_parts = []
+                
+                if doc.get('Published'):
+                    content_parts.append(f"Published: {doc['Published']}")
+                
+                if doc.get('Copyright Information'):
+                    content_parts.append(f"Copyright Information: {doc['Copyright Information']}")
+                
+                if doc.get('Summary'):
+                    content_parts.append(f"Summary: {doc['Summary']}")
+                
+                # Generate PubMed URL from the article UID
+                uid = doc.get('uid', '')
+                url = f"https://pubmed.ncbi.nlm.nih.gov/{uid}/" if uid else ""
+                
+                # Join all content parts with newlines
+                content = "\n".join(content_parts)
+                
+                result = SearchResult(
+                    title=doc.get('Title', ''),
+                    url=url,
+                    content=content,
+                    score=base_score - (i * score_decrement),
+                    raw_content=doc.get('Summary', '')
+                )
+                results.append(result)
+            
+            return SearchResponse(query=query, results=results)
+        except Exception as e:
+            # Handle exceptions with more detailed information
+            error_msg = f"Error processing PubMed query '{query}': {str(e)}"
+            print(error_msg)
+            import traceback
+            print(traceback.format_exc())  # Print full traceback for debugging
+            
+            return SearchResponse(query=query, error=str(e))
+    
+    # Process all queries sequentially, paced by the rate limiter of the API key
+    rate_limiter = get_rate_limiter("pubmed", api_key)
+    search_docs = []
+    for query in search_queries:
+        try:
+            result = await process_single_query(query)
+            search_docs.append(result)
+        except Exception as e:
+            # Handle exceptions gracefully
+            error_msg = f"Error in main loop processing PubMed query '{query}': {str(e)}"
+            print(error_msg)
+            
+            search_docs.append(SearchResponse(query=query, error=str(e)))
+    
+    return search_docs
@@ -0,0 +1,48 @@
+import asyncio
+import os
+from typing import Optional
+
+from langsmith import traceable
+from tavily import AsyncTavilyClient
+
+from open_deep_research.clients import SEARCH_CLIENT_CACHE_SIZE, ClientCache, credential_hash
+from open_deep_research.rate_limits import get_rate_limiter
+from open_deep_research.search_results import SearchResponse
+
+_clients: ClientCache[AsyncTavilyClient] = ClientCache(SEARCH_CLIENT_CACHE_SIZE)
+
+def get_tavily_client(api_key: Optional[str]) -> AsyncTavilyClient:
+    """Get the shared Tavily client for an API key, so its connection pool is reused across searches."""
+    return _clients.get(credential_hash(api_key), lambda: AsyncTavilyClient(api_key=api_key))
+
+@traceable
+async def tavily_search_async(search_queries, api_key: Optional[str] = None):
+    """
+    Performs concurrent web searches using the Tavily API.
+
+    Args:
+        search_queries (List[SearchQuery]): List of search queries to process
+        api_key (str, optional): Tavily API key. Defaults to the TAVILY_API_KEY environment variable.
+
+    Returns:
+        List[SearchResponse]: Search responses from Tavily API, one per query
+    """
+    api_key = api_key or os.getenv("TAVILY_API_KEY")
+    tavily_async_client = get_tavily_client(api_key)
+    rate_limiter = get_rate_limiter("tavily", api_key)
+
+    async def search_single_query(query):
+        async with rate_limiter.request():
+            return await tavily_async_client.search(
+                query,
+                max_results=5,
+                include_raw_content=True,
+                topic="general"
+            )
+
+    search_tasks = [search_single_query(query) for query in search_queries]
+
+    # Execute all searches concurrently
+    search_docs = await asyncio.gather(*search_tasks)
+
+    return [SearchResponse.from_dict(doc) for doc in search_docs]
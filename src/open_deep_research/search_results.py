@@ -0,0 +1,47 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+@dataclass(slots=True)
+class SearchResult:
+    """One result of a search query.
+
+    Slotted, so a result takes a fixed few words besides its strings, rather than a dict with
+    its keys repeated in every result.
+    """
+    title: str # Title of the page or document
+    url: str # URL of the result, sources are deduplicated by it
+    content: str # Summary or snippet of the content
+    score: Optional[float] = None # Relevance score on the backend's own scale, None if it gives none
+    raw_content: Optional[str] = None # Full content if the backend fetched it
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a Tavily-shaped result, for JSON archives and caches."""
+        return {"title": self.title, "url": self.url, "content": self.content,
+                "score": self.score, "raw_content": self.raw_content}
+
+    @classmethod
+    def from_dict(cls, result: Dict[str, Any]) -> "SearchResult":
+        """Build from a Tavily-shaped result, ignoring fields other than the ones of SearchResult."""
+        return cls(title=result.get("title") or "", url=result.get("url") or "", content=result.get("content") or "",
+                   score=result.get("score"), raw_content=result.get("raw_content"))
+
+@dataclass(slots=True)
+class SearchResponse:
+    """The results of one search query, as returned by every search backend."""
+    query: str # Query the results are for
+    results: List[SearchResult] = field(default_factory=list) # Results, in the backend's order
+    error: Optional[str] = None # Why the query failed, None if it succeeded
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a Tavily-shaped response, for JSON archives and caches."""
+        response = {"query": self.query, "results": [result.to_dict() for result in self.results]}
+        if self.error is not None:
+            response["error"] = self.error
+        return response
+
+    @classmethod
+    def from_dict(cls, response: Dict[str, Any]) -> "SearchResponse":
+        """Build from a Tavily-shaped response, dropping its unused fields such as answer and images."""
+        return cls(query=response.get("query") or "",
+                   results=[SearchResult.from_dict(result) for result in response.get("results") or []],
+                   error=response.get("error"))
@@ -0,0 +1,307 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Windows has no flock, so processes sharing a cache directory there are not coordinated
+    fcntl = None
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Dimension of the hashed n-gram vectors
+EMBEDDING_DIM = 512
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Weight of a whole word relative to one of its trigrams, so that queries differing by a short word
+# (e.g. a version number) are told apart
+WORD_WEIGHT = 2.0
+
+def ngram_features(text: str) -> List[Tuple[str, float]]:
+    """Split a text into its lowercased words and the character trigrams of each word, with their weights.
+
+    Trigrams are taken within words, so reordering the words of a query does not change its features,
+    and inflections of a word still share most of them.
+    """
+    words = TOKEN_PATTERN.findall(text.lower())
+    features = [(word, WORD_WEIGHT) for word in words]
+    for word in words:
+        padded = f" {word} "
+        features.extend((padded[i:i + 3], 1.0) for i in range(len(padded) - 2))
+    return features
+
+# Words left out when comparing the terms of queries
+STOPWORDS = frozenset("""
+a about after all an and any are as at be before between by can compared do does during for from how
+in into is it its of on or over than that the their these this those to under vs versus was what when
+which while who why with without
+""".split())
+
+# Suffixes of drug names (statins, fluoroquinolones, ACE inhibitors, antibodies...), whose queries differ by a few letters
+DRUG_SUFFIX_PATTERN = re.compile(
+    r"(?:statin|floxacin|cillin|mycin|cycline|pril|sartan|olol|dipine|azole|tidine|gliflozin|gliptin|glutide|formin"
+    r"|mab|nib|vir|parin|xaban|gatran|semide|thiazide|oxetine|triptan|azepam|profen|olone|isone)$"
+)
+
+# Words at least this long are rare enough to set a query apart, e.g. "contraindications" and "indications"
+RARE_WORD_LENGTH = 8
+
+# Cached queries most similar to a query that are checked for a hit
+MAX_CANDIDATES = 8
+
+def _stem(word: str) -> str:
+    """Reduce a lowercased word to its singular, e.g. "therapies" to "therapy" and "NSAIDs" to "nsaid"."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def _query_words(text: str) -> List[Tuple[str, bool]]:
+    """Split a query into its terms, each with whether it is a number, an acronym, a drug name or a rare word.
+
+    Stopwords are left out and words are stemmed. A number is kept with the word before it, stopwords
+    aside (e.g. "type 1"), so "type 1 and type 2" and "type 2 and type 1" have the same terms but
+    "type 1 of stage 2" and "type 2 of stage 1" do not. Acronyms are words with two capitals or more
+    in the query as written (e.g. "CKD", "NSAIDs").
+    """
+    words: List[Tuple[str, bool]] = []
+    previous = None
+    for token in TOKEN_PATTERN.findall(text):
+        word = token.lower()
+        if any(c.isdigit() for c in word):
+            words.append((word if previous is None else f"{previous} {word}", True))
+            previous = None
+        elif word not in STOPWORDS:
+            word = _stem(word)
+            key = (sum(c.isupper() for c in token) >= 2 or DRUG_SUFFIX_PATTERN.search(word) is not None
+                   or len(word) >= RARE_WORD_LENGTH)
+            words.append((word, key))
+            previous = word
+    return words
+
+def normalize_query(text: str) -> Tuple[str, ...]:
+    """Reduce a query to its sorted terms, so reordered queries and queries differing by stopwords or plurals are equal."""
+    return tuple(sorted(term for term, _ in _query_words(text)))
+
+def key_terms(text: str) -> FrozenSet[str]:
+    """Get the terms of a query that change what it asks for: numbers, acronyms, drug names and rare words."""
+    return frozenset(term for term, key in _query_words(text) if key)
+
+def is_same_query(query: str, cached_query: str, similarity: float, threshold: float) -> bool:
+    """Tell whether a cached query asks for the same thing as a query.
+
+    Queries equal after normalize_query always match. Other queries match only if their similarity is
+    at least the threshold and they share the same key terms, since n-gram vectors alone put queries
+    that differ by one number or drug name (e.g. "atorvastatin dosing" and "rosuvastatin dosing")
+    close together. A threshold of 1 or more only matches identical queries.
+    """
+    if threshold >= 1.0:
+        return query == cached_query
+    if normalize_query(query) == normalize_query(cached_query):
+        return True
+    return similarity >= threshold and key_terms(query) == key_terms(cached_query)
+
+def hashed_ngram_embedding(texts: List[str], dim: int = EMBEDDING_DIM) -> "np.ndarray":
+    """Embed texts as unit-length signed feature-hashing vectors of their n-grams.
+
+    Needs no model and gives the same vector in every process, so vectors can be persisted.
+
+    Args:
+        texts: Texts to embed
+        dim: Dimension of the vectors
+
+    Returns:
+        Array of shape (len(texts), dim), one unit vector per text (zero for texts without words)
+    """
+    # numpy is imported on first use, so importing the graph does not pay for it
+    import numpy as np
+
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        features = ngram_features(text)
+        if not features:
+            continue
+        hashes = np.array([zlib.crc32(feature.encode("utf-8")) for feature, _ in features], dtype=np.uint32)
+        weights = np.array([weight for _, weight in features], dtype=np.float32)
+        # The top bit of the hash gives the sign, so that collisions cancel out on average
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        np.add.at(vectors[row], hashes % dim, signs * weights)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+def cache_namespace(search_api: str, params: Dict[str, Any]) -> int:
+    """Identify the search API and parameters a response was produced with, as a signed 64-bit integer."""
+    key = json.dumps([search_api, params], sort_keys=True, default=str)
+    return int.from_bytes(hashlib.sha256(key.encode("utf-8")).digest()[:8], "little", signed=True)
+
+class SemanticSearchCache:
+    """On-disk cache of search responses, looked up by similarity of the queries rather than exact match.
+
+    Queries are embedded with hashed_ngram_embedding. A query gets the response of a cached query, for
+    the same search API and parameters, that asks for the same thing (see is_same_query) without calling
+    the search API, so rewordings of queries answered in earlier runs are free.
+
+    The directory holds three append-only files: the query vectors, one fixed-size entry per vector
+    (namespace, offset and length of the response, creation time), and the responses as JSON lines.
+    The vectors and entries are memory-mapped, so opening a large cache reads nothing up front, and
+    responses are read only for the nearest cached queries. Processes sharing the directory take an
+    exclusive lock on its lock file to append or repair the files, so their rows never interleave.
+    Lookups and stores do blocking file I/O, so async callers run them in a worker thread.
+    """
+
+    def __init__(self, path: str, dim: int = EMBEDDING_DIM) -> None:
+        self.path = path
+        self.dim = dim
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._entries_path = os.path.join(path, "entries.i64")
+        self._responses_path = os.path.join(path, "responses.jsonl")
+        self._lock_path = os.path.join(path, "lock")
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        with self._lock, self._file_lock():
+            self._repair()
+            self._load()
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Hold the exclusive lock of the directory, shared with the other processes using it."""
+        with open(self._lock_path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _row_count(self) -> Tuple[int, int, int]:
+        """Get the number of complete rows, and the sizes of the vectors and entries files."""
+        vectors_size = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+        entries_size = os.path.getsize(self._entries_path) if os.path.exists(self._entries_path) else 0
+        return min(vectors_size // (self.dim * 4), entries_size // 32), vectors_size, entries_size
+
+    def _repair(self) -> None:
+        """Drop a trailing row left incomplete by a crash. Only called under the file lock, when no process is appending."""
+        count, vectors_size, entries_size = self._row_count()
+        if vectors_size != count * self.dim * 4:
+            os.truncate(self._vectors_path, count * self.dim * 4)
+        if entries_size != count * 32:
+            os.truncate(self._entries_path, count * 32)
+
+    def _load(self) -> None:
+        """Map the complete rows of the vectors and entries files."""
+        import numpy as np
+
+        count, _, _ = self._row_count()
+        if count:
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(count, self.dim))
+            self._entries = np.memmap(self._entries_path, dtype=np.int64, mode="r", shape=(count, 4))
+        else:
+            self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+            self._entries = np.zeros((0, 4), dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, search_api: str, params: Dict[str, Any], queries: List[str], threshold: float,
+               max_age: Optional[float] = None) -> List[Optional[Dict[str, Any]]]:
+        """Find cached responses for queries that ask for the same thing as cached ones.
+
+        The MAX_CANDIDATES cached queries nearest to each query are checked with is_same_query.
+
+        Args:
+            search_api: Search API the responses must come from
+            params: Search API parameters the responses must have been produced with
+            queries: Queries to look up
+            threshold: Minimum cosine similarity between a query and a cached query with the same key terms
+            max_age: Maximum age of a cached response in seconds, no limit if None
+
+        Returns:
+            One entry per query: the cached response, with the new query, or None on a miss
+        """
+        import numpy as np
+
+        with self._lock:
+            vectors, entries = self._vectors, self._entries
+        if not len(entries) or not queries:
+            return [None] * len(queries)
+
+        similarity = hashed_ngram_embedding(queries, self.dim) @ vectors.T
+        # Cached responses of other search APIs or parameters, or too old, never match
+        valid = entries[:, 0] == cache_namespace(search_api, params)
+        if max_age is not None:
+            valid &= entries[:, 3] >= time.time() - max_age
+        similarity[:, ~valid] = -2.0
+
+        # Nearest cached queries first, without sorting the whole cache
+        k = min(MAX_CANDIDATES, similarity.shape[1])
+        candidates = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(similarity, candidates, axis=1), axis=1)
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        results: List[Optional[Dict[str, Any]]] = []
+        with open(self._responses_path, "rb") as f:
+            for query, similarities, rows in zip(queries, similarity, candidates):
+                result = None
+                for row in rows:
+                    if not valid[row]:
+                        break
+                    f.seek(int(entries[row, 1]))
+                    response = json.loads(f.read(int(entries[row, 2])))
+                    if is_same_query(query, response.get("query", ""), float(similarities[row]), threshold):
+                        result = {**response, "query": query}
+                        break
+                results.append(result)
+        return results
+
+    def store(self, search_api: str, params: Dict[str, Any], queries: List[str], responses: List[Dict[str, Any]]) -> None:
+        """Add search responses to the cache.
+
+        Args:
+            search_api: Search API that produced the responses
+            params: Search API parameters the responses were produced with
+            queries: Queries of the responses
+            responses: One response per query
+        """
+        import numpy as np
+
+        if not queries:
+            return
+        namespace = cache_namespace(search_api, params)
+        vectors = hashed_ngram_embedding(queries, self.dim)
+        with self._lock, self._file_lock():
+            # Another process may have crashed mid-append, its partial row would shift the rows appended after it
+            self._repair()
+            entries = []
+            with open(self._responses_path, "ab") as f:
+                f.seek(0, os.SEEK_END)
+                for response in responses:
+                    line = json.dumps(response, default=str).encode("utf-8") + b"\n"
+                    entries.append((namespace, f.tell(), len(line), int(time.time())))
+                    f.write(line)
+            # Vectors before entries: a vector without its entry is dropped on the next load
+            with open(self._vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._entries_path, "ab") as f:
+                f.write(np.array(entries, dtype=np.int64).tobytes())
+            self._load()
+
+# One cache per directory, shared by every run in this process
+_search_caches: Dict[str, SemanticSearchCache] = {}
+_search_caches_lock = threading.Lock()
+
+def get_search_cache(path: str) -> SemanticSearchCache:
+    """Get the process-wide semantic search cache of a directory."""
+    with _search_caches_lock:
+        if path not in _search_caches:
+            _search_caches[path] = SemanticSearchCache(path)
+        return _search_caches[path]
@@ -29,6 +29,19 @@ class Queries(BaseModel):
         description="List of search queries.",
     )
 
+class SectionQueries(BaseModel):
+    section_name: str = Field(
+        description="Name of the report section, exactly as given.",
+    )
+    queries: List[SearchQuery] = Field(
+        description="List of search queries for the section.",
+    )
+
+class ReportQueries(BaseModel):
+    sections: List[SectionQueries] = Field(
+        description="Search queries for each report section.",
+    )
+
 class Feedback(BaseModel):
     grade: Literal["pass","fail"] = Field(
         description="Evaluation result indicating whether the response meets requirements ('pass') or needs revision ('fail')."
@@ -37,6 +50,14 @@ class Feedback(BaseModel):
         description="List of follow-up search queries.",
     )
 
+class PlanReview(BaseModel):
+    approved: bool = Field(
+        description="Whether the report plan is ready for research and writing."
+    )
+    feedback: str = Field(
+        description="Changes to make to the report plan if it is not approved, empty otherwise."
+    )
+
 class ReportStateInput(TypedDict):
     topic: str # Report topic
     
@@ -46,9 +67,12 @@ class ReportStateOutput(TypedDict):
 class ReportState(TypedDict):
     topic: str # Report topic    
     feedback_on_report_plan: str # Feedback on the report plan
+    plan_revisions: int # Number of times the plan was regenerated from feedback
+    planning_queries: list[str] # Search queries already run to gather context for planning
+    planning_source_str: str # Blob handle to the cached search context for planning, reused when the plan is regenerated
     sections: list[Section] # List of report sections 
-    completed_sections: Annotated[list, operator.add] # Send() API key
-    report_sections_from_research: str # String of any completed sections from research to write final sections
+    completed_sections: Annotated[list, operator.add] # Send() API key, section content is a blob handle
+    report_sections_from_research: str # Blob handle to the string of any completed sections from research to write final sections
     final_report: str # Final report
 
 class SectionState(TypedDict):
@@ -56,9 +80,9 @@ class SectionState(TypedDict):
     section: Section # Report section  
     search_iterations: int # Number of search iterations done
     search_queries: list[SearchQuery] # List of search queries
-    source_str: str # String of formatted source content from web search
-    report_sections_from_research: str # String of any completed sections from research to write final sections
-    completed_sections: list[Section] # Final key we duplicate in outer state for Send() API
+    source_str: str # Blob handle to the string of formatted source content from web search
+    report_sections_from_research: str # Blob handle to the string of any completed sections from research to write final sections
+    completed_sections: list[Section] # Final key we duplicate in outer state for Send() API, section content is a blob handle
 
 class SectionOutputState(TypedDict):
     completed_sections: list[Section] # Final key we duplicate in outer state for Send() API
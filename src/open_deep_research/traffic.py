@@ -0,0 +1,214 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from enum import Enum
+from typing import Any, AsyncIterator, ContextManager, Deque, Dict, Iterator, List, Optional
+
+from langchain_core.messages import convert_to_messages, message_to_dict, messages_from_dict, messages_to_dict
+from langchain_core.runnables import Runnable, RunnableConfig
+
+class TrafficMode(Enum):
+    RECORD = "record" # Call the APIs and archive every call
+    REPLAY = "replay" # Serve every call from the archive, without calling the APIs
+
+def request_key(request: Any) -> str:
+    """Identify a request by the SHA-256 of its canonical JSON form."""
+    return hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+class TrafficArchive:
+    """Archive of the search and LLM calls of a run, as gzip-compressed JSON lines.
+
+    In record mode, every call is appended as a record with its request, response, start time
+    relative to the start of the recording, and latency. In replay mode, calls are answered from
+    the records with the same request, in the order they were recorded, so that a request made
+    several times gets the same sequence of responses. A request that was never recorded raises
+    KeyError, rather than silently reaching a live API.
+
+    Use record_traffic and replay_traffic to make an archive the active one.
+    """
+
+    def __init__(self, path: str, mode: TrafficMode, original_latency: bool = False) -> None:
+        self.path = path
+        self.mode = mode
+        self.original_latency = original_latency
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._records: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._file = None
+        if mode == TrafficMode.RECORD:
+            self._file = gzip.open(path, "wt", encoding="utf-8")
+        else:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    self._records[record["key"]].append(record)
+
+    def close(self) -> None:
+        """Finish writing the archive."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def record(self, kind: str, request: Dict[str, Any], response: Any, start: float) -> None:
+        """Append a call to the archive.
+
+        Args:
+            kind: "llm" or "search"
+            request: JSON-serializable request, calls with equal requests are replayed in order
+            response: JSON-serializable response
+            start: time.perf_counter() when the call started
+        """
+        record = {"type": kind, "key": request_key(request), "start": start - self._start,
+                  "latency": time.perf_counter() - start, "request": request, "response": response}
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def _next_record(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        key = request_key(request)
+        with self._lock:
+            records = self._records.get(key)
+            if not records:
+                raise KeyError(f"No recorded response in {self.path} for request {json.dumps(request, default=str)[:500]}")
+            # The last response of a request is served again if it is made more times than recorded
+            return records.popleft() if len(records) > 1 else records[0]
+
+    def replay(self, request: Dict[str, Any]) -> Any:
+        """Get the recorded response of a request, waiting as long as the call took if original_latency is set."""
+        record = self._next_record(request)
+        if self.original_latency:
+            time.sleep(record["latency"])
+        return record["response"]
+
+    async def areplay(self, request: Dict[str, Any]) -> Any:
+        """Async version of replay."""
+        record = self._next_record(request)
+        if self.original_latency:
+            await asyncio.sleep(record["latency"])
+        return record["response"]
+
+_active_archive: Optional[TrafficArchive] = None
+
+def get_traffic_archive() -> Optional[TrafficArchive]:
+    """Get the archive that calls are recorded to or replayed from, if any."""
+    return _active_archive
+
+@contextmanager
+def _activate(archive: TrafficArchive) -> Iterator[TrafficArchive]:
+    global _active_archive
+    previous, _active_archive = _active_archive, archive
+    try:
+        yield archive
+    finally:
+        _active_archive = previous
+        archive.close()
+
+def record_traffic(path: str) -> ContextManager[TrafficArchive]:
+    """Record every search and LLM call made inside the block to an archive.
+
+    Example:
+        with record_traffic("traffic.jsonl.gz"):
+            await graph.ainvoke({"topic": topic}, config)
+    """
+    return _activate(TrafficArchive(path, TrafficMode.RECORD))
+
+def replay_traffic(path: str, original_latency: bool = False) -> ContextManager[TrafficArchive]:
+    """Serve every search and LLM call made inside the block from an archive made by record_traffic.
+
+    Args:
+        path: Archive to replay
+        original_latency: Whether each call takes as long as it did when recorded, instead of no time
+    """
+    return _activate(TrafficArchive(path, TrafficMode.REPLAY, original_latency))
+
+class TrafficChatModel(Runnable):
+    """Stands in for a chat model while an archive is active, recording or replaying its calls.
+
+    Supports what the graph does with chat models: invoke, ainvoke and astream, on the model or on
+    with_structured_output of a pydantic schema. Responses are archived after parsing, as serialized
+    messages or as the fields of the schema. Replayed calls do not reach callbacks, so token usage
+    is not reported for them.
+    """
+
+    def __init__(self, archive: TrafficArchive, model: Optional[Runnable], model_info: Dict[str, Any],
+                 schema: Optional[type] = None) -> None:
+        self.archive = archive
+        self.model = model # Model or structured output runnable to record, None when replaying
+        self.model_info = model_info # Provider, model and arguments, identifying the model in requests
+        self.schema = schema
+
+    def with_structured_output(self, schema: type, **kwargs: Any) -> "TrafficChatModel":
+        model = self.model.with_structured_output(schema, **kwargs) if self.model is not None else None
+        return TrafficChatModel(self.archive, model, {**self.model_info, "structured_output": kwargs}, schema)
+
+    def _request(self, input: Any) -> Dict[str, Any]:
+        messages = convert_to_messages(input) if isinstance(input, list) else input
+        return {**self.model_info, "schema": self.schema.__name__ if self.schema else None,
+                "messages": messages_to_dict(messages) if isinstance(messages, list) else messages}
+
+    def _dump(self, output: Any) -> Any:
+        if self.schema is not None:
+            return output.model_dump(mode="json")
+        return message_to_dict(output)
+
+    def _load(self, response: Any) -> Any:
+        if self.schema is not None:
+            return self.schema.model_validate(response)
+        return messages_from_dict([response])[0]
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        request = self._request(input)
+        if self.archive.mode == TrafficMode.REPLAY:
+            return self._load(self.archive.replay(request))
+        start = time.perf_counter()
+        output = self.model.invoke(input, config, **kwargs)
+        self.archive.record("llm", request, self._dump(output), start)
+        return output
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        request = self._request(input)
+        if self.archive.mode == TrafficMode.REPLAY:
+            return self._load(await self.archive.areplay(request))
+        start = time.perf_counter()
+        output = await self.model.ainvoke(input, config, **kwargs)
+        self.archive.record("llm", request, self._dump(output), start)
+        return output
+
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> AsyncIterator[Any]:
+        if self.archive.mode == TrafficMode.REPLAY:
+            # The whole response is replayed as one chunk
+            yield await self.ainvoke(input, config, **kwargs)
+            return
+        request = self._request(input)
+        start = time.perf_counter()
+        output = None
+        async for chunk in self.model.astream(input, config, **kwargs):
+            # Structured output streams growing partial objects, messages stream chunks that add up
+            output = chunk if self.schema is not None or output is None else output + chunk
+            yield chunk
+        self.archive.record("llm", request, self._dump(output), start)
+
+def traffic_chat_model(archive: TrafficArchive, model: Optional[Runnable], model_provider: str, model_name: str,
+                       kwargs: Dict[str, Any]) -> TrafficChatModel:
+    """Wrap a chat model for an archive.
+
+    Args:
+        archive: Active archive
+        model: Chat model to record, None when replaying
+        model_provider: Provider of the model
+        model_name: Name of the model
+        kwargs: Arguments the model was initialized with, without credentials
+
+    Returns:
+        The chat model stand-in
+    """
+    return TrafficChatModel(archive, model, {"model_provider": model_provider, "model": model_name, "kwargs": kwargs})
+
+def search_request(search_api: str, query_list: List[str], params: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the archived request of a search, from parameters without credentials."""
+    return {"search_api": search_api, "queries": query_list, "params": params}
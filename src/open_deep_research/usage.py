@@ -0,0 +1,95 @@
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+
+@dataclass
+class LLMCallUsage:
+    """Token usage of a single LLM call."""
+    node: Optional[str] # Graph node that made the call
+    model: Optional[str] # Model that served the call
+    role: Optional[str] = None # Role the model was picked for, see routing.select_model
+    input_tokens: int = 0 # Total input tokens, including cached ones
+    output_tokens: int = 0 # Output tokens
+    cache_read_tokens: int = 0 # Input tokens read from the provider's prompt cache
+    cache_creation_tokens: int = 0 # Input tokens written to the provider's prompt cache
+    latency: float = 0.0 # Wall time of the call in seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the usage as a plain dict."""
+        return asdict(self)
+
+class LLMUsageHandler(BaseCallbackHandler):
+    """Callback handler that records the token usage of every LLM call in a run.
+
+    Pass it in the callbacks of the run config. Cached token counts are taken from the
+    usage metadata that chat models report, so they are only available for providers
+    that report prompt caching (e.g. Anthropic, OpenAI, Google).
+
+    Example:
+        usage_handler = LLMUsageHandler()
+        await graph.ainvoke({"topic": topic}, {"callbacks": [usage_handler], ...})
+        print(usage_handler.totals())
+    """
+
+    # Record in the caller's thread instead of an executor, so records are in order
+    run_inline = True
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: List[LLMCallUsage] = []
+        self._pending: Dict[UUID, tuple[LLMCallUsage, float]] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], *,
+                            run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        """Start timing an LLM call and note which node and model it belongs to."""
+        metadata = metadata or {}
+        record = LLMCallUsage(node=metadata.get("langgraph_node"), model=metadata.get("ls_model_name"), role=metadata.get("model_role"))
+        self._pending[run_id] = (record, time.perf_counter())
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        """Record the token usage of a finished LLM call."""
+        pending = self._pending.pop(run_id, None)
+        if pending is None:
+            return
+        record, start = pending
+        record.latency = time.perf_counter() - start
+
+        for generations in response.generations:
+            for generation in generations:
+                usage_metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if not usage_metadata:
+                    continue
+                input_token_details = usage_metadata.get("input_token_details") or {}
+                record.input_tokens += usage_metadata.get("input_tokens", 0)
+                record.output_tokens += usage_metadata.get("output_tokens", 0)
+                record.cache_read_tokens += input_token_details.get("cache_read", 0) or 0
+                record.cache_creation_tokens += input_token_details.get("cache_creation", 0) or 0
+
+        self.records.append(record)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        """Forget a failed LLM call."""
+        self._pending.pop(run_id, None)
+
+    def totals(self) -> Dict[str, Any]:
+        """Sum the usage over all recorded calls.
+
+        Returns:
+            Dict with the number of calls, token totals and the share of input tokens served from cache
+        """
+        input_tokens = sum(r.input_tokens for r in self.records)
+        cache_read_tokens = sum(r.cache_read_tokens for r in self.records)
+        return {
+            "calls": len(self.records),
+            "input_tokens": input_tokens,
+            "output_tokens": sum(r.output_tokens for r in self.records),
+            "cache_read_tokens": cache_read_tokens,
+            "cache_creation_tokens": sum(r.cache_creation_tokens for r in self.records),
+            "cache_hit_ratio": cache_read_tokens / input_tokens if input_tokens else 0.0,
+            "latency": sum(r.latency for r in self.records),
+        }
@@ -0,0 +1,22 @@
+from open_deep_research.clients import ClientCache, credential_hash
+
+def test_credential_hash_hides_the_credential():
+    assert credential_hash(None) is None and credential_hash("") is None
+    assert credential_hash("tvly-secret") == credential_hash("tvly-secret")
+    assert "secret" not in credential_hash("tvly-secret")
+    assert len(credential_hash("tvly-secret")) == 16
+
+def test_client_cache_keeps_most_recently_used():
+    cache = ClientCache(maxsize=2)
+    created = []
+
+    def get(key):
+        return cache.get(key, lambda: created.append(key) or object())
+
+    first = get("a")
+    get("b")
+    assert get("a") is first
+    get("c")  # Evicts "b", the least recently used
+    assert len(cache) == 2
+    get("b")
+    assert created == ["a", "b", "c", "b"]
@@ -0,0 +1,124 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from open_deep_research import rate_limits
+from open_deep_research.rate_limits import AdaptiveRateLimiter, RateLimit
+from open_deep_research.search_backends import googlesearch
+from open_deep_research.search_backends.googlesearch import (
+    CONSENT_COOKIES,
+    RESULTS_PER_PAGE,
+    SCRAPE_MAX_CONCURRENCY,
+    google_search_async,
+    parse_result_page,
+    scrape_google,
+)
+
+FIXTURES = Path(__file__).parent.parent / "benchmarks" / "fixtures" / "google"
+
+# Host of the fixtures' result links, rewritten to the local server
+FIXTURE_HOST = "https://example.org"
+
+class StandInGoogle:
+    """Serves the saved result pages by their start parameter, and records the requests."""
+
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.base_url = ""
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def search(self, request: web.Request) -> web.Response:
+        self.requests.append({"query": dict(request.query), "cookies": dict(request.cookies)})
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        page = min(int(request.query.get("start", 0)) // RESULTS_PER_PAGE, 2)
+        html = (FIXTURES / f"page{page}.html").read_text().replace(FIXTURE_HOST, self.base_url)
+        response = web.Response(text=html, content_type="text/html")
+        response.set_cookie("NID", "stand-in")
+        return response
+
+    async def article(self, request: web.Request) -> web.Response:
+        return web.Response(text=f"<html><body><p>Full text of {request.match_info['slug']}.</p></body></html>",
+                            content_type="text/html")
+
+async def run_with_server(monkeypatch, coroutine_function, delay: float = 0.0):
+    """Serve the fixtures on localhost, since cookie jars refuse the cookies of IP addresses, and scrape them."""
+    google = StandInGoogle(delay)
+    app = web.Application()
+    app.add_routes([web.get("/search", google.search), web.get("/{slug}", google.article)])
+    async with TestServer(app, host="localhost") as server:
+        google.base_url = str(server.make_url("")).rstrip("/")
+        monkeypatch.setenv("GOOGLE_SCRAPE_URL", f"{google.base_url}/search")
+        return google, await coroutine_function()
+
+@pytest.fixture(autouse=True)
+def fast_scrape_limiter(monkeypatch):
+    # A fresh, fast limiter per test, with no learned rates read or saved
+    monkeypatch.setattr(rate_limits, "RATE_LIMITS_PATH", "")
+    limiter = AdaptiveRateLimiter(RateLimit(initial_rate=100.0, min_rate=50.0, max_rate=100.0))
+    monkeypatch.setattr(googlesearch, "get_rate_limiter", lambda *args: limiter)
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    monkeypatch.delenv("GOOGLE_CX", raising=False)
+
+def test_parse_result_page():
+    results = parse_result_page((FIXTURES / "page0.html").read_text())
+    assert len(results) == 10
+    assert results[0].title == "Statin therapy for primary prevention"
+    assert results[0].url == "https://example.org/statins"
+    assert results[0].content.startswith("Summary of the evidence on statin therapy for primary prevention")
+    assert results[0].raw_content == results[0].content
+    # The sponsored block has no snippet
+    assert not any(result.title.startswith("Sponsored") for result in results)
+    assert parse_result_page((FIXTURES / "page2.html").read_text()) == []
+
+def test_scrape_dedupes_results_across_pages(monkeypatch):
+    google, results = asyncio.run(run_with_server(monkeypatch, lambda: scrape_google("statin therapy", 20)))
+    urls = [result.url for result in results]
+    assert len(urls) == len(set(urls)) == 19
+    expected = parse_result_page((FIXTURES / "page0.html").read_text()) + parse_result_page((FIXTURES / "page1.html").read_text())
+    assert [url.replace(google.base_url, "https://example.org") for url in urls] == list(dict.fromkeys(r.url for r in expected))
+    assert sorted(int(request["query"]["start"]) for request in google.requests) == [0, 10]
+
+def test_scrape_requests_only_needed_pages(monkeypatch):
+    google, results = asyncio.run(run_with_server(monkeypatch, lambda: scrape_google("statin therapy", 5)))
+    assert len(results) == 5
+    assert [request["query"]["start"] for request in google.requests] == ["0"]
+
+def test_cookies_are_sent_and_reused(monkeypatch):
+    async def scrape_twice():
+        await scrape_google("statin therapy", 5)
+        return await scrape_google("statin adherence", 5)
+
+    google, _ = asyncio.run(run_with_server(monkeypatch, scrape_twice))
+    assert len(google.requests) == 2
+    for request in google.requests:
+        assert all(request["cookies"].get(name) == value for name, value in CONSENT_COOKIES.items())
+    # The cookie set by the first response comes back with the second request
+    assert "NID" not in google.requests[0]["cookies"]
+    assert google.requests[1]["cookies"]["NID"] == "stand-in"
+
+def test_pages_in_flight_stay_within_budget(monkeypatch):
+    queries = [f"statin therapy {i}" for i in range(4)]
+    google, responses = asyncio.run(run_with_server(
+        monkeypatch, lambda: google_search_async(queries, max_results=30, include_raw_content=False), delay=0.2))
+    assert [len(response.results) for response in responses] == [19] * len(queries)
+    assert len(google.requests) == 3 * len(queries)
+    # Pages overlap, but never beyond the budget
+    assert google.max_in_flight == SCRAPE_MAX_CONCURRENCY
+
+def test_raw_content_is_fetched_from_result_pages(monkeypatch):
+    _, responses = asyncio.run(run_with_server(
+        monkeypatch, lambda: google_search_async("statin therapy", max_results=3, include_raw_content=True)))
+    [response] = responses
+    assert response.error is None
+    assert [result.raw_content.strip() for result in response.results] == [
+        "Full text of statins.", "Full text of muscle-symptoms.", "Full text of ldl-targets."]
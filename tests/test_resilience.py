@@ -0,0 +1,23 @@
+import asyncio
+
+from open_deep_research.resilience import RetryPolicy, search_with_retry
+from open_deep_research.search_results import SearchResponse
+
+POLICY = RetryPolicy(max_attempts=2, base_delay=0.0)
+
+def test_missing_responses_become_errors():
+    async def search(queries):
+        return []
+
+    responses = asyncio.run(search_with_retry("test-missing", ["a", "b"], search, POLICY))
+    assert [response.query for response in responses] == ["a", "b"]
+    assert all(response.error and not response.results for response in responses)
+
+def test_short_batch_keeps_answered_queries():
+    async def search(queries):
+        return [SearchResponse(query=queries[0])]
+
+    responses = asyncio.run(search_with_retry("test-short", ["a", "b", "c"], search, POLICY))
+    assert [response.query for response in responses] == ["a", "b", "c"]
+    assert responses[0].error is None
+    assert responses[1].error == responses[2].error == "no response from test-short"
@@ -0,0 +1,102 @@
+import multiprocessing
+
+import pytest
+
+from open_deep_research.configuration import Configuration
+from open_deep_research.semantic_cache import SemanticSearchCache, hashed_ngram_embedding
+
+THRESHOLD = Configuration().search_cache_threshold
+
+# Queries that are close as n-gram vectors but ask for different things
+NEAR_MISSES = [
+    ("type 1 diabetes management in adults", "type 2 diabetes management in adults"),
+    ("type 1 vs type 2 diabetes insulin regimens in adults", "type 2 vs type 2 diabetes insulin regimens in adults"),
+    ("contraindications of NSAIDs in CKD", "indications of NSAIDs in CKD"),
+    ("contraindications vs indications of NSAIDs in CKD", "indications vs contraindications of opioids in CKD"),
+    ("ciprofloxacin adverse effects in elderly patients", "levofloxacin adverse effects in elderly patients"),
+    ("atorvastatin vs rosuvastatin dosing", "rosuvastatin vs pravastatin dosing"),
+    ("atorvastatin dosing", "rosuvastatin dosing"),
+    ("ESC guidelines cardiovascular prevention 2019", "ESC guidelines cardiovascular prevention 2024"),
+    ("hba1c target 7 percent elderly", "hba1c target 8 percent elderly"),
+]
+
+# Rewordings of the same query
+PARAPHRASES = [
+    ("effects of metformin on kidney function", "metformin effects on kidney function"),
+    ("effects of metformin on kidney function", "what are the effects of metformin on kidney function"),
+    ("statin therapy for primary prevention", "statin therapies for primary prevention"),
+    ("ESC guidelines 2019 for cardiovascular prevention", "cardiovascular prevention in the ESC guidelines 2019"),
+]
+
+def response(query: str) -> dict:
+    return {"query": query, "results": [{"title": query, "url": f"https://example.org/{query}", "content": query}], "error": None}
+
+@pytest.mark.parametrize("cached, query", NEAR_MISSES)
+def test_near_misses_do_not_hit(tmp_path, cached, query):
+    cache = SemanticSearchCache(str(tmp_path))
+    cache.store("tavily", {}, [cached], [response(cached)])
+    assert cache.lookup("tavily", {}, [query], THRESHOLD) == [None]
+
+@pytest.mark.parametrize("cached, query", NEAR_MISSES)
+def test_near_misses_do_not_hit_without_threshold(tmp_path, cached, query):
+    cache = SemanticSearchCache(str(tmp_path))
+    cache.store("tavily", {}, [cached], [response(cached)])
+    assert cache.lookup("tavily", {}, [query], 0.0) == [None]
+
+@pytest.mark.parametrize("cached, query", PARAPHRASES)
+def test_paraphrases_hit(tmp_path, cached, query):
+    cache = SemanticSearchCache(str(tmp_path))
+    cache.store("tavily", {}, [cached], [response(cached)])
+    [hit] = cache.lookup("tavily", {}, [query], THRESHOLD)
+    assert hit is not None
+    assert hit["query"] == query
+    assert hit["results"][0]["url"] == f"https://example.org/{cached}"
+
+def test_near_miss_among_other_entries_finds_exact_query(tmp_path):
+    cache = SemanticSearchCache(str(tmp_path))
+    queries = [query for pair in NEAR_MISSES for query in pair]
+    cache.store("tavily", {}, queries, [response(query) for query in queries])
+    hits = cache.lookup("tavily", {}, queries, THRESHOLD)
+    assert [hit["results"][0]["url"] for hit in hits] == [f"https://example.org/{query}" for query in queries]
+
+def test_other_namespace_does_not_hit(tmp_path):
+    cache = SemanticSearchCache(str(tmp_path))
+    cache.store("tavily", {}, ["atorvastatin dosing"], [response("atorvastatin dosing")])
+    assert cache.lookup("exa", {}, ["atorvastatin dosing"], THRESHOLD) == [None]
+    assert cache.lookup("tavily", {"max_results": 3}, ["atorvastatin dosing"], THRESHOLD) == [None]
+
+def test_near_misses_are_close_as_vectors():
+    # The n-gram vectors alone would serve the wrong cached results at a lower threshold
+    vectors = [hashed_ngram_embedding([a, b]) for a, b in NEAR_MISSES[:3]]
+    similarities = [float(a @ b) for a, b in vectors]
+    assert all(similarity > 0.85 for similarity in similarities)
+
+def store_queries(path: str, worker: int, count: int) -> None:
+    cache = SemanticSearchCache(path)
+    for i in range(count):
+        query = f"worker {worker} query {i}"
+        cache.store("tavily", {}, [query], [response(query)])
+
+def test_concurrent_processes_keep_rows_aligned(tmp_path):
+    path, workers, count = str(tmp_path), 4, 25
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=store_queries, args=(path, worker, count)) for worker in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    cache = SemanticSearchCache(path)
+    assert len(cache) == workers * count
+    queries = [f"worker {worker} query {i}" for worker in range(workers) for i in range(count)]
+    hits = cache.lookup("tavily", {}, queries, THRESHOLD)
+    assert [hit["results"][0]["url"] for hit in hits] == [f"https://example.org/{query}" for query in queries]
+
+def test_threshold_one_only_hits_identical_queries(tmp_path):
+    cache = SemanticSearchCache(str(tmp_path))
+    cached = "effects of metformin on kidney function"
+    cache.store("tavily", {}, [cached], [response(cached)])
+    assert cache.lookup("tavily", {}, ["metformin effects on kidney function"], 1.0) == [None]
+    [hit] = cache.lookup("tavily", {}, [cached], 1.0)
+    assert hit is not None and hit["query"] == cached